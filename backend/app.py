@@ -2,27 +2,54 @@ import os
 import os.path as osp
 import sys
 import pandas as pd
-import time
-import json
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor
 
 load_dotenv()
-from flask import Flask, render_template, request, Response, jsonify, send_from_directory
-import requests
+from flask import Flask, render_template, request, Response, jsonify, send_file, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.utils import safe_join
 from flask_cors import CORS
 
 # Core pipeline imports
 from core.review_scraping.pipeline import scrape_reviews
-from core.menu_listing.pipeline import main as menu_listing_main
-from core.text_review_labeling.pipeline import review_text_embeddings, match_and_summarize_top_20
-from core.restuarant_overview.restauarnt_summary import summarize_restaurant_overview
-from core.image_generating.pipeline import save_collage_parallel, generate_from_collage
+from core.menu_listing.pipeline import main as menu_listing_main, menu_listing_inputs, menu_listing_outputs
+from core.text_review_labeling.pipeline import (
+    review_text_embeddings, match_and_summarize_top_20, incremental_match_and_summarize,
+    review_embedding_inputs, save_reviews_df, menu_summaries_fresh
+)
+from core.restuarant_overview.restauarnt_summary import summarize_restaurant_overview, overview_inputs
+from core.image_generating.pipeline import save_collage_parallel
+from core.image_generating.generation_queue import nanobanana_queue
 from core.utils.path_utils import *
-from core.utils.helpers import load_json
-from datetime import datetime
+# Shared in-process singletons must come from the same module objects the core packages import
+from utils.events import event_bus, format_sse, summaries_channel
+from utils.review_table import load_review_table
+from utils.image_variants import IMAGE_VARIANT_SIZES, content_version, get_variant, negotiate_format, variant_mimetype
+from utils.manifest import is_fresh, manifest_path
+from utils.artifact_cache import artifact_cache, load_menu_index, load_menus, load_overview, load_collage_index
+from utils.result_bundle import load_result_bundle
+from utils.places_search import places_client, PlacesSearchError
+from utils.place_registry import place_registry
+from utils.artifact_store import artifact_sync
+from utils.jobs import job_manager, job_channel, FINAL_STATES
+from utils.helpers import dumps_json, loads_json
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Runs jsonify and request.get_json through the shared JSON codec (indented in debug mode)."""
+
+    def dumps(self, obj, **kwargs):
+        pretty = True if kwargs.get("indent") is not None else None
+        return dumps_json(obj, pretty=pretty, sort_keys=kwargs.get("sort_keys", self.sort_keys),
+                          default=self.default).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return loads_json(s)
+
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 frontend_url = os.environ.get('FRONTEND_URL', '*')
 CORS(app, resources={r"/*": {"origins": frontend_url}})
 executor = ThreadPoolExecutor(max_workers=4)
@@ -49,29 +76,22 @@ def get_reviews():
     ids = data.get('ids')
     ids = [str(i) for i in ids]
 
-    review_path = SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id)
-    if not os.path.exists(review_path):
+    artifact_sync.prefetch(place_id)
+    table = load_review_table(place_id)
+    if table is None:
         return jsonify({'error': 'Reviews not found for this place'}), 404
 
-    all_reviews = load_json(review_path)
-    id_set = set(ids)
-    by_id = {r.get('id'): r for r in all_reviews if r.get('id') in id_set}
     # Preserve order of requested ids
     out = []
     for rid in ids:
-        r = by_id.get(rid)
-        if not r:
+        pos = table.position(rid) if rid.isdigit() else None
+        if pos is None:
             continue
-        raw_date = r.get('publishedAtDate') or r.get('publishedDate') or ''
-        try:
-            dt = datetime.fromisoformat(raw_date.replace('Z', '+00:00'))
-            published_date = dt.strftime('%Y/%m/%d')
-        except (ValueError, TypeError):
-            published_date = raw_date[:10].replace('-', '/') if raw_date else ''
+        published_date = table.published_date(pos)
         out.append({
-            'text': r.get('text', ''),
-            'reviewUrl': r.get('reviewUrl', ''),
-            'publishedDate': published_date,
+            'text': table.text(pos),
+            'reviewUrl': table.review_url(pos),
+            'publishedDate': published_date.replace('-', '/') if published_date else '',
         })
     return jsonify({'reviews': out})
 
@@ -87,130 +107,278 @@ def search_restaurants():
         return jsonify({'error': 'Google Maps API key not configured'}), 500
 
     try:
-        url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-        params = {
-            'query': query,
-            'key': api_key,
-            'region': 'us',
-            'type': 'restaurant'
-        }
-        response = requests.get(url, params=params)
-        data = response.json()
-
-        if data.get('status') != 'OK' and data.get('status') != 'ZERO_RESULTS':
-            return jsonify({'error': data.get('status'), 'message': data.get('error_message')}), 500
-
-        results = []
-        for place in data.get('results', []):
-            results.append({
-                'name': place.get('name'),
-                'address': place.get('formatted_address'),
-                'place_id': place.get('place_id'),
-                'rating': place.get('rating'),
-                'user_ratings_total': place.get('user_ratings_total')
-            })
-
+        # Cached per normalized query; concurrent identical queries share one upstream request
+        results = places_client.search(query)
         return jsonify({
             "result": results,
             "message": f"Found {len(results)} places."
         })
+    except PlacesSearchError as e:
+        return jsonify({'error': e.status, 'message': e.message}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/review_scraping', methods=['POST'])
-def run_review_scraping():
-    data = request.json
-    place_id = data.get('place_id')
-    restaurant_name = data.get('restaurant_name')
-    if not place_id: return jsonify({'error': 'Missing place_id'}), 400
 
-    if osp.exists(SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id)): 
+@app.route('/search_restaurants/stats', methods=['GET'])
+def search_restaurants_stats():
+    return jsonify(places_client.stats())
+
+
+def _review_scraping(place_id, params, report):
+    restaurant_name = params.get('restaurant_name')
+    # `refresh` re-scrapes and appends newly seen reviews for incremental re-labeling
+    if osp.exists(SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id)) and not params.get('refresh'): 
         print(f"Reviews already scraped for {place_id}")
-        time.sleep(5)
     else:
+        report("Scraping reviews")
         scrape_reviews(place_id)
-    reviews = load_json(SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id))
-    if len(reviews) < 200:
-        return jsonify({
+    table = load_review_table(place_id)
+    if len(table) < 200:
+        return {
             'error': 'Insufficient reviews',
-            'message': f'Expected at least 200 reviews, got {len(reviews)}.',
-            'review_count': len(reviews),
-        }), 400
-    image_count = 0
-    for review in reviews:
-        image_count += len(review.get("reviewImageUrls", []))
+            'message': f'Expected at least 200 reviews, got {len(table)}.',
+            'review_count': len(table),
+        }, 400
+    image_count = table.n_images
     
-    mapping = load_json(DATA_DIR / "mapping.json")
-    mapping[place_id] = restaurant_name
-    with open(DATA_DIR / "mapping.json", 'w') as f:
-        json.dump(mapping, f, indent=2)
+    place_registry.upsert(place_id, name=restaurant_name, review_count=len(table), image_count=image_count)
     
-    return jsonify({
-        "review_count": len(reviews),
+    review_examples = [
+        {
+            "id": str(record.id),
+            "text": record.text,
+            "publishedAtDate": record.published_date,
+            "reviewUrl": record.review_url,
+            "reviewImageUrls": record.image_urls,
+        }
+        for record in (table.record(pos) for pos in range(min(10, len(table))))
+    ]
+    return {
+        "review_count": len(table),
         "image_count": image_count,
-        "review_examples": reviews[:10],
-        "message": f"Successfully scraped {len(reviews)} reviews."
-    })
+        "review_examples": review_examples,
+        "message": f"Successfully scraped {len(table)} reviews."
+    }, 200
+
+
+def _menu_listing(place_id, params, report):
+    # Only stages whose inputs (reviews, prompt, model, constants) changed are recomputed
+    menus_fresh = is_fresh(place_id, "menu_listing", menu_listing_inputs(place_id), menu_listing_outputs(place_id))
+    reviews_inputs = review_embedding_inputs(place_id)
+    reviews_fresh = is_fresh(place_id, "review_embeddings", reviews_inputs, [REVIEWS_DF_PATH_TEMPLATE.format(place_id=place_id)])
+    if not (menus_fresh and reviews_fresh):
+        report("Extracting the menu and embedding reviews")
+        f1 = None if menus_fresh else executor.submit(menu_listing_main, place_id)
+        f2 = None if reviews_fresh else executor.submit(review_text_embeddings, place_id)
+        
+        if f1 is not None:
+            f1.result()  # Wait for menu listing
+        if f2 is not None:
+            # Save reviews df locally for next steps
+            save_reviews_df(place_id, f2.result(), reviews_inputs)
+
+    menus = load_menus(place_id)
+    
+    return {
+        "result": {"place_id": place_id},
+        "menus": menus,
+        "message": "Menu extracted and reviews embedded in parallel."
+    }, 200
+
+
+def _summaries_fresh(place_id):
+    return menu_summaries_fresh(place_id)
+
+
+def _overview_fresh(place_id):
+    overview_path = RESTAURANT_OVERVIEW_PATH_TEMPLATE.format(place_id=place_id)
+    return is_fresh(place_id, "restaurant_overview", overview_inputs(place_id), [overview_path])
+
+
+def _results_ready(place_id):
+    """
+    Whether the place's summaries and overview are up to date. Checking the overview means rebuilding
+    its prompt, so the verdict is cached until a manifest or a file the prompt is built from changes.
+    """
+    sources = [manifest_path(place_id, artifact)
+               for artifact in ("menu_listing", "review_embeddings", "menu_summaries", "restaurant_overview")]
+    sources += [
+        MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id),
+        MENU_INDEX_PATH_TEMPLATE.format(place_id=place_id),
+        SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id),
+        RESTAURANT_OVERVIEW_PATH_TEMPLATE.format(place_id=place_id),
+    ]
+    # The prompt also names the restaurant, which lives in the place registry rather than a file
+    restaurant_name = place_registry.name(place_id)
+
+    def _check():
+        return load_menus(place_id) is not None and _summaries_fresh(place_id) and _overview_fresh(place_id)
+
+    return artifact_cache.get("results_ready", place_id, sources, _check, cost=lambda _: 0, tag=restaurant_name)
+
+
+def _match_and_summarize(place_id, incremental=False, report=lambda *args, **kwargs: None):
+    """Runs (or reuses) per-menu summaries and the overview, publishing progress on the summaries channel."""
+    channel = summaries_channel(place_id)
+    if incremental:
+        report("Matching new reviews")
+        df_reviews = pd.read_pickle(REVIEWS_DF_PATH_TEMPLATE.format(place_id=place_id))
+        assignment, stats = incremental_match_and_summarize(place_id, df_reviews)
+        if assignment is None:
+            match_and_summarize_top_20(place_id, df_reviews)
+            stats = None
+        event_bus.publish(channel, "incremental", stats)
+    elif _summaries_fresh(place_id):
+        for event in load_menu_index(place_id).summary_events:
+            event_bus.publish(channel, "menu", event)
+    else:
+        report("Matching reviews and summarizing dishes")
+        df_reviews = pd.read_pickle(REVIEWS_DF_PATH_TEMPLATE.format(place_id=place_id))
+        match_and_summarize_top_20(place_id, df_reviews)
+
+    # The overview is fingerprinted by its exact prompt, so it is rebuilt only when what it quotes changed
+    if _overview_fresh(place_id):
+        restaurant_overview = load_overview(place_id)
+    else:
+        report("Summarizing the restaurant", 0.9)
+        restaurant_overview = summarize_restaurant_overview(place_id)
+    event_bus.publish(channel, "overview", restaurant_overview)
+    return restaurant_overview
+
+
+def _match_and_summarize_job(place_id, params, report):
+    channel = summaries_channel(place_id)
+    incremental = bool(params.get('incremental'))
+    event_bus.reset(channel)
+    try:
+        restaurant_overview = _match_and_summarize(place_id, incremental=incremental, report=report)
+        event_bus.publish(channel, "done", {"place_id": place_id})
+    except Exception as e:
+        event_bus.publish(channel, "error", {"error": str(e)})
+        raise
+
+    menus = load_menus(place_id)
+    
+    return {
+        "result": {"place_id": place_id},
+        "menus": menus,
+        "restaurant_overview": restaurant_overview,
+        "message": "Success"
+    }, 200
+
+
+def _collage_images(place_id, params, report):
+    save_collage_parallel(place_id)
+    # Start generating the most-mentioned dishes before the client asks for them
+    nanobanana_queue.pregenerate_popular(place_id)
+
+    collage_index = load_collage_index(place_id)
+    return {
+        "collage": collage_index["collage"],
+        "src_review_urls": collage_index["src_review_urls"],
+        "message": "Collage images retrieved."
+    }, 200
+
+
+def _tracked(stage, runner):
+    """Records the stage's status for the place in the registry around `runner` (and pins its local files meanwhile)."""
+    def _run(place_id, params, report):
+        # Reuse what other instances already computed for this place
+        artifact_sync.prefetch(place_id)
+        place_registry.set_stage(place_id, stage, "running")
+        try:
+            # The place's files must stay local while the stage reads them
+            with artifact_sync.pinned(place_id):
+                payload, status_code = runner(place_id, params, report)
+        except Exception:
+            place_registry.set_stage(place_id, stage, "failed")
+            raise
+        place_registry.set_stage(place_id, stage, "succeeded" if status_code < 400 else "failed")
+        return payload, status_code
+    return _run
+
+
+# Pipeline stages run as jobs: identical concurrent requests share one run, and unfinished
+# runs are resumed after a restart (every stage skips work whose inputs did not change)
+job_manager.register("review_scraping", _tracked("review_scraping", _review_scraping))
+job_manager.register("menu_listing_main", _tracked("menu_listing_main", _menu_listing))
+job_manager.register("match_and_summarize_top_20", _tracked("match_and_summarize_top_20", _match_and_summarize_job))
+job_manager.register("collage_images", _tracked("collage_images", _collage_images))
+job_manager.restore()
+
+
+def _job_links(job):
+    return {"job": job, "status_url": f"/jobs/{job['id']}", "events_url": f"/jobs/{job['id']}/events"}
+
+
+def _run_stage(stage, place_id, params):
+    """
+    Submits (or joins) the stage's job. With `"async": true` in the request body the job is
+    returned right away (202); otherwise the request waits for the job and returns its result.
+    """
+    job = job_manager.submit(stage, place_id, params)
+    if (request.json or {}).get('async'):
+        return jsonify(_job_links(job)), 202
+    job = job_manager.wait(job['id'])
+    result = job_manager.result(job['id'])
+    if result is None:
+        return jsonify({'error': job['error'] or 'Job failed'}), job['status_code'] or 500
+    payload, status_code = result
+    return jsonify(payload), status_code
+
+
+@app.route('/review_scraping', methods=['POST'])
+def run_review_scraping():
+    data = request.json
+    place_id = data.get('place_id')
+    if not place_id: return jsonify({'error': 'Missing place_id'}), 400
+    return _run_stage("review_scraping", place_id,
+                      {"restaurant_name": data.get('restaurant_name'), "refresh": bool(data.get('refresh'))})
 
 @app.route('/menu_listing_main', methods=['POST'])
 def run_menu_listing_main():
     data = request.json
     place_id = data.get('place_id')
     if not place_id: return jsonify({'error': 'Missing place_id'}), 400
-
-    try:
-        if osp.exists(MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id)):
-            time.sleep(5)
-        else:
-            f1 = executor.submit(menu_listing_main, place_id)
-            f2 = executor.submit(review_text_embeddings, place_id)
-            
-            f1.result()  # Wait for menu listing
-            df_reviews = f2.result() # Wait for reviews df
-            
-            # Save reviews df locally for next steps
-            save_path = REVIEWS_DF_PATH_TEMPLATE.format(place_id=place_id)
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            df_reviews.to_pickle(save_path)
-
-        menus = load_json(MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id))
-        
-        return jsonify({
-            "result": {"place_id": place_id},
-            "menus": menus,
-            "message": "Menu extracted and reviews embedded in parallel."
-        })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return _run_stage("menu_listing_main", place_id, {})
 
 
 @app.route('/match_and_summarize_top_20', methods=['POST'])
 def run_match_and_summarize():
     data = request.json
     place_id = data.get('place_id')
-    save_path = REVIEWS_DF_PATH_TEMPLATE.format(place_id=place_id)
-    
-    try:
-        if osp.exists(RESTAURANT_OVERVIEW_PATH_TEMPLATE.format(place_id=place_id)):
-            time.sleep(5)
-            restaurant_overview = load_json(RESTAURANT_OVERVIEW_PATH_TEMPLATE.format(place_id=place_id))
-        else:
-            df_reviews = pd.read_pickle(save_path)
-            df_labeled = match_and_summarize_top_20(place_id, df_reviews)
-            
-            top_dishes = [col for col in df_labeled.columns if col != 'text']
-            restaurant_overview = summarize_restaurant_overview(place_id)
-        
-        menus = load_json(MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id))
-        
+    if not place_id: return jsonify({'error': 'Missing place_id'}), 400
+    params = {"incremental": bool(data.get('incremental'))}
+
+    if data.get('stream'):
+        # Start in the background; per-dish results arrive on the events endpoint.
+        # The job resets the summaries channel itself when it starts, so late subscribers replay only this run
+        job = job_manager.submit("match_and_summarize_top_20", place_id, params)
         return jsonify({
             "result": {"place_id": place_id},
-            "menus": menus,
-            "restaurant_overview": restaurant_overview,
-            "message": "Success"
-        })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+            "job": job,
+            "events_url": f"/match_and_summarize_top_20/events?place_id={place_id}",
+            "message": "Started"
+        }), 202
+    return _run_stage("match_and_summarize_top_20", place_id, params)
+
+
+@app.route('/match_and_summarize_top_20/events', methods=['GET'])
+def stream_match_and_summarize():
+    """Server-Sent Events: one `menu` event per finished dish, then `overview` and `done` (or `error`)."""
+    place_id = request.args.get('place_id')
+    if not place_id:
+        return jsonify({'error': 'Missing place_id'}), 400
+
+    def generate():
+        for event in event_bus.stream(summaries_channel(place_id)):
+            yield format_sse(event)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
 
 @app.route('/collage_images', methods=['POST'])
 def run_collage_images():
@@ -218,28 +386,42 @@ def run_collage_images():
     place_id = data.get('place_id')
     if not place_id:
         return jsonify({'error': 'Missing place_id'}), 400
-    
-    save_collage_parallel(place_id)
-
-    collage_images = {}
-    src_review_urls = {}
-    collage_dir = osp.dirname(osp.dirname(COLLAGE_SRC_PATH_TEMPLATE)).format(place_id=place_id)
-    for menu_id in os.listdir(collage_dir):
-        menu_path = osp.join(collage_dir, menu_id)
-        
-        collage_images[menu_id] = []
-        src_review_urls[menu_id] = []
-
-        rank_urls_dict = load_json(osp.join(menu_path, "src_review_urls.json"))
-        for rank, url in rank_urls_dict.items():
-            src_review_urls[menu_id].append(url)
-            collage_images[menu_id].append(f"{rank}.png")
-    
-    return jsonify({
-        "collage": collage_images,
-        "src_review_urls": src_review_urls,
-        "message": "Collage images retrieved."
-    })
+    return _run_stage("collage_images", place_id, {})
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job state; once it has finished, `result` holds what the stage endpoint would have returned."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    response = _job_links(job)
+    result = job_manager.result(job_id)
+    if result is not None:
+        response["result"] = result[0]
+    return jsonify(response)
+
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job(job_id):
+    """Server-Sent Events: `status` and `progress` updates with the job state, then `done` or `error`."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def generate():
+        if job["status"] in FINAL_STATES:
+            # Finished before this process started (or its history was trimmed)
+            yield format_sse({"id": 0, "type": "done" if job["status"] == "succeeded" else "error", "data": job})
+            return
+        for event in event_bus.stream(job_channel(job_id)):
+            yield format_sse(event)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
 
 
 @app.route('/nanobanana_image', methods=['POST'])
@@ -255,24 +437,29 @@ def run_nanobanana_image():
         }), 400
 
     try:
-        if osp.exists(NANOBANANA_IMAGE_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id)):
-            time.sleep(7)
-            success, msg = True, "Read nanobanana image from local file."
-        else:
-            success, msg = generate_from_collage(place_id, menu_id)
+        # Generation runs in the background; repeated calls for the same dish share one job
+        job = nanobanana_queue.submit(place_id, menu_id)
    
-        if success:
+        if job["status"] == "created":
+            image_path = NANOBANANA_IMAGE_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id)
             return jsonify({
                 "status": "created",
-                "nanobanana": f'{menu_id}.png',
-                "message": msg or "Nanobanana image created.",
+                "nanobanana": f'{menu_id}.png?v={content_version(image_path)}',
+                "message": job["message"] or "Nanobanana image created.",
             }), 200
-        # call_nanobanana() returned None — no image generated
-        return jsonify({
-            "status": "no_image",
-            "error": "No image generated",
-            "message": msg or "Nanobanana returned no image for this menu.",
-        }), 404
+        if job["status"] == "no_image":
+            # call_nanobanana() returned None — no image generated
+            return jsonify({
+                "status": "no_image",
+                "error": "No image generated",
+                "message": job["message"] or "Nanobanana returned no image for this menu.",
+            }), 404
+        if job["status"] in ("queued", "running"):
+            return jsonify({
+                "status": job["status"],
+                "message": "Nanobanana image is being generated. Poll this endpoint again.",
+            }), 202
+        raise RuntimeError(job["message"])
     except Exception:
         return jsonify({
             "status": "failed",
@@ -288,42 +475,86 @@ def get_results():
         return jsonify({'error': 'Missing place_id'}), 400
     
     try:
-        menu_path = MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id)
-        if not os.path.exists(menu_path):
+        artifact_sync.prefetch(place_id)
+        index = load_menu_index(place_id)
+        if index is None:
             return jsonify({'error': 'Results not found for this restaurant'}), 404
             
-        menus = load_json(menu_path)
-        
-        # Structure it for the frontend
-        results = []
-        for menu_id, details in menus.items():
-            results.append({
-                "id": menu_id,
-                "title": details.get("name", f"Menu {menu_id}"),
-                "description": details.get("description", ""),
-                "imageUrl": f"/api/images/{place_id}/{menu_id}" # Placeholder or real path
-            })
-            
         return jsonify({
             "restaurant_name": "Restaurant Name", # Could be fetched from metadata
-            "menus": results
+            "menus": index.results
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/data/<place_id>/nanobanana/<filename>')
-def serve_nanobanana(place_id, filename):
+@app.route('/results/bundle', methods=['GET'])
+def get_results_bundle():
+    """
+    Menus, overview, collage and NanoBanana URLs of a finished place as one precompressed document.
+    Served with a strong ETag; clients revalidate with If-None-Match and get 304 while nothing changed.
+    """
+    place_id = request.args.get('place_id')
+    if not place_id:
+        return jsonify({'error': 'Missing place_id'}), 400
+
+    try:
+        artifact_sync.prefetch(place_id)
+        if not _results_ready(place_id):
+            return jsonify({'error': 'Results not ready for this restaurant'}), 404
+        bundle = load_result_bundle(place_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    if request.if_none_match.contains(bundle.etag):
+        response = Response(status=304)
+    else:
+        accepted = [encoding for encoding in ("br", "gzip") if request.accept_encodings[encoding] > 0]
+        body, encoding = bundle.body(accepted)
+        response = Response(body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(bundle.etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _send_image_variant(directory, filename):
+    """
+    Serves a pipeline PNG as the requested size variant (`?size=thumb|detail`, default detail),
+    encoded as AVIF/WebP when the client's Accept header allows it.
+    Versioned URLs (`?v=`) are cached as immutable.
+    """
     if not filename.endswith('.png'):
         return "Not found", 404
-    return send_from_directory(os.path.join(DATA_DIR, place_id, "nanobanana"), filename)
+    size = request.args.get('size', 'detail')
+    if size not in IMAGE_VARIANT_SIZES:
+        return jsonify({'error': f"Unknown size '{size}'"}), 400
+    src_path = safe_join(str(directory), filename)
+    if src_path is None or not osp.isfile(src_path):
+        return "Not found", 404
+
+    fmt = negotiate_format(request.headers.get('Accept', ''))
+    response = send_file(get_variant(src_path, size, fmt), mimetype=variant_mimetype(fmt), conditional=True, etag=True)
+    response.headers['Vary'] = 'Accept'
+    if request.args.get('v'):
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
+
+
+@app.route('/data/<place_id>/nanobanana/<filename>')
+def serve_nanobanana(place_id, filename):
+    artifact_sync.prefetch(place_id)
+    return _send_image_variant(os.path.join(DATA_DIR, place_id, "nanobanana"), filename)
 
 
 @app.route('/data/<place_id>/collage/<menu_id>/<filename>')
 def serve_collage(place_id, menu_id, filename):
-    if not filename.endswith('.png'):
-        return "Not found", 404
-    return send_from_directory(os.path.join(DATA_DIR, place_id, "collage_src", menu_id), filename)
+    artifact_sync.prefetch(place_id)
+    return _send_image_variant(os.path.join(DATA_DIR, place_id, "collage_src", menu_id), filename)
 
 
 if __name__ == "__main__":
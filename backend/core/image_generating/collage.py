@@ -2,23 +2,31 @@ import argparse
 import os.path as osp
 import os
 import tqdm
-import json
 
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from concurrent.futures import as_completed, wait, FIRST_COMPLETED
 
 import requests
+from requests.adapters import HTTPAdapter
 from io import BytesIO
 from PIL import Image
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 
-from menu_listing.constants import PID_RNAME_MAPPING
-from image_generating.constants import EMBED_DIM, COLLAGE_TOPK, MAX_IMAGE_PER_REVIEW
-from utils.path_utils import IMAGE_EMBEDDING_PATH_TEMPLATE, MENU_METADATA_PATH_TEMPLATE, COLLAGE_PATH_TEMPLATE, COLLAGE_SRC_PATH_TEMPLATE, SCRAPED_REVIEW_PATH_TEMPLATE
-from utils.helpers import load_json, get_curr_time
+from image_generating.constants import (
+    EMBED_DIM,
+    COLLAGE_TOPK,
+    MAX_IMAGE_PER_REVIEW,
+    IMAGE_FETCH_TIMEOUT,
+    IMAGE_FETCH_SPARE
+)
+from image_generating.compositor import save_collage
+from utils.path_utils import IMAGE_EMBEDDING_PATH_TEMPLATE, COLLAGE_PATH_TEMPLATE, COLLAGE_SRC_PATH_TEMPLATE
+from utils.helpers import save_json, get_curr_time
+from utils.menu_store import read_menus
+from utils.review_table import load_review_table
+from utils.pools import SHARED_POOL_SIZES, rate_limiter, shared_pool
+from utils.place_registry import place_registry
+from utils.artifact_store import artifact_sync
 
 import warnings
 # Suppress specific Google/Vertex AI warnings globally
@@ -28,88 +36,188 @@ from vertexai.vision_models import MultiModalEmbeddingModel
 mm_embedding_model = MultiModalEmbeddingModel.from_pretrained("multimodalembedding")
 verbose = False
 
-def filter_menu_images(df, menu):    
-    
-    menu_image_idx = df['review_id'].isin([str(review_id) for review_id in menu['from_reviews']['relevant_review_ids']])
-    menu_df = df[menu_image_idx & df['likely_food']].drop(columns=['likely_food', 'published_date'])
-    if verbose:
-        print(
-            f"\n\n{len(menu['from_reviews']['relevant_review_ids'])} reviews mentioned <{menu   ['from_menuboard']['name']}>, found total {menu_image_idx.sum()} images "
-            f"where {len(menu_df)} is identified as likely food images.")
-        
-    if len(menu_df) == 0: return menu_df
-    image_embeddings = np.vstack(menu_df[f'embedding_{EMBED_DIM}'].to_list())
-    
-    query_text = menu['from_reviews']['appearance']
-    query_embedding = mm_embedding_model.get_embeddings(
-        contextual_text=query_text,
-        dimension=EMBED_DIM
-        ).text_embedding
-    query_embedding = np.array(query_embedding).reshape(1, -1)
-
-    menu_df['similarity'] = cosine_similarity(image_embeddings, query_embedding).reshape(-1)
-    menu_df_filtered = pd.DataFrame()
-    for review_id, group in menu_df.groupby('review_id'):
-        topk = group.nlargest(MAX_IMAGE_PER_REVIEW, 'similarity')
-        menu_df_filtered = pd.concat([menu_df_filtered, topk.drop(columns=[c for c in topk.columns if c.startswith('embedding_')])], axis=0)
-
-    menu_df_filtered = menu_df_filtered.sort_values(by='similarity', ascending=False).reset_index(drop=True)
-
-    return menu_df_filtered
-
-def define_grid_dimensions(num_images):
-    if num_images <= 3:
-        return (1, num_images)
-    elif num_images <= 6:
-        return (2, (num_images + 1) // 2)
-    else:
-        return (3, (num_images + 2) // 3)
+# Shared by all dishes: pooled keep-alive connections and a bounded number of downloads in flight
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=SHARED_POOL_SIZES["download"]))
+http_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=SHARED_POOL_SIZES["download"]))
+fetch_executor = shared_pool("download")
+
+def embed_appearance_texts(menus):
+    """
+    Embeds every menu's `appearance` text in one up-front pass.
+    The multimodal model takes one text per request, so distinct texts are
+    embedded concurrently on the shared embedding pool and identical texts only once.
+    Returns {menu_id: embedding}; menus whose embedding failed are left out.
+    """
+    texts = {
+        menu_id: menu['from_reviews']['appearance']
+        for menu_id, menu in menus.items()
+        if menu.get('from_reviews') and menu['from_reviews'].get('appearance')
+    }
+
+    def _embed(text):
+        rate_limiter("embedding").acquire()
+        return np.array(mm_embedding_model.get_embeddings(contextual_text=text, dimension=EMBED_DIM).text_embedding)
+
+    embeddings = {}
+    executor = shared_pool("embedding")
+    future_to_text = {executor.submit(_embed, text): text for text in set(texts.values())}
+    for future in as_completed(future_to_text):
+        try:
+            embeddings[future_to_text[future]] = future.result()
+        except Exception as e:
+            print(f"[{get_curr_time()}] Appearance embedding failed: {e}")
+    return {menu_id: embeddings[text] for menu_id, text in texts.items() if text in embeddings}
+
+def _normalize_rows(x):
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.where(norms == 0, 1, norms)
+
+def select_menu_images(df, menus, query_embeddings):
+    """
+    Ranks the place's likely-food images for all menus at once.
+    One matrix product scores every image against every menu's appearance embedding;
+    the best MAX_IMAGE_PER_REVIEW images per (menu, review) are then kept with a
+    single sort-and-rank over all candidate pairs.
+    Returns {menu_id: DataFrame sorted by similarity} (empty for menus without images).
+    """
+    food_df = df[df['likely_food']].drop(columns=['likely_food', 'published_date']).reset_index(drop=True)
+    embedding_cols = [c for c in food_df.columns if c.startswith('embedding_')]
+    info_df = food_df.drop(columns=embedding_cols)
+    empty = info_df.iloc[0:0].assign(similarity=pd.Series(dtype=float))
+
+    menu_ids = [menu_id for menu_id in menus if menu_id in query_embeddings]
+    results = {menu_id: empty for menu_id in menus}
+    if food_df.empty or not menu_ids:
+        return results
+
+    image_embeddings = _normalize_rows(np.vstack(food_df[f'embedding_{EMBED_DIM}'].to_list()))
+    menu_embeddings = _normalize_rows(np.vstack([query_embeddings[menu_id] for menu_id in menu_ids]))
+    similarities = image_embeddings @ menu_embeddings.T  # images x menus
+
+    # Candidate (menu, image) pairs: images of the reviews that mention each menu
+    image_pos_by_review = food_df.groupby('review_id').indices
+    menu_cols, image_pos = [], []
+    for col, menu_id in enumerate(menu_ids):
+        # A review listed twice must not contribute its images twice
+        relevant = list(dict.fromkeys(str(rid) for rid in menus[menu_id]['from_reviews']['relevant_review_ids']))
+        positions = [image_pos_by_review[rid] for rid in relevant if rid in image_pos_by_review]
+        positions = np.concatenate(positions) if positions else np.empty(0, dtype=int)
+        if len(positions):
+            menu_cols.append(np.full(len(positions), col))
+            image_pos.append(positions)
+        if verbose:
+            print(f"{len(relevant)} reviews mentioned <{menus[menu_id]['from_menuboard']['name']}>, "
+                  f"found {len(positions)} likely food images.")
+    if not image_pos:
+        return results
+
+    menu_cols, image_pos = np.concatenate(menu_cols), np.concatenate(image_pos)
+    pairs = pd.DataFrame({
+        'menu_col': menu_cols,
+        'image_pos': image_pos,
+        'review_id': food_df['review_id'].values[image_pos],
+        'similarity': similarities[image_pos, menu_cols],
+    })
+    pairs = pairs.sort_values(['menu_col', 'similarity'], ascending=[True, False], kind='mergesort')
+    pairs = pairs[pairs.groupby(['menu_col', 'review_id']).cumcount() < MAX_IMAGE_PER_REVIEW]
+
+    for col, group in pairs.groupby('menu_col', sort=False):
+        selected = info_df.iloc[group['image_pos'].values].copy()
+        selected['similarity'] = group['similarity'].values
+        results[menu_ids[col]] = selected.reset_index(drop=True)
+    return results
+
+def filter_menu_images(df, menu):
+    """Single-menu form of `select_menu_images`."""
+    key = str(menu.get('id', 'menu'))
+    return select_menu_images(df, {key: menu}, embed_appearance_texts({key: menu}))[key]
 
 def get_review_url_dict(place_id):
-    reviews = load_json(SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id))
-    return {int(review['id']): review['reviewUrl'] for review in reviews}
+    return load_review_table(place_id).review_url_dict()
+
+def fetch_image(url):
+    """Downloads and decodes one photo; returns None on any failure."""
+    try:
+        rate_limiter("download").acquire()
+        response = http_session.get(url, timeout=IMAGE_FETCH_TIMEOUT)
+        response.raise_for_status()
+        return Image.open(BytesIO(response.content)).convert("RGB")
+    except Exception as e:
+        if verbose: print(f"[{get_curr_time()}] Image fetch failed for {url}: {e}")
+        return None
+
+def _first_k_settled(results, k):
+    """True once the k best-ranked successful downloads are known (no better rank still pending)."""
+    n_ok = 0
+    for rank in range(len(results) + 1):
+        if rank not in results:
+            return False
+        n_ok += results[rank] is not None
+        if n_ok >= k:
+            return True
+    return False
+
+def fetch_ranked_images(urls, k=COLLAGE_TOPK, spare=IMAGE_FETCH_SPARE):
+    """
+    Fetches the first `k` usable images in rank order.
+    Up to `k + spare` candidates are requested speculatively; every failure pulls in
+    the next-ranked URL, and fetching stops once the top `k` usable ranks are settled.
+    Returns [(rank, image)] in rank order.
+    """
+    results, pending, next_rank = {}, {}, 0
+
+    def _top_up():
+        nonlocal next_rank
+        n_ok = sum(img is not None for img in results.values())
+        while next_rank < len(urls) and n_ok + len(pending) < k + spare:
+            pending[fetch_executor.submit(fetch_image, urls[next_rank])] = next_rank
+            next_rank += 1
+
+    _top_up()
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            results[pending.pop(future)] = future.result()
+        if _first_k_settled(results, k):
+            break
+        _top_up()
 
-def save_topk_and_collage(menu_df_filtered, place_id, menu_id):
+    for future in pending:
+        future.cancel()
+    ranked = [(rank, results[rank]) for rank in sorted(results) if results[rank] is not None]
+    return ranked[:k]
+
+def save_topk_and_collage(menu_df_filtered, place_id, menu_id, review_url_dict=None):
     if len(menu_df_filtered) == 0: return None
 
-    review_url_dict = get_review_url_dict(place_id)
+    if review_url_dict is None:
+        review_url_dict = get_review_url_dict(place_id)
+
+    ranked = fetch_ranked_images(menu_df_filtered['image_url'].tolist())
+    if not ranked: return None
 
     os.makedirs(osp.dirname(COLLAGE_SRC_PATH_TEMPLATE).format(place_id=place_id, menu_id=menu_id), exist_ok=True)
     images = []
     rank_review_url_pairs = {}
-    for rank,  row in menu_df_filtered.iterrows():
-        review_id = row['review_id']
+    for rank, img in ranked:
+        review_id = menu_df_filtered['review_id'].iloc[rank]
         rank_review_url_pairs[rank] = review_url_dict[int(review_id)]
-        response = requests.get(row['image_url'])
-        img = Image.open(BytesIO(response.content)).convert("RGB")
         img.save(COLLAGE_SRC_PATH_TEMPLATE.format(place_id=place_id,
                                                   menu_id=menu_id,
                                                   rank= rank
                                                   ))
         images.append(img)
-        if len(images) >= COLLAGE_TOPK:
-            break
     
-    with open(osp.join(osp.dirname(COLLAGE_SRC_PATH_TEMPLATE).format(place_id=place_id, menu_id=menu_id), 'src_review_urls.json'), "w") as f:
-        json.dump(rank_review_url_pairs, f, indent=2)
+    save_json(osp.join(osp.dirname(COLLAGE_SRC_PATH_TEMPLATE).format(place_id=place_id, menu_id=menu_id), 'src_review_urls.json'),
+              rank_review_url_pairs)
 
-    nrow, ncol = define_grid_dimensions(len(images))
-    fig, axs = plt.subplots(nrow, ncol, figsize=(5*ncol, 5*nrow))
+    # One canvas sized for NanoBanana, encoded once (no figure rendering)
+    save_collage(images, COLLAGE_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id))
 
-    for idx, ax in enumerate(np.array(axs).reshape(-1)):
-        if idx < len(images):
-            ax.imshow(images[idx])
-        ax.axis('off')
-
-    # Instance-level adjustment is thread-safe; global plt.subplots_adjust is not
-    fig.subplots_adjust(left=0, right=1, top=1, bottom=0, wspace=0, hspace=0)
-    
-    save_path = COLLAGE_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id)
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    
-    # bbox_inches='tight' forces the removal of any remaining white space
-    fig.savefig(save_path, bbox_inches='tight', pad_inches=0)
-    plt.close(fig)
+    for rank, _ in ranked:
+        artifact_sync.publish(COLLAGE_SRC_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id, rank=rank))
+    artifact_sync.publish(COLLAGE_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id))
 
     return True
 
@@ -117,23 +225,23 @@ if __name__ == "__main__":
    
     argparser = argparse.ArgumentParser()
     argparser.add_argument("--place_id", type=str, required=True, help="Google Place ID for the restaurant")
-    argparser.add_argument("--menu_id", type=int, required=False, default=-1, help="Menu ID to generate collage for")
+    argparser.add_argument("--menu_id", type=str, required=False, default="-1", help="Menu ID to generate collage for")
     argparser.add_argument("--verbose", '-v', action='store_true', help="Enable verbose output")
     args = argparser.parse_args()
     place_id = args.place_id
     menu_id = args.menu_id
     verbose = args.verbose
 
-    print(f"=== Restaurant: {PID_RNAME_MAPPING[place_id]} ({place_id}) ===\n")
+    print(f"=== Restaurant: {place_registry.name(place_id)} ({place_id}) ===\n")
 
     parquet_path = IMAGE_EMBEDDING_PATH_TEMPLATE.format(place_id=place_id)  
     df = pd.read_parquet(parquet_path)
     assert 'likely_food' in df.columns, "Please run script to add 'likely_food' column first"
 
-    menus = load_json(MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id))
+    menus = read_menus(place_id)
     
-    assert menu_id in menus.keys() or menu_id == -1, f"Menu ID {menu_id} not found for place {place_id}"
-    if menu_id == -1: menu_ids = list(menus.keys())
+    assert menu_id in menus.keys() or menu_id == "-1", f"Menu ID {menu_id} not found for place {place_id}"
+    if menu_id == "-1": menu_ids = list(menus.keys())
     else: menu_ids = [menu_id]
 
     pbar = tqdm.tqdm(menu_ids)
@@ -149,15 +257,11 @@ if __name__ == "__main__":
         else:
             pbar.set_description(f"Processing Menu[{menu_id}] {menu['from_menuboard']['name']}")
 
-        menu_df_filtered = filter_menu_images(df, menu, max_image_per_review=2, embed_dim=EMBED_DIM)
-        collage = collage_topk_images(menu_df_filtered, collage_topk=9)
+        menu_df_filtered = filter_menu_images(df, menu)
+        success = save_topk_and_collage(menu_df_filtered, place_id=place_id, menu_id=menu_id)
 
-        if collage is None:
+        if not success:
             if verbose: print(f"No images found for Menu[{menu_id}] {menu['from_menuboard']['name']}, skipping collage generation.")
             continue
 
-        os.makedirs(COLLAGE_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id), exist_ok=True)
-        collage_path = COLLAGE_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id)
-        collage.savefig(collage_path)
-        plt.close(collage)
-        if verbose: print(f"Collage saved to {collage_path}")
\ No newline at end of file
+        if verbose: print(f"Collage saved to {COLLAGE_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id)}")
@@ -0,0 +1,150 @@
+import os
+from io import BytesIO
+from typing import List, Tuple, Union
+
+from PIL import Image
+
+from image_generating.constants import COLLAGE_CANVAS_SIZE
+
+ImageSource = Union[bytes, Image.Image]
+
+
+def define_grid_dimensions(num_images):
+    if num_images <= 3:
+        return (1, num_images)
+    elif num_images <= 6:
+        return (2, (num_images + 1) // 2)
+    else:
+        return (3, (num_images + 2) // 3)
+
+
+def tile_size_for(num_images: int, canvas_size: int = COLLAGE_CANVAS_SIZE) -> Tuple[int, int]:
+    """Square tile side and (nrow, ncol) so the longer side of the collage is `canvas_size`."""
+    nrow, ncol = define_grid_dimensions(num_images)
+    return canvas_size // max(nrow, ncol), (nrow, ncol)
+
+
+def decode_tile(source: ImageSource, tile: int) -> Image.Image:
+    """
+    Decodes an image straight to tile resolution and letterboxes it on a white square,
+    keeping the whole photo in frame as the matplotlib grid did (imshow fits, never crops).
+    For encoded JPEG bytes, draft mode lets the decoder downscale by up to 8x
+    while decoding, so the full-size bitmap is never materialized.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        img = Image.open(BytesIO(source))
+        img.draft("RGB", (tile, tile))
+    else:
+        img = source
+    img = img.convert("RGB")
+    # Fit the longer side to the tile, resized in one pass (reduce() first for large downscales)
+    scale = tile / max(img.size)
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    fitted = img.resize(size, Image.BILINEAR, reducing_gap=2.0)
+    if size == (tile, tile):
+        return fitted
+    square = Image.new("RGB", (tile, tile), "white")
+    square.paste(fitted, ((tile - size[0]) // 2, (tile - size[1]) // 2))
+    return square
+
+
+def compose_collage(sources: List[ImageSource], canvas_size: int = COLLAGE_CANVAS_SIZE) -> Image.Image:
+    """Pastes the images row by row into the `define_grid_dimensions` grid on one canvas."""
+    tile, (nrow, ncol) = tile_size_for(len(sources), canvas_size)
+    canvas = Image.new("RGB", (ncol * tile, nrow * tile), "white")
+    for idx, source in enumerate(sources):
+        row, col = divmod(idx, ncol)
+        canvas.paste(decode_tile(source, tile), (col * tile, row * tile))
+    return canvas
+
+
+def save_collage(sources: List[ImageSource], save_path: str, canvas_size: int = COLLAGE_CANVAS_SIZE) -> str:
+    """Composes and encodes the collage once; the format follows the file extension."""
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    # Photo content barely compresses further at higher PNG levels, which cost several times the time
+    compose_collage(sources, canvas_size).save(save_path, compress_level=1)
+    return save_path
+
+
+def _render_matplotlib(sources: List[bytes], save_path: str):
+    """Previous matplotlib rendering, kept as the benchmark baseline."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    images = [Image.open(BytesIO(data)).convert("RGB") for data in sources]
+    nrow, ncol = define_grid_dimensions(len(images))
+    fig, axs = plt.subplots(nrow, ncol, figsize=(5*ncol, 5*nrow))
+    for idx, ax in enumerate(np.array(axs).reshape(-1)):
+        if idx < len(images):
+            ax.imshow(images[idx])
+        ax.axis('off')
+    fig.subplots_adjust(left=0, right=1, top=1, bottom=0, wspace=0, hspace=0)
+    fig.savefig(save_path, bbox_inches='tight', pad_inches=0)
+    plt.close(fig)
+
+
+def _benchmark_worker(method: str, sources: List[bytes], repeat: int, out_dir: str, queue):
+    """Runs one renderer in a fresh process and reports (s/collage, peak RSS MB, size, bytes)."""
+    import resource
+    import time
+
+    render = save_collage if method == "pillow" else _render_matplotlib
+    save_path = os.path.join(out_dir, f"{method}.png")
+    render(sources, save_path)  # warm-up (imports, first-call setup)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        render(sources, save_path)
+    elapsed = (time.perf_counter() - start) / repeat
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    with Image.open(save_path) as out:
+        size = out.size
+    queue.put((elapsed, peak_mb, size, os.path.getsize(save_path)))
+
+
+def _synthetic_jpegs(n: int, size=(1024, 768)) -> List[bytes]:
+    import random
+    rng = random.Random(0)
+    sources = []
+    for _ in range(n):
+        img = Image.effect_noise(size, 64).convert("RGB")
+        img = Image.blend(img, Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3))), 0.5)
+        buf = BytesIO()
+        img.save(buf, format="JPEG", quality=90)
+        sources.append(buf.getvalue())
+    return sources
+
+
+if __name__ == "__main__":
+    # Benchmark: Pillow compositor vs. matplotlib rendering, each in a fresh process
+    import argparse
+    import glob
+    import tempfile
+    from multiprocessing import get_context
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--image_dir", type=str, default=None, help="Directory of JPEG/PNG images (default: synthetic 1024x768 JPEGs)")
+    parser.add_argument("--num_images", type=int, default=9)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.image_dir:
+        paths = sorted(glob.glob(os.path.join(args.image_dir, "*")))[:args.num_images]
+        sources = [open(p, "rb").read() for p in paths]
+    else:
+        sources = _synthetic_jpegs(args.num_images)
+
+    ctx = get_context("spawn")
+    with tempfile.TemporaryDirectory() as out_dir:
+        for method in ["matplotlib", "pillow"]:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_benchmark_worker, args=(method, sources, args.repeat, out_dir, queue))
+            proc.start()
+            proc.join()
+            if proc.exitcode != 0:
+                print(f"{method:>10}: failed (exit code {proc.exitcode})")
+                continue
+            elapsed, peak_mb, size, n_bytes = queue.get()
+            print(f"{method:>10}: {elapsed * 1000:8.1f} ms/collage | peak RSS {peak_mb:7.1f} MB | "
+                  f"{size[0]}x{size[1]} | {n_bytes / 1024:.0f} KB")
@@ -8,8 +8,18 @@ API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 
 EMBED_DIM = 128
 COLLAGE_TOPK = 9
+# Longer side of the collage sent to NanoBanana, which generates 1K (1024px) 1:1 images
+COLLAGE_CANVAS_SIZE = 1024
 MAX_IMAGE_PER_REVIEW = 2
 
+# Photo downloads for collages (run on the shared "download" pool in utils.pools): (connect, read)
+# timeout in seconds, and how many candidates beyond the still-missing ones are requested speculatively per dish
+IMAGE_FETCH_TIMEOUT = (3.05, 10)
+IMAGE_FETCH_SPARE = 3
+
 NANOBANANA_MODEL_NAME = 'gemini-3-pro-image-preview'
+# Background generation: concurrent NanoBanana calls, and dishes pre-generated once collages exist
+NANOBANANA_WORKERS = 2
+NANOBANANA_PREGENERATE_TOP_N = 3
 with open(os.path.join(PROJECT_ROOT, 'core/image_generating', 'prompt_template.txt'), 'r') as file:
     PROMPT_TEMPLATE = file.read()
@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from image_generating.constants import NANOBANANA_WORKERS, NANOBANANA_PREGENERATE_TOP_N
+from image_generating.pipeline import generate_from_collage, nanobanana_is_fresh
+from utils.menu_store import read_index
+from utils.helpers import get_curr_time
+from utils.path_utils import COLLAGE_PATH_TEMPLATE
+
+# Job states; "created", "no_image" and "failed" are final
+QUEUED, RUNNING, CREATED, NO_IMAGE, FAILED = "queued", "running", "created", "no_image", "failed"
+
+
+class NanobananaQueue:
+    """
+    Background NanoBanana generation with single-flight dedup.
+    Concurrent requests for the same (place_id, menu_id) share one job, so a dish is
+    generated (and paid for) once; up-to-date images on disk are reported without a job,
+    and images whose collage or prompt changed are regenerated.
+    A failure is reported once; the request after that queues a new attempt.
+    """
+
+    def __init__(self, max_workers: int = NANOBANANA_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._jobs: Dict[Tuple[str, str], Dict] = {}
+
+    def _run(self, key: Tuple[str, str]):
+        place_id, menu_id = key
+        with self._lock:
+            self._jobs[key].update(status=RUNNING, started_at=time.time())
+        try:
+            success, msg = generate_from_collage(place_id, menu_id)
+            status = CREATED if success else NO_IMAGE
+        except Exception as e:
+            success, status, msg = False, FAILED, str(e)
+            print(f"[{get_curr_time()}] NanoBanana generation failed for [{menu_id}] of {place_id}: {e}")
+        with self._lock:
+            self._jobs[key].update(status=status, message=msg, finished_at=time.time())
+
+    def submit(self, place_id: str, menu_id: str) -> Dict:
+        """Returns the current job state for the dish, queueing a generation if none is pending."""
+        key = (place_id, str(menu_id))
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job["status"] in (QUEUED, RUNNING):
+                return dict(job)
+        if nanobanana_is_fresh(place_id, str(menu_id)):
+            return {"status": CREATED, "message": "Read nanobanana image from local file."}
+
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job["status"] == FAILED:
+                return dict(self._jobs.pop(key))
+            if job is None or job["status"] == CREATED:  # never generated, or stale since
+                job = {"status": QUEUED, "message": None, "queued_at": time.time()}
+                self._jobs[key] = job
+                self._executor.submit(self._run, key)
+            return dict(job)
+
+    def get(self, place_id: str, menu_id: str) -> Dict:
+        with self._lock:
+            job = self._jobs.get((place_id, str(menu_id)))
+            return dict(job) if job else None
+
+    def pregenerate_popular(self, place_id: str, top_n: int = NANOBANANA_PREGENERATE_TOP_N) -> List[str]:
+        """Queues the `top_n` most-mentioned dishes that already have a collage."""
+        # The menu index is already ordered by review mentions
+        popular = [entry["menu_id"] for entry in read_index(place_id) if entry["summarized"]]
+        queued = []
+        for menu_id in popular:
+            if len(queued) >= top_n:
+                break
+            if not os.path.exists(COLLAGE_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id)):
+                continue
+            self.submit(place_id, menu_id)
+            queued.append(menu_id)
+        print(f"[{get_curr_time()}] Queued NanoBanana pre-generation for {queued}")
+        return queued
+
+
+nanobanana_queue = NanobananaQueue()
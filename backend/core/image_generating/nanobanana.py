@@ -5,6 +5,7 @@ from google import genai
 from google.genai import types
 
 from utils.helpers import get_curr_time
+from utils.pools import rate_limiter
 from image_generating.constants import (
     API_KEY, 
     NANOBANANA_MODEL_NAME, 
@@ -64,6 +65,7 @@ def call_nanobanana(
     for attempt in range(max_retries + 1):
         try:
             # Construct the request
+            rate_limiter("nanobanana").acquire()
             response = client.models.generate_content(
                 model=NANOBANANA_MODEL_NAME,
                 contents=[
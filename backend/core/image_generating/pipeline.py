@@ -2,27 +2,42 @@ import os
 import argparse
 import numpy as np
 import pandas as pd
-import matplotlib
-matplotlib.use('Agg')
-from matplotlib import pyplot as plt
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
-from image_generating.collage import filter_menu_images, save_topk_and_collage
+from image_generating.collage import embed_appearance_texts, select_menu_images, save_topk_and_collage, get_review_url_dict
 from image_generating.nanobanana import call_nanobanana, prepare_prompt
 from image_generating.constants import NANOBANANA_MODEL_NAME
-from utils.helpers import load_json, get_curr_time
-from utils.path_utils import IMAGE_EMBEDDING_PATH_TEMPLATE, MENU_METADATA_PATH_TEMPLATE, COLLAGE_PATH_TEMPLATE, NANOBANANA_IMAGE_PATH_TEMPLATE
+from utils.helpers import get_curr_time
+from utils.menu_store import read_dish, read_menus
+from utils.manifest import digest_file, digest_text, is_fresh, write_manifest
+from utils.path_utils import IMAGE_EMBEDDING_PATH_TEMPLATE, COLLAGE_PATH_TEMPLATE, NANOBANANA_IMAGE_PATH_TEMPLATE
+
+def nanobanana_inputs(place_id, menu_id, menu):
+    """Fingerprints of one dish's generated image: its collage, the exact prompt and the model."""
+    return {
+        "collage": digest_file(COLLAGE_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id)),
+        "prompt": digest_text(prepare_prompt(menu)),
+        "model": NANOBANANA_MODEL_NAME,
+    }
+
+def nanobanana_is_fresh(place_id, menu_id):
+    """True if the dish's generated image exists and was built from its current collage and prompt."""
+    save_path = NANOBANANA_IMAGE_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id)
+    if not os.path.exists(save_path):
+        return False
+    menu = read_dish(place_id, menu_id)
+    if menu is None or menu.get('from_reviews') is None:
+        return True  # nothing to regenerate from; keep serving the existing image
+    return is_fresh(place_id, f"nanobanana/{menu_id}", nanobanana_inputs(place_id, menu_id, menu), [save_path])
 
 def generate_from_collage(place_id, menu_id):
-    menus = load_json(MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id))
-    if menus is None or not isinstance(menus, dict):
-        return False, "Menu metadata not found or invalid."
-    if menu_id not in menus:
+    menu = read_dish(place_id, menu_id)
+    if menu is None:
         return False, f"Menu {menu_id} not found in metadata."
-    menu = menus[menu_id]
     prompt = prepare_prompt(menu)
     collage_path = COLLAGE_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id)
+    inputs = nanobanana_inputs(place_id, menu_id, menu)
 
     out = call_nanobanana(
         image_path=collage_path,
@@ -36,19 +51,34 @@ def generate_from_collage(place_id, menu_id):
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
     with open(save_path, "wb") as img_file:
         img_file.write(out)
+    write_manifest(place_id, f"nanobanana/{menu_id}", inputs, [save_path])
     return True, f"Saved [{menu_id}]{menu_name}"
 
+def build_menu_collage(place_id, menu_id, menu, df, review_url_dict=None):
+    """
+    Builds one dish's collage as soon as its `appearance` summary exists.
+    `df` is the place's image embedding table; returns True if a collage was saved.
+    """
+    if not menu or not (menu.get('from_reviews') or {}).get('appearance'):
+        return False
+    filtered_df = select_menu_images(df, {menu_id: menu}, embed_appearance_texts({menu_id: menu}))[menu_id]
+    return bool(save_topk_and_collage(filtered_df, place_id=place_id, menu_id=menu_id, review_url_dict=review_url_dict))
+
 def save_collage_parallel(place_id):
     df = pd.read_parquet(IMAGE_EMBEDDING_PATH_TEMPLATE.format(place_id=place_id))
-    menus = load_json(MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id))
+    menus = read_menus(place_id)
     
     print(f"\n\n=== Per Menu Image Generation ===")
     print(f"[{get_curr_time()}] Forming collage for {len(menus)} menus...")
 
-    def _process_single_menu(place_id, menu_id, menu, df):
+    # Rank images for every menu in one step; per-menu threads only fetch and compose
+    menus = {menu_id: menu for menu_id, menu in menus.items() if menu['from_reviews'] is not None}
+    filtered_dfs = select_menu_images(df, menus, embed_appearance_texts(menus))
+    review_url_dict = get_review_url_dict(place_id)
+
+    def _process_single_menu(place_id, menu_id, menu, filtered_df):
         try:
-            filtered_df = filter_menu_images(df, menu)
-            success = save_topk_and_collage(filtered_df, place_id=place_id, menu_id=menu_id)
+            success = save_topk_and_collage(filtered_df, place_id=place_id, menu_id=menu_id, review_url_dict=review_url_dict)
             
             if not success:
                 return False, f"No images found for Menu[{menu_id}] {menu['from_menuboard']['name']}, skipping collage generation."
@@ -60,8 +90,7 @@ def save_collage_parallel(place_id):
     tasks = []
     with ThreadPoolExecutor(max_workers=10) as executor:
         for menu_id, menu in menus.items():
-            if menu['from_reviews'] is None: continue
-            tasks.append(executor.submit(_process_single_menu, place_id, menu_id, menu, df))
+            tasks.append(executor.submit(_process_single_menu, place_id, menu_id, menu, filtered_dfs[menu_id]))
             
         for future in tqdm(as_completed(tasks), total=len(tasks), desc="Processing Menus"):
             success, msg = future.result()
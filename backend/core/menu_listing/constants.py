@@ -12,13 +12,6 @@ load_dotenv(ENV_FILE)
 GCP_PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT")
 GCP_LOCATION = os.getenv("GOOGLE_CLOUD_REGION")
 
-# ==========================================
-# Restaurant & Place ID Mapping
-# ==========================================
-with open(PROJECT_ROOT / "data" / "mapping.json", "r") as f:
-    PID_RNAME_MAPPING = json.load(f)
-RNAME_PID_MAPPING = {v: k for k, v in PID_RNAME_MAPPING.items()}
-
 # ==========================================
 # Menu Board Search and reduction Parameters
 # ==========================================
@@ -20,8 +20,10 @@ from menu_listing.constants import (
     EMBED_DIM, 
     MAX_SIDE
 )
-from utils.path_utils import SCRAPED_REVIEW_PATH_TEMPLATE, IMAGE_EMBEDDING_PATH_TEMPLATE
+from utils.path_utils import IMAGE_EMBEDDING_PATH_TEMPLATE
 from utils.helpers import get_curr_time
+from utils.pools import SHARED_POOL_SIZES, rate_limiter, shared_pool
+from utils.review_table import load_review_table
 import time
 import random
 
@@ -42,6 +44,7 @@ def get_image_embedding_from_url(image_url: str, dimension: int) -> Tuple[List[f
         download_start = time.time()
         try:
             # 1. Download Image
+            rate_limiter("download").acquire()
             response = requests.get(image_url, stream=True, timeout=10)
             
             if response.status_code == 429:
@@ -54,6 +57,7 @@ def get_image_embedding_from_url(image_url: str, dimension: int) -> Tuple[List[f
 
             # 2. Generate Embedding
             embed_start = time.time()
+            rate_limiter("embedding").acquire()
             embedding_obj = mm_embedding_model.get_embeddings(
                 image=image,
                 dimension=dimension,
@@ -89,36 +93,27 @@ def load_or_create_parquet(file_path: str) -> pd.DataFrame:
 def generate_image_embeddings_from_json(
     place_id: str,
     dimension: int = EMBED_DIM,
-    max_workers: int = 20):
-    """Parses JSON, generates embeddings in parallel, and saves to local Parquet."""
+    max_workers: Optional[int] = None):
+    """
+    Reads image URLs from the review table, generates embeddings in parallel, and saves to local Parquet.
+    Runs on the process-wide embedding pool unless `max_workers` asks for a private one.
+    """
     
     col_name = f"embedding_{dimension}"
-    json_path = SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id)
-    assert os.path.exists(json_path), f"JSON file not found: {json_path}"
+    table = load_review_table(place_id)
+    assert table is not None, f"Scraped reviews not found for {place_id}"
     
     parquet_path = IMAGE_EMBEDDING_PATH_TEMPLATE.format(place_id=place_id)
     
     print(f"\n\n=== Image Embedding (Local Parquet) ===")
     
-    # 1. Load Reviews
-    with open(json_path, 'r') as f:
-        reviews = json.load(f)
-
-    # 2. Extract Images
+    # 1-2. Extract Images (only reviews that have any)
     all_images = []
-    print(f"[{get_curr_time()}] Loading image urls from scraped reviews...")
-    for review in reviews:
-        review_id = review.get("id")
-        p_at = review.get("publishedAtDate")
-        p_date = None
-        if p_at:
-            try:
-                dt = datetime.fromisoformat(p_at.replace('Z', '+00:00'))
-                p_date = dt.date().isoformat()
-            except ValueError:
-                pass
-        
-        for url in review.get("reviewImageUrls", []):
+    print(f"[{get_curr_time()}] Loading image urls from review table...")
+    for pos in np.flatnonzero(np.diff(table.image_offsets)).tolist():
+        review_id = str(table.ids[pos])
+        p_date = table.published_date(pos)
+        for url in table.image_urls(pos):
             all_images.append({
                 "review_id": review_id,
                 "image_url": url + f"=s{MAX_SIDE}",
@@ -174,7 +169,9 @@ def generate_image_embeddings_from_json(
         return df
 
     # 5. Parallel Processing
-    print(f"[{get_curr_time()}] Processing {len(to_process)} images in parallel (Target Dim: {dimension}, Workers: {max_workers})...")
+    n_workers = SHARED_POOL_SIZES["embedding"] if max_workers is None else max_workers
+    executor = shared_pool("embedding") if max_workers is None else ThreadPoolExecutor(max_workers=max_workers)
+    print(f"[{get_curr_time()}] Processing {len(to_process)} images in parallel (Target Dim: {dimension}, Workers: {n_workers})...")
     
     results_map = {} # url -> embedding
     total_download_time = 0.0
@@ -182,25 +179,26 @@ def generate_image_embeddings_from_json(
     successful_embeds = 0
 
     start_time = time.time()
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_item = {
-            executor.submit(get_image_embedding_from_url, item['image_url'], dimension): item 
-            for item in to_process
-        }
-        
-        for future in tqdm(as_completed(future_to_item), total=len(to_process), desc="Embedding Images", unit="img"):
-            item = future_to_item[future]
-            try:
-                embedding, down_time, embed_time = future.result()
-                
-                if embedding:
-                    results_map[item['image_url']] = embedding
-                    total_download_time += down_time
-                    total_embedding_time += embed_time
-                    successful_embeds += 1
-                
-            except Exception as e:
-                print(f"[{get_curr_time()}] Error processing {item['image_url']}: {e}")
+    future_to_item = {
+        executor.submit(get_image_embedding_from_url, item['image_url'], dimension): item 
+        for item in to_process
+    }
+    
+    for future in tqdm(as_completed(future_to_item), total=len(to_process), desc="Embedding Images", unit="img"):
+        item = future_to_item[future]
+        try:
+            embedding, down_time, embed_time = future.result()
+            
+            if embedding:
+                results_map[item['image_url']] = embedding
+                total_download_time += down_time
+                total_embedding_time += embed_time
+                successful_embeds += 1
+            
+        except Exception as e:
+            print(f"[{get_curr_time()}] Error processing {item['image_url']}: {e}")
+    if max_workers is not None:
+        executor.shutdown()
 
     end_time = time.time()
 
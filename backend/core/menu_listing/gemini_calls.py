@@ -13,6 +13,8 @@ from menu_listing.constants import (
     GEMINI_MODEL
 )
 from menu_listing.schema import MenuExtractionResponse
+from utils.response_cache import make_cache_key, cache_get, cache_set
+from utils.pools import rate_limiter
 
 def _call_gemini_v2(image_data: List[bytes], prompt_text: str, image_dates: List[str]) -> List[Dict[str, Any]]:
     """Inference using vertexai SDK (Gemini 2.5)."""
@@ -24,6 +26,7 @@ def _call_gemini_v2(image_data: List[bytes], prompt_text: str, image_dates: List
 
     model = GenerativeModel(GEMINI_MODEL)
     print(f"[{get_curr_time()}] Running {GEMINI_MODEL} for menu extraction...")
+    rate_limiter("gemini").acquire()
     response = model.generate_content(
         parts,
         generation_config=GenerationConfig(
@@ -42,15 +45,29 @@ def _call_gemini_v3(
 ) -> List[Dict[str, Any]]:
     """Inference using Gemini 3 Flash (google.genai SDK)."""
 
+    response_schema = MenuExtractionResponse.model_json_schema()
+    image_labels = [f"Image {idx+1} from {date}" for idx, date in enumerate(image_dates[:len(image_data)])]
+    cache_key = make_cache_key(
+        GEMINI_MODEL,
+        response_schema,
+        "\n".join([prompt_text] + image_labels),
+        image_parts=image_data
+    )
+    cached_text = cache_get(cache_key)
+    if cached_text is not None:
+        print(f"[{get_curr_time()}] Reusing cached {GEMINI_MODEL} menu extraction")
+        extraction = MenuExtractionResponse.model_validate_json(cached_text)
+        return [item.model_dump() for item in extraction.items]
+
     client = genai.Client(vertexai=True, location="global", project=GCP_PROJECT_ID)
 
     parts: List[types.Part] = [
         types.Part.from_text(text=prompt_text)
     ]
 
-    for idx, (data, date) in enumerate(zip(image_data, image_dates)):
+    for data, label in zip(image_data, image_labels):
         parts.append(
-            types.Part.from_text(text=f"Image {idx+1} from {date}")
+            types.Part.from_text(text=label)
         )
         parts.append(
             types.Part.from_bytes(
@@ -60,6 +77,7 @@ def _call_gemini_v3(
         )
     
     print(f"[{get_curr_time()}] Running {GEMINI_MODEL} for menu extraction...")
+    rate_limiter("gemini").acquire()
     response = client.models.generate_content(
         model=GEMINI_MODEL,
         contents=[
@@ -70,7 +88,7 @@ def _call_gemini_v3(
         ],
         config=types.GenerateContentConfig(
             response_mime_type="application/json",
-            response_schema=MenuExtractionResponse.model_json_schema(),
+            response_schema=response_schema,
             temperature=0,
             thinking_config=types.ThinkingConfig(thinking_level="minimal"),
         ),
@@ -80,6 +98,7 @@ def _call_gemini_v3(
     # print_usage_metadata(response)
 
     extraction = MenuExtractionResponse.model_validate_json(json_text)
+    cache_set(cache_key, json_text, model=GEMINI_MODEL)
     return [item.model_dump() for item in extraction.items]
 
 
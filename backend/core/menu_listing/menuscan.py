@@ -1,6 +1,3 @@
-import os
-import os.path as osp
-import json
 import datetime
 from datetime import timedelta
 from typing import List, Dict, Any, Tuple, Optional
@@ -24,7 +21,8 @@ from menu_listing.constants import (
     MIN_ISMENUBOARD_SIMILARITY,
     MENU_READ_PROMPT
 )
-from utils.path_utils import MENU_METADATA_PATH_TEMPLATE
+from utils.menu_store import write_menus
+from utils.pools import rate_limiter
 from utils.helpers import get_curr_time
 from menu_listing.schema import MenuExtractionResponse
 
@@ -193,6 +191,7 @@ def _download_images(image_urls: List[str]) -> List[bytes]:
     for url in image_urls:
         try:
             import requests
+            rate_limiter("download").acquire()
             resp = requests.get(url, timeout=10)
             if resp.status_code == 200:
                 image_data.append(resp.content)
@@ -227,18 +226,14 @@ def extract_menu_from_images(search_results, place_id: str) -> List[Dict[str, An
 
         print(f"[{get_curr_time()}] Successfully extracted {len(menu_items)} items")
 
-        output_json = MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id)
-        print(f"[{get_curr_time()}] Saving menus.json to: {output_json}")
-        os.makedirs(osp.dirname(output_json), exist_ok=True)
-        
         output_dict = dict()
         for i, item in enumerate(menu_items):
             output_dict[i] = {'from_menuboard': item}
             output_dict[i]['from_reviews'] = None
             
-        with open(output_json, "w") as f:
-            json.dump(output_dict, f, indent=2, ensure_ascii=False)
+        output_json = write_menus(place_id, output_dict)
         print(f"[{get_curr_time()}] Extracted menu data saved to: {output_json}")
+        return menu_items
         
     except Exception as e:
         import traceback
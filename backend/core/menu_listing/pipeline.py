@@ -1,17 +1,46 @@
 import warnings
-import json
 # Suppress specific Google/Vertex AI warnings globally
 warnings.filterwarnings("ignore", category=FutureWarning)
 warnings.filterwarnings("ignore", category=UserWarning)
 
 import argparse
+import os
 from menu_listing.embedding import generate_image_embeddings_from_json
 from menu_listing.menuscan import search_menu_boards, extract_menu_from_images, filter_non_food_images
-from menu_listing.constants import EMBED_DIM, PID_RNAME_MAPPING
-from utils.path_utils import IMAGE_EMBEDDING_PATH_TEMPLATE
+from menu_listing.constants import EMBED_DIM, GEMINI_MODEL, MENU_READ_PROMPT, MIN_DATE, MIN_ISMENUBOARD_SIMILARITY, TOP_K, N_CLUSTER
+from utils.helpers import load_json, save_json
+from utils.manifest import digest_text, digest_value, write_manifest
+from utils.path_utils import IMAGE_EMBEDDING_PATH_TEMPLATE, MENU_METADATA_PATH_TEMPLATE, MENUBOARD_CANDIDATES_PATH_TEMPLATE
+from utils.place_registry import place_registry
 
-def main(place_id):
+def menuboard_digest(place_id):
+    """
+    Digest of the menu-board candidate images the menu is read from, or None before the first search.
+    New reviews without a new menu board leave it unchanged, so they do not re-extract the menu.
+    """
+    path = MENUBOARD_CANDIDATES_PATH_TEMPLATE.format(place_id=place_id)
+    if not os.path.exists(path):
+        return None
+    return digest_value(sorted(candidate['image_url'] for candidate in load_json(path)[:TOP_K]))
+
+def menu_listing_inputs(place_id):
+    """Fingerprints the menu listing (menus.json base, image embeddings) is built from."""
+    return {
+        "menuboards": menuboard_digest(place_id),
+        "model": GEMINI_MODEL,
+        "prompt": digest_text(MENU_READ_PROMPT),
+        "embed_dim": EMBED_DIM,
+        "search": digest_value([MIN_DATE, MIN_ISMENUBOARD_SIMILARITY, TOP_K, N_CLUSTER]),
+    }
 
+def menu_listing_outputs(place_id):
+    return [
+        MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id),
+        IMAGE_EMBEDDING_PATH_TEMPLATE.format(place_id=place_id),
+        MENUBOARD_CANDIDATES_PATH_TEMPLATE.format(place_id=place_id),
+    ]
+
+def main(place_id):
     # 1. Generate Image Embeddings
     embeddings_df = generate_image_embeddings_from_json(
         place_id=place_id, 
@@ -21,8 +50,7 @@ def main(place_id):
     # 2. Search Menu Boards (Local Search)
     search_results = search_menu_boards(embeddings_df)
     temp = [{k:v for k,v in dd.items() if not('embedding' in k)} for dd in search_results]
-    with open(IMAGE_EMBEDDING_PATH_TEMPLATE.replace("image_embeddings.parquet", "menuboard_candidates.json").format(place_id=place_id), 'w') as f:
-        json.dump(temp, f, indent=2)
+    save_json(MENUBOARD_CANDIDATES_PATH_TEMPLATE.format(place_id=place_id), temp)
     filter_non_food_images(embeddings_df).to_parquet(
         IMAGE_EMBEDDING_PATH_TEMPLATE.format(place_id=place_id),
         index=False
@@ -30,7 +58,8 @@ def main(place_id):
     
     # 3. Extract Menu items using Gemini
     assert len(search_results) > 0, "No menu boards found for this place"
-    extract_menu_from_images(search_results, place_id)
+    if extract_menu_from_images(search_results, place_id):
+        write_manifest(place_id, "menu_listing", menu_listing_inputs(place_id), menu_listing_outputs(place_id))
 
     return
 
@@ -42,7 +71,7 @@ if __name__ == "__main__":
     
     print("\n\n")
     print("-" * 50)
-    print(f"RESTAURANT REQUESTED: ({args.place_id}) {PID_RNAME_MAPPING.get(args.place_id, 'Unknown')}")
+    print(f"RESTAURANT REQUESTED: ({args.place_id}) {place_registry.name(args.place_id) or 'Unknown'}")
     print("-" * 50)
 
     main(place_id=args.place_id)
\ No newline at end of file
@@ -1,12 +1,13 @@
 import streamlit as st
 from utils.path_utils import *
 from utils.helpers import load_json
+from utils.place_registry import place_registry
 
 st.set_page_config(page_title="Menu Metadata Viewer", page_icon="🍴", layout="wide")
 
 st.title("🍴 Menu Metadata Quick Viewer")
 
-PID_RNAME_MAPPING = load_json(DATA_DIR / "mapping.json")
+PID_RNAME_MAPPING = place_registry.names()
 RNAME_PID_MAPPING = {v: k for k, v in PID_RNAME_MAPPING.items()}
 
 import os
@@ -5,18 +5,25 @@ warnings.filterwarnings("ignore", category=FutureWarning)
 warnings.filterwarnings("ignore", category=UserWarning)
 
 import random
-import json
 from text_review_labeling.gemini_calls import _call_gemini_v3
 from restuarant_overview.schema import MenusOverviewSummary
 
-from utils.helpers import get_curr_time, load_json
-from utils.path_utils import MENU_METADATA_PATH_TEMPLATE, SCRAPED_REVIEW_PATH_TEMPLATE, PROJECT_ROOT, DATA_DIR, RESTAURANT_OVERVIEW_PATH_TEMPLATE
+from utils.helpers import get_curr_time, save_json
+from utils.manifest import digest_text, digest_value, write_manifest
+from utils.menu_store import read_menus
+from utils.path_utils import PROJECT_ROOT, DATA_DIR, RESTAURANT_OVERVIEW_PATH_TEMPLATE
+from utils.review_table import load_review_table
+from utils.place_registry import place_registry
 
 with open(os.path.join(PROJECT_ROOT, 'core/restuarant_overview', 'prompt_template.md'), 'r') as file:
     PROMPT_TEMPLATE = file.read()
+OVERVIEW_MODEL = "gemini-3-flash-preview"
 
-def curate_menu_info(place_id: str):
+def curate_menu_info(place_id: str, seed: int = 0):
     """
+    Review samples are drawn with a seeded RNG so identical inputs produce
+    identical prompts (and can hit the Gemini response cache).
+
     RETURNS:
      For each menu items, return a dict with keys:
         - name
@@ -26,9 +33,11 @@ def curate_menu_info(place_id: str):
         - number of reviews mentioning the item
         - up to 5 sample raw text reviews mentioning the item (for top 3 most mentioned items)
     """
-    reviews = load_json(SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id))
-    menus = load_json(MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id))
+    reviews = load_review_table(place_id)
+    # The per-dish records are updated as each summary lands (menus.json only once all are done)
+    menus = read_menus(place_id)
     
+    rng = random.Random(seed)
     menus_ = {}
     for rank, (menu_id, menu) in enumerate(menus.items()):
         n_mentions = 0 if menu['from_reviews'] is None else len(menu['from_reviews']['relevant_review_ids'])
@@ -40,8 +49,10 @@ def curate_menu_info(place_id: str):
         if rank<3:
             menus_[menu_id]['reviews'] = []
             review_ids = menu['from_reviews']['relevant_review_ids'] if menu['from_reviews'] else []
-            for review_id in random.sample(review_ids, k=min(5, len(review_ids))):
-                menus_[menu_id]['reviews'].append(reviews[int(review_id)]['text'].strip().replace('\n', ' '))
+            # Ids missing from the current review table (e.g. after a re-scrape) cannot be quoted
+            positions = [pos for pos in (reviews.position(review_id) for review_id in review_ids) if pos is not None]
+            for pos in rng.sample(positions, k=min(5, len(positions))):
+                menus_[menu_id]['reviews'].append(reviews.text(pos).strip().replace('\n', ' '))
     
     return menus_
 
@@ -81,20 +92,35 @@ def postprocess_to_html(restaurant_overview):
     restaurant_overview['summary_html'] = summary_html
     return restaurant_overview
     
-def summarize_restaurant_overview(place_id):
-    PID_RNAME_MAPPING = load_json(DATA_DIR / "mapping.json")
-    restaurant_name = re.sub(r'[^\x00-\x7f]', '', PID_RNAME_MAPPING[place_id]).strip()
+def _restaurant_name(place_id):
+    name = place_registry.name(place_id)
+    if name is None:
+        raise KeyError(f"No restaurant name registered for {place_id}")
+    return re.sub(r'[^\x00-\x7f]', '', name).strip()
+
+def overview_inputs(place_id, seed: int = 0, prompt: str = None):
+    """Fingerprints of the overview request: the exact prompt (menus, sampled reviews, template), model and schema."""
+    if prompt is None:
+        prompt = prepare_prompt(curate_menu_info(place_id, seed=seed), _restaurant_name(place_id))
+    return {
+        "prompt": digest_text(prompt),
+        "model": OVERVIEW_MODEL,
+        "schema": digest_value(MenusOverviewSummary.model_json_schema()),
+    }
+
+def summarize_restaurant_overview(place_id, seed: int = 0):
+    restaurant_name = _restaurant_name(place_id)
     
     print(f"[{get_curr_time()}] Summarizing restaurant overview for {restaurant_name}...")
-    menus = curate_menu_info(place_id)
+    menus = curate_menu_info(place_id, seed=seed)
     prompt = prepare_prompt(menus, restaurant_name)
-    restaurant_overview_json = _call_gemini_v3(prompt, MenusOverviewSummary, model="gemini-3-flash-preview")
+    restaurant_overview_json = _call_gemini_v3(prompt, MenusOverviewSummary, model=OVERVIEW_MODEL)
     
     restaurant_overview_json = postprocess_to_html(restaurant_overview_json)
     
     json_path = RESTAURANT_OVERVIEW_PATH_TEMPLATE.format(place_id=place_id)
-    with open(json_path, 'w') as f:
-        json.dump(restaurant_overview_json, f, indent=4)
+    save_json(json_path, restaurant_overview_json)
+    write_manifest(place_id, "restaurant_overview", overview_inputs(place_id, prompt=prompt), [json_path])
         
     print(f"[{get_curr_time()}] Saved restaurant overview JSON to {json_path}")
     return restaurant_overview_json
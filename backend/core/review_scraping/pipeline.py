@@ -1,13 +1,19 @@
 import os
-import json
 from apify_client import ApifyClient
 from dotenv import load_dotenv
 from utils.path_utils import ENV_FILE, SCRAPED_REVIEW_PATH_TEMPLATE
-from utils.helpers import load_json
+from utils.helpers import load_json, save_json
+from utils.review_table import build_review_table
 
 load_dotenv(ENV_FILE)
 
-def scrape_reviews(place_id: str):
+def scrape_reviews(place_id: str, merge_existing: bool = True):
+    """
+    Scrapes reviews into reviews.json.
+    With `merge_existing`, reviews already on disk keep their ids (matched by reviewUrl)
+    and newly seen reviews are appended with fresh ids, so downstream stages can
+    process only what is new.
+    """
     client = ApifyClient(os.getenv("APIFY_TOKEN"))
 
     run_input = {
@@ -23,23 +29,31 @@ def scrape_reviews(place_id: str):
 
     items = list(client.dataset(run["defaultDatasetId"]).iterate_items())
 
-    formatted = []
-    for idx, item in enumerate(items):
+    output_path = SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id)
+    formatted = load_json(output_path) if merge_existing and os.path.exists(output_path) else []
+    known_urls = {review.get("reviewUrl") for review in formatted if review.get("reviewUrl")}
+    next_id = max((int(review["id"]) for review in formatted), default=-1) + 1
+    n_existing = len(formatted)
+
+    for item in items:
+        if item.get("reviewUrl") and item.get("reviewUrl") in known_urls:
+            continue
         formatted.append({
-            "id": str(idx),
+            "id": str(next_id),
             "text": item.get("text"),
             "publishedAtDate": item.get("publishedAtDate"),
             "reviewUrl": item.get("reviewUrl"),
             "reviewImageUrls": item.get("reviewImageUrls", []),
         })
+        next_id += 1
 
-    os.makedirs(os.path.dirname(SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id)), exist_ok=True)
-    output_path = SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id)
+    if n_existing:
+        print(f"Kept {n_existing} existing reviews, appended {len(formatted) - n_existing} new ones")
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(formatted, f, ensure_ascii=False, indent=2)
+    save_json(output_path, formatted)
 
     print(f"✅ Saved {len(formatted)} reviews to {output_path}")
+    build_review_table(place_id, formatted)
 
     return formatted
 
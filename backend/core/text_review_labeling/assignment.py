@@ -0,0 +1,79 @@
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+from scipy.sparse import csc_matrix
+
+
+class ReviewMenuAssignment:
+    """
+    Sparse review x menu match matrix with a review-id index.
+    Stored column-compressed (CSC), so the reviews matched to one menu are a
+    contiguous slice: per-menu lookups cost O(matches), not O(reviews).
+    Instances are never modified after construction and can be shared read-only
+    across summary worker threads.
+    """
+
+    def __init__(self, matrix: csc_matrix, review_ids: np.ndarray, texts: np.ndarray, menu_ids: List[str]):
+        self.matrix = matrix
+        self.review_ids = review_ids
+        self.texts = texts
+        self.menu_ids = [str(m) for m in menu_ids]
+        self._col = {menu_id: i for i, menu_id in enumerate(self.menu_ids)}
+
+    @classmethod
+    def from_similarities(cls, sim_df, threshold: float, review_ids: Iterable) -> "ReviewMenuAssignment":
+        """Labels every (review, menu) pair of `sim_df` scoring at least `threshold`."""
+        menu_ids = [col for col in sim_df.columns if col != 'text']
+        scores = sim_df[menu_ids].to_numpy(dtype=float)
+        rows, cols = np.nonzero(scores >= threshold)
+        matrix = csc_matrix(
+            (np.ones(len(rows), dtype=np.int8), (rows, cols)),
+            shape=scores.shape
+        )
+        matrix.sort_indices()
+        return cls(matrix, np.asarray(list(review_ids), dtype=int), sim_df['text'].to_numpy(), menu_ids)
+
+    def __contains__(self, menu_id) -> bool:
+        return str(menu_id) in self._col
+
+    def __len__(self) -> int:
+        return len(self.menu_ids)
+
+    def counts(self) -> Dict[str, int]:
+        """Number of matched reviews per menu."""
+        return dict(zip(self.menu_ids, np.diff(self.matrix.indptr).tolist()))
+
+    def n_matches(self, menu_ids: Iterable[str] = None) -> int:
+        if menu_ids is None:
+            return int(self.matrix.nnz)
+        counts = self.counts()
+        return sum(counts[str(m)] for m in menu_ids)
+
+    def matched_rows(self, menu_id) -> np.ndarray:
+        """Row positions of the reviews matched to `menu_id`."""
+        col = self._col[str(menu_id)]
+        return self.matrix.indices[self.matrix.indptr[col]:self.matrix.indptr[col + 1]]
+
+    def matched_review_ids(self, menu_id) -> np.ndarray:
+        return self.review_ids[self.matched_rows(menu_id)]
+
+    def matched_reviews(self, menu_id) -> List[Tuple[int, str]]:
+        """(review id, text) of the reviews matched to `menu_id`, in review order."""
+        rows = self.matched_rows(menu_id)
+        return list(zip(self.review_ids[rows].tolist(), self.texts[rows]))
+
+    def match_sets(self) -> Dict[str, Set[int]]:
+        """{menu_id: set of matched review ids}."""
+        return {menu_id: set(self.matched_review_ids(menu_id).tolist()) for menu_id in self.menu_ids}
+
+    def select(self, menu_ids: Iterable[str]) -> "ReviewMenuAssignment":
+        """Assignment restricted to `menu_ids` (review index and texts are shared, not copied)."""
+        menu_ids = [str(m) for m in menu_ids if str(m) in self._col]
+        cols = [self._col[m] for m in menu_ids]
+        return ReviewMenuAssignment(self.matrix[:, cols], self.review_ids, self.texts, menu_ids)
+
+    def top(self, n: int) -> "ReviewMenuAssignment":
+        """The `n` menus with the most matched reviews."""
+        counts = self.counts()
+        ranked = sorted(self.menu_ids, key=lambda m: counts[m], reverse=True)
+        return self.select(ranked[:n])
@@ -0,0 +1,323 @@
+import warnings
+warnings.filterwarnings("ignore", category=FutureWarning)
+warnings.filterwarnings("ignore", category=UserWarning)
+
+import os
+import time
+import hashlib
+import argparse
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from text_review_labeling.constants import GCP_PROJECT_ID, SUMMARY_MODEL_GEMINI_3
+from text_review_labeling.schema import MenuReviewSummary
+from text_review_labeling.gemini_calls import _call_gemini_v3
+from text_review_labeling.menu_summary import (
+    load_base_menu,
+    build_menu_prompt,
+    apply_menu_summary,
+    save_menu_summaries
+)
+from text_review_labeling.pipeline import match_top_20
+from utils.helpers import dumps_json, get_curr_time, load_json, loads_json, save_json
+from utils.path_utils import REVIEWS_DF_PATH_TEMPLATE, BATCH_RUN_DIR
+from utils.response_cache import make_cache_key, cache_get, cache_set
+
+
+def _request_key(place_id: str, menu_id: str) -> str:
+    return f"{place_id}/{menu_id}"
+
+
+def _prompt_digest(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def build_batch_request(key: str, prompt: str) -> Dict:
+    """One line of a Gemini batch-prediction JSONL input file."""
+    return {
+        "key": key,
+        "request": {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "responseMimeType": "application/json",
+                "responseJsonSchema": MenuReviewSummary.model_json_schema(),
+                "temperature": 0,
+                "thinkingConfig": {"thinkingLevel": "MINIMAL"},
+            },
+        },
+    }
+
+
+def _request_prompt(request_line: Dict) -> str:
+    return request_line["request"]["contents"][0]["parts"][0]["text"]
+
+
+def _response_text(prediction_line: Dict) -> Optional[str]:
+    try:
+        return prediction_line["response"]["candidates"][0]["content"]["parts"][0]["text"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+# ==========================================
+# Batch backends
+# ==========================================
+
+class BatchBackend(ABC):
+    """Runs a JSONL file of generateContent requests and produces a JSONL file of predictions."""
+
+    @abstractmethod
+    def submit(self, requests_path: str, output_dir: str) -> str:
+        """Submits the requests and returns a job name."""
+
+    @abstractmethod
+    def wait(self, job_name: str, output_dir: str) -> str:
+        """Blocks until the job is done and returns the local path of the predictions JSONL."""
+
+
+class LocalBatchBackend(BatchBackend):
+    """
+    File-based stand-in for a batch-prediction service.
+    Every request is answered by `responder(prompt) -> json_text`; by default this is the
+    online Gemini call, tests can pass a canned responder instead.
+    """
+
+    def __init__(self, responder: Callable[[str], str] = None, max_workers: int = 4):
+        self.responder = responder or (lambda prompt: dumps_json(_call_gemini_v3(prompt, MenuReviewSummary), pretty=False).decode("utf-8"))
+        self.max_workers = max_workers
+
+    def _answer(self, request_line: Dict) -> Dict:
+        out = dict(request_line)
+        try:
+            text = self.responder(_request_prompt(request_line))
+            out["response"] = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+        except Exception as e:
+            out["status"] = str(e)
+        return out
+
+    def submit(self, requests_path: str, output_dir: str) -> str:
+        with open(requests_path, "rb") as f:
+            request_lines = [loads_json(line) for line in f if line.strip()]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            predictions = list(executor.map(self._answer, request_lines))
+
+        predictions_path = os.path.join(output_dir, "predictions.jsonl")
+        with open(predictions_path, "wb") as f:
+            for line in predictions:
+                f.write(dumps_json(line, pretty=False) + b"\n")
+        return predictions_path
+
+    def wait(self, job_name: str, output_dir: str) -> str:
+        return job_name
+
+
+class VertexBatchBackend(BatchBackend):
+    """Vertex AI batch prediction: requests and predictions are staged under `gcs_uri`."""
+
+    COMPLETED_STATES = {
+        "JOB_STATE_SUCCEEDED",
+        "JOB_STATE_PARTIALLY_SUCCEEDED",
+        "JOB_STATE_FAILED",
+        "JOB_STATE_CANCELLED",
+        "JOB_STATE_EXPIRED",
+    }
+
+    def __init__(self, gcs_uri: str, model: str = SUMMARY_MODEL_GEMINI_3, poll_interval: int = 60):
+        from google import genai
+        from google.cloud import storage
+
+        assert gcs_uri.startswith("gs://"), f"Expected a gs:// uri, got {gcs_uri}"
+        self.bucket_name, _, self.prefix = gcs_uri[len("gs://"):].partition("/")
+        self.prefix = self.prefix.rstrip("/")
+        self.model = model
+        self.poll_interval = poll_interval
+        self.client = genai.Client(vertexai=True, project=GCP_PROJECT_ID, location="global")
+        self.bucket = storage.Client(project=GCP_PROJECT_ID).bucket(self.bucket_name)
+
+    def submit(self, requests_path: str, output_dir: str) -> str:
+        from google.genai import types
+
+        run_name = os.path.basename(os.path.normpath(output_dir))
+        run_root = "/".join(p for p in [self.prefix, run_name] if p)
+        blob_path = f"{run_root}/requests.jsonl"
+        self.bucket.blob(blob_path).upload_from_filename(requests_path)
+
+        job = self.client.batches.create(
+            model=self.model,
+            src=f"gs://{self.bucket_name}/{blob_path}",
+            config=types.CreateBatchJobConfig(
+                dest=f"gs://{self.bucket_name}/{run_root}/output"
+            ),
+        )
+        print(f"[{get_curr_time()}] Submitted Vertex batch job {job.name}")
+        return job.name
+
+    def wait(self, job_name: str, output_dir: str) -> str:
+        while True:
+            job = self.client.batches.get(name=job_name)
+            state = getattr(job.state, "name", str(job.state))
+            if state in self.COMPLETED_STATES:
+                break
+            print(f"[{get_curr_time()}] Batch job {job_name}: {state}")
+            time.sleep(self.poll_interval)
+
+        if state not in ("JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED"):
+            raise RuntimeError(f"Batch job {job_name} ended in state {state}")
+
+        dest_prefix = job.dest.gcs_uri[len(f"gs://{self.bucket_name}/"):]
+        predictions_path = os.path.join(output_dir, "predictions.jsonl")
+        with open(predictions_path, "wb") as f:
+            for blob in self.bucket.list_blobs(prefix=dest_prefix):
+                if blob.name.endswith("predictions.jsonl"):
+                    f.write(blob.download_as_bytes())
+        return predictions_path
+
+
+# ==========================================
+# Prepare / ingest
+# ==========================================
+
+def prepare_batch_requests(place_ids: List[str], run_dir: str, model: str = SUMMARY_MODEL_GEMINI_3) -> Tuple[str, Dict]:
+    """
+    Writes all pending MenuReviewSummary requests for `place_ids` as JSONL.
+    Requests whose answer is already in the response cache are recorded in the
+    manifest but not written, so they cost nothing in the batch job.
+    """
+    os.makedirs(run_dir, exist_ok=True)
+    requests_path = os.path.join(run_dir, "requests.jsonl")
+    schema = MenuReviewSummary.model_json_schema()
+    manifest = {"model": model, "job_name": None, "requests": {}}
+
+    n_pending = 0
+    with open(requests_path, "wb") as f:
+        for place_id in place_ids:
+            df_reviews = pd.read_pickle(REVIEWS_DF_PATH_TEMPLATE.format(place_id=place_id))
+            assignment = match_top_20(place_id, df_reviews)
+            full_menu_data = load_base_menu(place_id)
+            if assignment is None or not full_menu_data:
+                continue
+
+            for menu_id in full_menu_data.keys():
+                prompt = build_menu_prompt(menu_id, assignment, full_menu_data)
+                if prompt is None:
+                    continue
+                key = _request_key(place_id, menu_id)
+                cache_key = make_cache_key(model, schema, prompt)
+                cached = cache_get(cache_key) is not None
+                manifest["requests"][key] = {
+                    "place_id": place_id,
+                    "menu_id": menu_id,
+                    "cache_key": cache_key,
+                    "prompt_digest": _prompt_digest(prompt),
+                    "cached": cached,
+                }
+                if not cached:
+                    f.write(dumps_json(build_batch_request(key, prompt), pretty=False) + b"\n")
+                    n_pending += 1
+
+    _save_manifest(run_dir, manifest)
+    print(f"[{get_curr_time()}] Wrote {n_pending} pending requests "
+          f"({len(manifest['requests']) - n_pending} already cached) to {requests_path}")
+    return requests_path, manifest
+
+
+def ingest_batch_results(predictions_path: Optional[str], manifest: Dict) -> Dict[str, int]:
+    """Parses batch predictions (plus cached answers) and writes them into each place's menus.json."""
+    by_digest = {entry["prompt_digest"]: key for key, entry in manifest["requests"].items()}
+    results = defaultdict(dict)
+    n_failed = 0
+
+    lines = []
+    if predictions_path and os.path.exists(predictions_path):
+        with open(predictions_path, "rb") as f:
+            lines = [loads_json(line) for line in f if line.strip()]
+
+    for line in lines:
+        key = line.get("key") or by_digest.get(_prompt_digest(_request_prompt(line)))
+        entry = manifest["requests"].get(key)
+        text = _response_text(line)
+        if entry is None or text is None:
+            n_failed += 1
+            print(f"[{get_curr_time()}] Batch result {key}: no response ({line.get('status', 'unknown error')})")
+            continue
+        try:
+            summary = MenuReviewSummary.model_validate_json(text)
+        except Exception as e:
+            n_failed += 1
+            print(f"[{get_curr_time()}] Batch result {key}: invalid response - {e}")
+            continue
+        cache_set(entry["cache_key"], text, model=manifest["model"])
+        results[entry["place_id"]][entry["menu_id"]] = summary.model_dump()
+
+    for key, entry in manifest["requests"].items():
+        if not entry["cached"]:
+            continue
+        text = cache_get(entry["cache_key"])
+        if text is not None:
+            results[entry["place_id"]][entry["menu_id"]] = MenuReviewSummary.model_validate_json(text).model_dump()
+
+    for place_id, summaries in results.items():
+        full_menu_data = load_base_menu(place_id)
+        for menu_id, summary_dict in summaries.items():
+            apply_menu_summary(full_menu_data, menu_id, summary_dict)
+        output_path = save_menu_summaries(place_id, full_menu_data)
+        print(f"[{get_curr_time()}] Ingested {len(summaries)} menu summaries into {output_path}")
+
+    return {
+        "places": len(results),
+        "menus": sum(len(v) for v in results.values()),
+        "failed": n_failed,
+    }
+
+
+def _save_manifest(run_dir: str, manifest: Dict):
+    save_json(os.path.join(run_dir, "manifest.json"), manifest)
+
+
+def run_batch_summaries(place_ids: List[str], backend: BatchBackend, run_name: str = None) -> Dict[str, int]:
+    """
+    Summarizes the top menus of many places through a batch backend.
+    Re-running with the same `run_name` resumes a submitted job instead of resubmitting.
+    """
+    run_name = run_name or time.strftime("%Y%m%d-%H%M%S")
+    run_dir = os.path.join(BATCH_RUN_DIR, run_name)
+    manifest_path = os.path.join(run_dir, "manifest.json")
+
+    print(f"\n=== Batch Menu Review Summaries ({run_name}) ===")
+    if os.path.exists(manifest_path):
+        manifest = load_json(manifest_path)
+        requests_path = os.path.join(run_dir, "requests.jsonl")
+    else:
+        requests_path, manifest = prepare_batch_requests(place_ids, run_dir)
+
+    predictions_path = None
+    if any(not entry["cached"] for entry in manifest["requests"].values()):
+        if manifest.get("job_name") is None:
+            manifest["job_name"] = backend.submit(requests_path, run_dir)
+            _save_manifest(run_dir, manifest)
+        predictions_path = backend.wait(manifest["job_name"], run_dir)
+
+    stats = ingest_batch_results(predictions_path, manifest)
+    print(f"[{get_curr_time()}] Batch run {run_name} done: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--place_ids", type=str, nargs="+", required=True, help="Google Place IDs to summarize")
+    parser.add_argument("--backend", type=str, choices=["local", "vertex"], default="vertex")
+    parser.add_argument("--gcs_uri", type=str, default=os.getenv("BATCH_GCS_URI"), help="gs:// prefix for staging batch files (vertex backend)")
+    parser.add_argument("--run_name", type=str, default=None, help="Resume an earlier run with this name")
+    args = parser.parse_args()
+
+    if args.backend == "vertex":
+        backend = VertexBatchBackend(args.gcs_uri)
+    else:
+        backend = LocalBatchBackend()
+
+    run_batch_summaries(args.place_ids, backend, run_name=args.run_name)
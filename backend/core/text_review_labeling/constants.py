@@ -26,10 +26,62 @@ GENERAL_REVIEW_QUERY = [
     "the {ITEM} was",
 ]
 
+# ==========================================
+# Menu Selection
+# ==========================================
+# Menus with the most matched reviews that get a per-dish summary
+TOP_MENUS = 20
+
 # ==========================================
 # Prompt Template
 # ==========================================
-with open(os.path.join(PROJECT_ROOT, 'core/text_review_labeling', 'prompt_template.txt'), 'r') as file:
-    PROMPT_TEMPLATE = file.read()
+# The per-menu prompt is split into a prefix shared by every menu of a restaurant
+# (instructions + full menu list, cacheable) and a per-dish suffix.
+with open(os.path.join(PROJECT_ROOT, 'core/text_review_labeling', 'prompt_prefix_template.txt'), 'r') as file:
+    PROMPT_PREFIX_TEMPLATE = file.read()
+with open(os.path.join(PROJECT_ROOT, 'core/text_review_labeling', 'prompt_suffix_template.txt'), 'r') as file:
+    PROMPT_SUFFIX_TEMPLATE = file.read()
+# Packed requests reuse the same prefix and summarize several long-tail dishes at once
+with open(os.path.join(PROJECT_ROOT, 'core/text_review_labeling', 'prompt_packed_suffix_template.txt'), 'r') as file:
+    PROMPT_PACKED_SUFFIX_TEMPLATE = file.read()
+with open(os.path.join(PROJECT_ROOT, 'core/text_review_labeling', 'prompt_packed_item_template.txt'), 'r') as file:
+    PROMPT_PACKED_ITEM_TEMPLATE = file.read()
+
+DIETARY_OPTIONS_ALL = ["vegan", "gluten-free", "dairy-free", "nut-free", "egg-free", "vegetarian", "halal", "kosher"]
+
+# ==========================================
+# Incremental Re-labeling
+# ==========================================
+# A menu is re-summarized only when the fraction of its matched reviews that changed
+# (added or removed, relative to the previous match set) exceeds this delta.
+INCREMENTAL_MIN_EVIDENCE_DELTA = 0.2
+
+
+# ==========================================
+# Context Caching
+# ==========================================
+CONTEXT_CACHE_ENABLED = os.getenv("GEMINI_CONTEXT_CACHE", "1") != "0"
+CONTEXT_CACHE_TTL_SECONDS = 600
+# Explicit caches below the model's minimum token count are rejected; ~4 chars per token
+CONTEXT_CACHE_MIN_CHARS = 4096
+
 
-DIETARY_OPTIONS_ALL = ["vegan", "gluten-free", "dairy-free", "nut-free", "egg-free", "vegetarian", "halal", "kosher"]
\ No newline at end of file
+# ==========================================
+# Long-tail Packing
+# ==========================================
+# Menus outside the top 20 are summarized in packs of up to PACK_MAX_MENUS dishes,
+# with at most PACK_MAX_REVIEWS matched reviews per request.
+PACK_MAX_MENUS = 6
+PACK_MAX_REVIEWS = 30
+
+
+# ==========================================
+# Lexical Prefilter
+# ==========================================
+# Menu names/nicknames shorter than this (after normalization) are not matched literally
+LEXICAL_MIN_PATTERN_CHARS = 3
+# Similarity assigned to a (review, menu) pair whose review names the dish; above the
+# threshold search range in find_optimal_threshold, so lexical hits always count as matches
+LEXICAL_MATCH_SCORE = 0.90
+# From this many reviews on, reviews with a lexical hit skip dense scoring altogether
+LEXICAL_DENSE_SKIP_MIN_REVIEWS = 2000
@@ -0,0 +1,139 @@
+import time
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+from text_review_labeling.constants import (
+    GCP_PROJECT_ID,
+    CONTEXT_CACHE_ENABLED,
+    CONTEXT_CACHE_TTL_SECONDS,
+    CONTEXT_CACHE_MIN_CHARS
+)
+from utils.helpers import get_curr_time
+
+
+class ContextCacheBackend(ABC):
+    """Creates and deletes cached prompt prefixes on the model provider."""
+
+    @abstractmethod
+    def create(self, model: str, prefix_text: str, ttl_seconds: int, display_name: str) -> str:
+        """Caches `prefix_text` for `ttl_seconds` and returns the cache's name."""
+
+    @abstractmethod
+    def delete(self, name: str):
+        """Deletes the named cache."""
+
+
+class VertexContextCacheBackend(ContextCacheBackend):
+    """Gemini explicit context caching through the google.genai SDK."""
+
+    def __init__(self):
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client(vertexai=True, project=GCP_PROJECT_ID, location="global")
+        return self._client
+
+    def create(self, model: str, prefix_text: str, ttl_seconds: int, display_name: str) -> str:
+        from google.genai import types
+
+        cached = self.client.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                contents=[types.Content(role="user", parts=[types.Part(text=prefix_text)])],
+                ttl=f"{ttl_seconds}s",
+                display_name=display_name,
+            ),
+        )
+        return cached.name
+
+    def delete(self, name: str):
+        self.client.caches.delete(name=name)
+
+
+class LocalContextCacheBackend(ContextCacheBackend):
+    """In-memory stand-in used in tests; records what would have been cached."""
+
+    def __init__(self):
+        self.contents: Dict[str, str] = {}
+        self.n_created = 0
+
+    def create(self, model: str, prefix_text: str, ttl_seconds: int, display_name: str) -> str:
+        self.n_created += 1
+        name = f"local/{display_name}/{self.n_created}"
+        self.contents[name] = prefix_text
+        return name
+
+    def delete(self, name: str):
+        self.contents.pop(name, None)
+
+
+class ContextCacheManager:
+    """
+    Keeps one cached prompt prefix per (place, model, prefix content).
+    Entries are reused until shortly before their TTL runs out, then recreated;
+    `release` deletes a place's caches once its menus are summarized.
+    """
+
+    def __init__(self, backend: Optional[ContextCacheBackend], ttl_seconds: int = CONTEXT_CACHE_TTL_SECONDS,
+                 min_prefix_chars: int = CONTEXT_CACHE_MIN_CHARS, refresh_margin: int = 30):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.min_prefix_chars = min_prefix_chars
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+        self._entries: Dict[Tuple, Tuple[str, float]] = {}  # key -> (cache name, expires_at)
+
+    def _key(self, place_id: str, model: str, prefix_text: str) -> Tuple:
+        return (place_id, model, hashlib.sha256(prefix_text.encode("utf-8")).hexdigest())
+
+    def get(self, place_id: str, model: str, prefix_text: str) -> Optional[str]:
+        """Returns the name of a live cache holding `prefix_text`, or None to send the prompt inline."""
+        if self.backend is None or len(prefix_text) < self.min_prefix_chars:
+            return None
+
+        key = self._key(place_id, model, prefix_text)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Only one thread per prefix creates the cache; the others wait and reuse it
+        with key_lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] - self.refresh_margin > time.time():
+                return entry[0]
+            try:
+                name = self.backend.create(model, prefix_text, self.ttl_seconds, display_name=f"dishy-{place_id}"[:128])
+            except Exception as e:
+                print(f"[{get_curr_time()}] Context cache creation failed for {place_id}, sending prompts inline: {e}")
+                return None
+            self._entries[key] = (name, time.time() + self.ttl_seconds)
+            print(f"[{get_curr_time()}] Created context cache {name} for {place_id}")
+            return name
+
+    def invalidate(self, name: str):
+        """Forgets a cache the provider no longer knows (e.g. it expired early)."""
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry[0] == name:
+                    del self._entries[key]
+
+    def release(self, place_id: str):
+        """Deletes all caches created for `place_id`."""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == place_id]
+            entries = [self._entries.pop(key) for key in keys]
+        for name, expires_at in entries:
+            if expires_at <= time.time():
+                continue
+            try:
+                self.backend.delete(name)
+            except Exception as e:
+                print(f"[{get_curr_time()}] Failed to delete context cache {name}: {e}")
+
+
+context_cache_manager = ContextCacheManager(VertexContextCacheBackend() if CONTEXT_CACHE_ENABLED else None)
@@ -1,7 +1,6 @@
-import json
-import time
-from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Set
+
+import numpy as np
 
 import vertexai
 from vertexai.language_models import TextEmbeddingModel, TextEmbeddingInput
@@ -13,8 +12,8 @@ from text_review_labeling.constants import (
     TEXT_EMBEDDING_MODEL
 )
 from utils.helpers import get_curr_time
-from utils.path_utils import SCRAPED_REVIEW_PATH_TEMPLATE
-import os
+from utils.pools import rate_limiter
+from utils.review_table import load_review_table
 
 vertexai.init(project=GCP_PROJECT_ID, location=GCP_LOCATION)
 model = TextEmbeddingModel.from_pretrained(TEXT_EMBEDDING_MODEL)
@@ -24,6 +23,7 @@ def get_text_embeddings_batch(texts: List[str]) -> List[List[float]]:
     """Generates text embeddings for a batch of strings."""
     try:
         inputs = [TextEmbeddingInput(text, task_type="RETRIEVAL_DOCUMENT") for text in texts]
+        rate_limiter("embedding").acquire()
         embeddings = model.get_embeddings(
             inputs
         )
@@ -35,44 +35,31 @@ def get_text_embeddings_batch(texts: List[str]) -> List[List[float]]:
 
 def generate_text_embeddings_from_json(
     place_id: str,
-    batch_size: int = 100
+    batch_size: int = 100,
+    skip_review_ids: Optional[Set[str]] = None
 ) -> List[Dict]:
-    """Parses scraped JSON reviews and generates embeddings."""
+    """Generates embeddings for the place's reviews with text (except for `skip_review_ids`)."""
     
-    json_path = SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id)
-    if not os.path.exists(json_path):
-        print(f"[{get_curr_time()}] Warning: Scraped reviews file not found at {json_path}")
+    table = load_review_table(place_id)
+    if table is None:
+        print(f"[{get_curr_time()}] Warning: Scraped reviews not found for {place_id}")
         return []
-    
-    with open(json_path, 'r') as f:
-        reviews = json.load(f)
 
     to_process = []
     print(f"\n=== Text Review Embedding ===")
-    print(f"[{get_curr_time()}] Loading text from processed reviews ({len(reviews)} total)...")
+    print(f"[{get_curr_time()}] Loading text from review table ({len(table)} total)...")
     
-    for review in reviews:
-        # Use the simple "id" added during preprocessing
-        r_id = review.get("id")
-        text = review.get("text", "")
-        
-        if not text or r_id is None:
+    # Only reviews with text: empty texts have equal start/end offsets
+    for pos in np.flatnonzero(np.diff(table.text_offsets)).tolist():
+        r_id = str(table.ids[pos])
+        if skip_review_ids and r_id in skip_review_ids:
             continue
-            
-        p_at = review.get("publishedAtDate")
-        p_date = None
-        if p_at:
-            try:
-                dt = datetime.fromisoformat(p_at.replace('Z', '+00:00'))
-                p_date = dt.date().isoformat()
-            except ValueError:
-                pass
         
         to_process.append({
             "place_id": place_id,
-            "review_id": str(r_id),
-            "text": text[:1000],
-            "published_date": p_date
+            "review_id": r_id,
+            "text": table.text(pos)[:1000],
+            "published_date": table.published_date(pos)
         })
 
     if not to_process:
@@ -88,8 +75,6 @@ def generate_text_embeddings_from_json(
         for j, emb in enumerate(embeddings):
             if emb:
                 batch[j]['embedding'] = emb
-        
-        time.sleep(0.5) 
 
     return to_process
 
@@ -112,11 +97,8 @@ def get_query_embeddings(queries: List[str], batch_size: int = 250) -> List[List
     for i in range(0, len(queries), batch_size):
         batch = queries[i:i+batch_size]
         inputs = [TextEmbeddingInput(q, task_type="RETRIEVAL_QUERY") for q in batch]
+        rate_limiter("embedding").acquire()
         embeddings = model.get_embeddings(inputs)
         all_embeddings.extend([emb.values for emb in embeddings])
-        
-        # Rate limit handling just in case
-        if len(queries) > batch_size:
-            time.sleep(0.1)
-            
+
     return all_embeddings
@@ -10,10 +10,13 @@ from text_review_labeling.constants import (
     SUMMARY_MODEL_GEMINI_3
 )
 from text_review_labeling.schema import MenuReviewSummary
+from utils.response_cache import make_cache_key, cache_get, cache_set
+from utils.pools import rate_limiter
 
 
 def _call_gemini_v2(prompt: str) -> Dict[str, Any]:
     model = GenerativeModel(SUMMARY_MODEL_GEMINI_2)
+    rate_limiter("gemini").acquire()
     response = model.generate_content(
         prompt,
         generation_config=GenerationConfig(
@@ -26,33 +29,58 @@ def _call_gemini_v2(prompt: str) -> Dict[str, Any]:
     return extraction.model_dump()
 
 
+def cached_gemini_v3(prompt: str, schema: BaseModel, model: str = None, prefix: str = None):
+    """The response cache's answer for the same call to `_call_gemini_v3`, or None (no request is made)."""
+    model = model or SUMMARY_MODEL_GEMINI_3
+    full_prompt = prefix + prompt if prefix else prompt
+    cached_text = cache_get(make_cache_key(model, schema.model_json_schema(), full_prompt))
+    if cached_text is None:
+        return None
+    return schema.model_validate_json(cached_text).model_dump()
+
+
 def _call_gemini_v3(
     prompt: str,
     schema: BaseModel,
-    model: str = None
+    model: str = None,
+    prefix: str = None,
+    cached_content: str = None
 ) -> Dict[str, Any]:
-    """Inference using Gemini 3 Flash (google.genai SDK)."""
+    """
+    Inference using Gemini 3 Flash (google.genai SDK).
+    `prefix` is prepended to `prompt`; if `cached_content` names a context cache
+    holding that prefix, only `prompt` is sent.
+    """
     model = model or SUMMARY_MODEL_GEMINI_3
+    response_schema = schema.model_json_schema()
+    full_prompt = prefix + prompt if prefix else prompt
+
+    cache_key = make_cache_key(model, response_schema, full_prompt)
+    cached_text = cache_get(cache_key)
+    if cached_text is not None:
+        return schema.model_validate_json(cached_text).model_dump()
 
     client = genai.Client(
         vertexai=True,
         project=GCP_PROJECT_ID,
         location="global"
     )
+    rate_limiter("gemini").acquire()
     response = client.models.generate_content(
         model=model,
         contents=[
             types.Content(
                 role="user",
                 parts=[
-                    types.Part(text=prompt)
+                    types.Part(text=prompt if cached_content else full_prompt)
                 ],
             )
         ],
         config=types.GenerateContentConfig(
             response_mime_type="application/json",
-            response_schema=schema.model_json_schema(),
+            response_schema=response_schema,
             temperature=0,
+            cached_content=cached_content,
             thinking_config=(
                 types.ThinkingConfig(thinking_level=types.ThinkingLevel.LOW) if '3-pro' in model
                 else types.ThinkingConfig(thinking_level="minimal")
@@ -63,4 +91,5 @@ def _call_gemini_v3(
     json_text = response.candidates[0].content.parts[0].text
 
     extraction = schema.model_validate_json(json_text)
+    cache_set(cache_key, json_text, model=model)
     return extraction.model_dump()
@@ -0,0 +1,168 @@
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+from text_review_labeling.constants import LEXICAL_MIN_PATTERN_CHARS
+
+# Korean dish names are romanized several ways (tteokbokki / ddukbokki / ttukbokki, kalbi / galbi,
+# ramyeon / ramyun). Each listed spelling of these syllables (as it reads once doubled letters are
+# collapsed) is rewritten to the first one, in menu names and review text alike. Nothing else is
+# respelled, so names such as "pho" or "thai tea" are matched as written.
+KOREAN_ROMANIZATION_VARIANTS = {
+    "tuk": ["teok", "deok", "duk"],
+    "boki": ["poki", "bokgi"],
+    "galbi": ["kalbi"],
+    "gimbap": ["kimbap", "gimbab", "kimbab"],
+    "gimchi": ["kimchi"],
+    "gochujang": ["kochujang"],
+    "bulgogi": ["pulgogi"],
+    "jigae": ["chigae", "jigye"],
+    "myun": ["myeon"],
+    "dubu": ["tubu"],
+    "sundubu": ["sondubu"],
+    "japchae": ["chapchae"],
+    "pajeon": ["pajun"],
+}
+_KOREAN_VARIANT_TO_SPELLING = {
+    variant: spelling for spelling, variants in KOREAN_ROMANIZATION_VARIANTS.items() for variant in variants
+}
+_KOREAN_VARIANTS = re.compile("|".join(sorted(_KOREAN_VARIANT_TO_SPELLING, key=len, reverse=True)))
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_DOUBLED = re.compile(r"([a-z])\1+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercases, strips diacritics and Korean romanization variants; returns space-separated tokens padded with spaces."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = _NON_ALNUM.sub(" ", text)
+    text = _DOUBLED.sub(r"\1", text)
+    text = _KOREAN_VARIANTS.sub(lambda m: _KOREAN_VARIANT_TO_SPELLING[m.group(0)], text)
+    return f" {' '.join(text.split())} "
+
+
+class AhoCorasick:
+    """Multi-pattern string automaton: one linear pass over a text reports every pattern occurrence."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                if node != 0:
+                    fail = self._fail[node]
+                    while fail and ch not in self._goto[fail]:
+                        fail = self._fail[fail]
+                    self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int]]:
+        """Yields (end_index, pattern_id) for every occurrence, end_index exclusive."""
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for pattern_id in out[node]:
+                yield i + 1, pattern_id
+
+
+class LexicalMenuMatcher:
+    """
+    Finds reviews that literally name a dish or one of its nicknames.
+    Every name is compiled into a single automaton over normalized text; patterns are
+    wrapped in spaces so only whole words match (an optional plural 's' is allowed).
+    A pattern shared by several dishes (e.g. the nickname "noodles") names none of them
+    for sure, so it is left to dense scoring.
+    """
+
+    def __init__(self, menu_listing: List[Dict]):
+        pattern_menus = self.patterns(menu_listing)
+        self.ambiguous = {pattern: menu_ids for pattern, menu_ids in pattern_menus.items() if len(menu_ids) > 1}
+        pattern_menus = {pattern: menu_ids for pattern, menu_ids in pattern_menus.items() if len(menu_ids) == 1}
+        self._pattern_menus = [pattern_menus[p] for p in pattern_menus]
+        self.automaton = AhoCorasick(pattern_menus.keys())
+
+    @staticmethod
+    def patterns(menu_listing: List[Dict]) -> Dict[str, Set[str]]:
+        """{padded pattern: menu ids it names} for every name long enough to match literally."""
+        pattern_menus: Dict[str, Set[str]] = {}
+        for menu in menu_listing:
+            for name in menu.get("menu_name", []):
+                norm = normalize_text(name).strip()
+                if len(norm.replace(" ", "")) < LEXICAL_MIN_PATTERN_CHARS:
+                    continue
+                # Spaced and joined forms: "tteok bokki" / "tteokbokki"
+                for form in {norm, norm.replace(" ", "")}:
+                    for variant in (f" {form} ", f" {form}s "):
+                        pattern_menus.setdefault(variant, set()).add(str(menu["id"]))
+        return pattern_menus
+
+    def match(self, text: str) -> Set[str]:
+        """Menu ids named in `text`."""
+        hits = set()
+        for _, pattern_id in self.automaton.iter_matches(normalize_text(text)):
+            hits |= self._pattern_menus[pattern_id]
+        return hits
+
+    def match_all(self, texts: Iterable[str]) -> List[Tuple[int, str]]:
+        """(row position, menu id) candidate pairs over all `texts`."""
+        pairs = []
+        for row, text in enumerate(texts):
+            for menu_id in self.match(text):
+                pairs.append((row, menu_id))
+        return pairs
+
+
+if __name__ == "__main__":
+    # Shows how each place's menu names are normalized, which are too short to match and which are ambiguous
+    import argparse
+
+    from text_review_labeling.pipeline import load_menu_listing
+    from utils.place_registry import place_registry
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--place_ids", type=str, nargs="*", default=None, help="Default: every registered place")
+    args = parser.parse_args()
+
+    for place_id in args.place_ids or sorted(place_registry.names()):
+        menu_listing = load_menu_listing(place_id)
+        if not menu_listing:
+            continue
+        matcher = LexicalMenuMatcher(menu_listing)
+        print(f"=== {place_registry.name(place_id)} ({place_id}): {len(matcher.automaton.patterns)} patterns ===")
+        for menu in menu_listing:
+            for name in menu["menu_name"]:
+                norm = normalize_text(name).strip()
+                if len(norm.replace(" ", "")) < LEXICAL_MIN_PATTERN_CHARS:
+                    print(f"  too short  [{menu['id']}] {name!r}")
+                elif _KOREAN_VARIANTS.search(_DOUBLED.sub(r"\1", name.lower())):
+                    print(f"  respelled  [{menu['id']}] {name!r} -> {norm!r}")
+        for pattern, menu_ids in sorted(matcher.ambiguous.items()):
+            print(f"  ambiguous  {pattern.strip()!r} names menus {sorted(menu_ids)}")
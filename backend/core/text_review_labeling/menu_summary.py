@@ -2,38 +2,41 @@ import warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
 warnings.filterwarnings("ignore", category=UserWarning)
 
-from text_review_labeling.gemini_calls import _call_gemini_v3
-import json
+from text_review_labeling.gemini_calls import _call_gemini_v3, cached_gemini_v3
 import time
-import pandas as pd
-from typing import Dict
-from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from concurrent.futures import as_completed
 import vertexai
 
 from text_review_labeling.constants import (
     GCP_PROJECT_ID,
     GCP_LOCATION,
-    PROMPT_TEMPLATE,
+    PROMPT_PREFIX_TEMPLATE,
+    PROMPT_SUFFIX_TEMPLATE,
+    PROMPT_PACKED_SUFFIX_TEMPLATE,
+    PROMPT_PACKED_ITEM_TEMPLATE,
+    PACK_MAX_MENUS,
+    PACK_MAX_REVIEWS,
+    SUMMARY_MODEL_GEMINI_3,
     DIETARY_OPTIONS_ALL
 )
-from text_review_labeling.schema import MenuReviewSummary
+from text_review_labeling.assignment import ReviewMenuAssignment
+from text_review_labeling.context_cache import context_cache_manager
+from text_review_labeling.schema import MenuReviewSummary, PackedMenuReviewSummaries
 from utils.helpers import get_curr_time
-from utils.path_utils import MENU_METADATA_PATH_TEMPLATE
+from utils.menu_store import read_menus, write_dish, write_menus
+from utils.events import event_bus, summaries_channel
+from utils.pools import shared_pool
 
 vertexai.init(project=GCP_PROJECT_ID, location=GCP_LOCATION)
 
 def load_base_menu(place_id: str) -> Dict[str, Dict]:
     """Loads the updated menu metadata structure."""
-    menu_file = MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id)
-    if not menu_file:
-        print(f"Warning: Base menu file not found for {place_id}")
-        return {}
-
-    print(f"[{get_curr_time()}] Loading menu metadata from {menu_file}")
-
-    with open(menu_file, 'r') as f:
-        data = json.load(f)
-        return data  # Return the whole structure: { "i": {"from_menuboard": item, "from_reviews": None} }
+    print(f"[{get_curr_time()}] Loading menu metadata for {place_id}")
+    data = read_menus(place_id)
+    if not data:
+        print(f"Warning: Base menu not found for {place_id}")
+    return data  # Return the whole structure: { "i": {"from_menuboard": item, "from_reviews": None} }
 
 def leave_only_relevant_evidence_ids(menu_from_reviews: Dict[str, Dict]) -> Dict[str, Dict]:
     relevant_review_ids = menu_from_reviews['relevant_review_ids']
@@ -100,62 +103,193 @@ def consolidate_dietary_info(menu: Dict[str, Dict]) -> Dict[str, str]:
             
     return consolidated_info
 
-def _process_single_menu(menu_id, df_labeled, full_menu_data):
-    """Worker function to process a single menu item."""
-    col_name = menu_id if menu_id in df_labeled.columns else str(menu_id)
-    if col_name not in df_labeled.columns:
+def build_shared_prefix(full_menu_data):
+    """
+    Prompt prefix shared by every menu of a restaurant: instructions and the full menu list.
+    The list includes the target dish so the prefix is identical across dishes; the prompt
+    defines the target's siblings as every other entry.
+    """
+    menu_items = "\n-".join([
+        v['from_menuboard']['name']+f"({v['from_menuboard']['description']})" if v['from_menuboard'].get('description') else v['from_menuboard']['name']
+        for v in full_menu_data.values()
+    ])
+    return PROMPT_PREFIX_TEMPLATE.format(restaurant_menu_items="-" + menu_items)
+
+def _format_reviews(matched_reviews: List[Tuple[int, str]]):
+    return "\n\n".join(
+        [f"Review ID - {review_id}: {text}" for review_id, text in matched_reviews]
+    )
+
+def build_menu_prompt_parts(menu_id, assignment: ReviewMenuAssignment, full_menu_data):
+    """Builds (shared prefix, per-dish suffix) of the summary prompt, or None if no review matched the menu."""
+    if menu_id not in assignment:
         return None
         
-    matched_df = df_labeled[df_labeled[col_name] == 1]
+    matched_reviews = assignment.matched_reviews(menu_id)
     
-    if matched_df.empty:
+    if not matched_reviews:
         print(f"[{get_curr_time()}] Menu {menu_id}: No matched reviews, skipping")
         return None
 
-    print(f"[{get_curr_time()}] Menu {menu_id}: Analyzing {len(matched_df)} reviews...")
+    print(f"[{get_curr_time()}] Menu {menu_id}: Analyzing {len(matched_reviews)} reviews...")
 
     # Extract original info from the new structure
     menu_info_from_menuboard = full_menu_data.get(str(menu_id), {})['from_menuboard']
-    menu_name = menu_info_from_menuboard['name']
-    sibling_menu_items = "\n-".join([
-        v['from_menuboard']['name']+f"({v['from_menuboard']['description']})" if v['from_menuboard'].get('description') else v['from_menuboard']['name']
-        for v in full_menu_data.values() if v['from_menuboard'].get('name') != menu_name
-    ])
-    reviews_combined = "\n\n".join(
-        [f"Review ID - {idx}: {row['text']}" for idx, row in matched_df.iterrows()]
-    )
-    prompt = PROMPT_TEMPLATE.format(
-        menu_name=menu_name,
+    reviews_combined = _format_reviews(matched_reviews)
+    suffix = PROMPT_SUFFIX_TEMPLATE.format(
+        menu_name=menu_info_from_menuboard['name'],
         menu_info_from_menuboard={k: v for k, v in menu_info_from_menuboard.items() if k not in ['name', 'dietary_labels']},
-        sibling_menu_items = "-" + sibling_menu_items,
         reviews_combined=reviews_combined,
     )
+    return build_shared_prefix(full_menu_data), suffix
+
+def build_menu_prompt(menu_id, assignment: ReviewMenuAssignment, full_menu_data):
+    """Builds the full per-menu summary prompt, or returns None if no review matched the menu."""
+    parts = build_menu_prompt_parts(menu_id, assignment, full_menu_data)
+    if parts is None:
+        return None
+    prefix, suffix = parts
+    return prefix + suffix
+
+def _call_with_retries(label, suffix, schema, prefix, place_id=None):
+    """Calls Gemini with 429 retries, using the place's cached prefix when available."""
+    # Answered from the response cache: no need to create (and pay for) a context cache
+    cached = cached_gemini_v3(suffix, schema, model=SUMMARY_MODEL_GEMINI_3, prefix=prefix)
+    if cached is not None:
+        return cached
+    cache_name = context_cache_manager.get(place_id, SUMMARY_MODEL_GEMINI_3, prefix) if place_id else None
 
     max_attempts = 5
     sleep_time = 20
     for attempt in range(max_attempts):
         try:
-            summary_dict = _call_gemini_v3(prompt, MenuReviewSummary)
-            return summary_dict
+            return _call_gemini_v3(suffix, schema, prefix=prefix, cached_content=cache_name)
         except Exception as e:
             status_code = getattr(e, 'code', None) or getattr(e, 'status_code', None)
             if status_code == 429:
                 if attempt < max_attempts - 1:
-                    print(f"[{get_curr_time()}] Menu {menu_id}: 429 Error - Retrying in {sleep_time}s (Attempt {attempt + 1}/{max_attempts})")
+                    print(f"[{get_curr_time()}] {label}: 429 Error - Retrying in {sleep_time}s (Attempt {attempt + 1}/{max_attempts})")
                     time.sleep(sleep_time)
                     continue
                 else:
-                    print(f"[{get_curr_time()}] Menu {menu_id}: Max retries reached for 429 Error.")
+                    print(f"[{get_curr_time()}] {label}: Max retries reached for 429 Error.")
                     return None
+            elif cache_name is not None:
+                # The cached prefix may have expired or been evicted; fall back to an inline prompt
+                print(f"[{get_curr_time()}] {label}: Cached-prefix call failed ({str(e)}), retrying inline")
+                context_cache_manager.invalidate(cache_name)
+                cache_name = None
+                continue
             else:
-                print(f"[{get_curr_time()}] Menu {menu_id}: Error - {str(e)}")
+                print(f"[{get_curr_time()}] {label}: Error - {str(e)}")
                 return None
     return None
 
+def _process_single_menu(menu_id, assignment: ReviewMenuAssignment, full_menu_data, place_id=None):
+    """Worker function to process a single menu item (`assignment` is only read)."""
+    parts = build_menu_prompt_parts(menu_id, assignment, full_menu_data)
+    if parts is None:
+        return None
+    prefix, suffix = parts
+    return _call_with_retries(f"Menu {menu_id}", suffix, MenuReviewSummary, prefix, place_id)
+
+
+def pack_menus(match_counts: Dict[str, int], max_menus: int = PACK_MAX_MENUS, max_reviews: int = PACK_MAX_REVIEWS) -> List[List[str]]:
+    """Greedily groups menus (fewest matches first) into packs bounded by dish count and review count."""
+    packs, current, current_reviews = [], [], 0
+    for menu_id, n in sorted(match_counts.items(), key=lambda x: x[1]):
+        if n <= 0:
+            continue
+        if current and (len(current) >= max_menus or current_reviews + n > max_reviews):
+            packs.append(current)
+            current, current_reviews = [], 0
+        current.append(menu_id)
+        current_reviews += n
+    if current:
+        packs.append(current)
+    return packs
+
+def build_packed_prompt_parts(menu_ids, assignment: ReviewMenuAssignment, full_menu_data):
+    """Builds (shared prefix, packed suffix) covering several menus; menus without matches are left out."""
+    targets = []
+    for menu_id in menu_ids:
+        matched_reviews = assignment.matched_reviews(menu_id) if menu_id in assignment else []
+        if not matched_reviews:
+            continue
+        menu_info_from_menuboard = full_menu_data[str(menu_id)]['from_menuboard']
+        targets.append(PROMPT_PACKED_ITEM_TEMPLATE.format(
+            menu_id=menu_id,
+            menu_name=menu_info_from_menuboard['name'],
+            menu_info_from_menuboard={k: v for k, v in menu_info_from_menuboard.items() if k not in ['name', 'dietary_labels']},
+            reviews_combined=_format_reviews(matched_reviews),
+        ))
+    if not targets:
+        return None
+    suffix = PROMPT_PACKED_SUFFIX_TEMPLATE.format(targets="\n\n".join(targets))
+    return build_shared_prefix(full_menu_data), suffix
+
+def _process_menu_pack(menu_ids, assignment: ReviewMenuAssignment, full_menu_data, place_id=None):
+    """Summarizes a pack of menus in one request and splits the result back per menu."""
+    parts = build_packed_prompt_parts(menu_ids, assignment, full_menu_data)
+    if parts is None:
+        return {}
+    prefix, suffix = parts
+    print(f"[{get_curr_time()}] Pack {menu_ids}: Analyzing {assignment.n_matches(menu_ids)} reviews...")
+    packed = _call_with_retries(f"Pack {menu_ids}", suffix, PackedMenuReviewSummaries, prefix, place_id)
+    if not packed:
+        return {}
+
+    results = {}
+    for summary in packed['summaries']:
+        menu_id = str(summary.pop('menu_id'))
+        if menu_id not in menu_ids:
+            continue
+        # Evidence must come from the reviews listed under this dish
+        matched_ids = set(assignment.matched_review_ids(menu_id).tolist())
+        summary['relevant_review_ids'] = [rid for rid in summary['relevant_review_ids'] if rid in matched_ids]
+        results[menu_id] = summary
+    return results
+
+
+def apply_menu_summary(full_menu_data: Dict[str, Dict], menu_id: str, summary_dict: Dict):
+    """Stores a MenuReviewSummary result on its menu entry and consolidates dietary info."""
+    full_menu_data[menu_id]['from_reviews'] = leave_only_relevant_evidence_ids(summary_dict)
+    full_menu_data[menu_id]['dietary_options'] = consolidate_dietary_info(full_menu_data[menu_id])
+
+
+def _store_and_publish(place_id: str, full_menu_data: Dict[str, Dict], menu_id: str, summary_dict: Dict):
+    """Applies one finished summary, persists the dish's record and announces it on the summaries channel."""
+    apply_menu_summary(full_menu_data, menu_id, summary_dict)
+    write_dish(place_id, menu_id, full_menu_data[menu_id])
+    event_bus.publish(summaries_channel(place_id), "menu", {
+        "menu_id": menu_id,
+        "from_reviews": full_menu_data[menu_id]['from_reviews'],
+        "dietary_options": full_menu_data[menu_id]['dietary_options'],
+    })
+
+
+def save_menu_summaries(place_id: str, full_menu_data: Dict[str, Dict]) -> str:
+    """Fills menuboard-only dietary options, sorts menus by review mentions and writes menus.json."""
+    for menu_id, menu in full_menu_data.items():
+        dietary_labels = menu['from_menuboard']['dietary_labels']
+        if menu['from_reviews'] is None:
+            for do in DIETARY_OPTIONS_ALL:
+                full_menu_data[menu_id]['dietary_options'] = {do: {'tag': 'not_verified', 'evidences': []} if do in dietary_labels else None for do in DIETARY_OPTIONS_ALL}
 
-def generate_menu_summaries(place_id: str, df_labeled: pd.DataFrame):
+    # Shards, the index and the menus.json view are ordered by review mentions
+    return write_menus(place_id, full_menu_data)
+
+
+def generate_menu_summaries(place_id: str, assignment: ReviewMenuAssignment, menu_ids: Optional[List[str]] = None,
+                            on_summary: Optional[Callable[[str, Dict], None]] = None):
     """
     Generate review-based summaries and updates the menu metadata.
+    Menus are handled in completion order: each finished dish's record is
+    persisted and published on the place's summaries channel right away.
+    If `menu_ids` is given, only those menus are (re-)summarized; the others keep
+    whatever summary they already hold.
+    `on_summary(menu_id, menu)` is called for every dish once it is persisted.
+    The place's context cache is kept for later passes; callers release it when done.
     """
 
     # 0. Load Menu Metadata
@@ -165,47 +299,72 @@ def generate_menu_summaries(place_id: str, df_labeled: pd.DataFrame):
 
     # 1. Identify menu items to process (keys in full_menu_data)
     menu_keys = list(full_menu_data.keys())
+    if menu_ids is not None:
+        selected = set(map(str, menu_ids))
+        menu_keys = [k for k in menu_keys if k in selected]
 
     print(f"\n=== Generating Menu Review Summaries ===")
     print(f"[{get_curr_time()}] Found {len(menu_keys)} menus to analyze")
 
-    # 2. Process each menu in parallel
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        # Create a mapping of future to key to update the correct entry
-        future_to_key = {
-            executor.submit(_process_single_menu, k, df_labeled, full_menu_data): k
-            for k in menu_keys
-        }
-        
-        for future in future_to_key:
-            k = future_to_key[future]
-            try:
-                res = future.result()
-                if res:
-                    full_menu_data[k]['from_reviews'] = leave_only_relevant_evidence_ids(res)
-                    full_menu_data[k]['dietary_options'] = consolidate_dietary_info(full_menu_data[k])
-            except Exception as e:
-                print(f"[{get_curr_time()}] Menu {k}: Unexpected error - {str(e)}")
-
-    for menu_id, menu in full_menu_data.items():
-        dietary_labels = menu['from_menuboard']['dietary_labels']
-        if menu['from_reviews'] is None:
-            for do in DIETARY_OPTIONS_ALL:
-                full_menu_data[menu_id]['dietary_options'] = {do: {'tag': 'not_verified', 'evidences': []} if do in dietary_labels else None for do in DIETARY_OPTIONS_ALL}
-
-    # 3. Save updated results back to MENU_METADATA_PATH_TEMPLATE
-    output_path = MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id)
-
-    n_mentioned = dict(
-        (menu_id, 0 if menu['from_reviews'] is None else len(menu['from_reviews']['relevant_review_ids']) )
-        for menu_id, menu in full_menu_data.items()
-    )
-    full_menu_data_sorted = dict(sorted(full_menu_data.items(), key=lambda x: n_mentioned[x[0]], reverse=True))
+    # 2. Process each menu in parallel (on the Gemini pool shared by all places in this process)
+    executor = shared_pool("gemini")
+    # Create a mapping of future to key to update the correct entry
+    future_to_key = {
+        executor.submit(_process_single_menu, k, assignment, full_menu_data, place_id): k
+        for k in menu_keys
+    }
     
-    with open(output_path, 'w') as f:
-        json.dump(full_menu_data_sorted, f, indent=4)
+    for future in as_completed(future_to_key):
+        k = future_to_key[future]
+        try:
+            res = future.result()
+            if res:
+                _store_and_publish(place_id, full_menu_data, k, res)
+                if on_summary is not None:
+                    on_summary(k, full_menu_data[k])
+        except Exception as e:
+            print(f"[{get_curr_time()}] Menu {k}: Unexpected error - {str(e)}")
+
+    # 3. Save updated results (dish records, index and the menus.json view)
+    output_path = save_menu_summaries(place_id, full_menu_data)
 
     print(f"\n[{get_curr_time()}] Completed analysis for {len(menu_keys)} menus")
     print(f"[{get_curr_time()}] Saved results to {output_path}")
 
     return list(full_menu_data.values())
+
+
+def generate_packed_summaries(place_id: str, assignment: ReviewMenuAssignment, menu_ids: List[str]):
+    """
+    Summarizes low-evidence (long-tail) menus by packing several dishes into each request.
+    `assignment` must cover every menu in `menu_ids`.
+    """
+    full_menu_data = load_base_menu(place_id)
+    if not full_menu_data:
+        return []
+
+    menu_ids = [str(m) for m in menu_ids if str(m) in full_menu_data and str(m) in assignment]
+    counts = assignment.counts()
+    packs = pack_menus({m: counts[m] for m in menu_ids})
+
+    print(f"\n=== Generating Packed Menu Review Summaries ===")
+    print(f"[{get_curr_time()}] Packed {len(menu_ids)} long-tail menus into {len(packs)} requests")
+
+    n_done = 0
+    executor = shared_pool("gemini")
+    future_to_pack = {
+        executor.submit(_process_menu_pack, pack, assignment, full_menu_data, place_id): pack
+        for pack in packs
+    }
+    for future in as_completed(future_to_pack):
+        pack = future_to_pack[future]
+        try:
+            for menu_id, res in future.result().items():
+                _store_and_publish(place_id, full_menu_data, menu_id, res)
+                n_done += 1
+        except Exception as e:
+            print(f"[{get_curr_time()}] Pack {pack}: Unexpected error - {str(e)}")
+
+    output_path = save_menu_summaries(place_id, full_menu_data)
+    print(f"[{get_curr_time()}] Summarized {n_done}/{len(menu_ids)} long-tail menus into {output_path}")
+    return list(full_menu_data.values())
@@ -1,5 +1,6 @@
 import argparse
-import json
+import os
+import pickle
 import pandas as pd
 import numpy as np
 import warnings
@@ -7,16 +8,31 @@ import time
 from sklearn.metrics.pairwise import cosine_similarity
 
 from text_review_labeling.constants import (
-    GENERAL_REVIEW_QUERY
+    GENERAL_REVIEW_QUERY,
+    INCREMENTAL_MIN_EVIDENCE_DELTA,
+    LEXICAL_MATCH_SCORE,
+    LEXICAL_DENSE_SKIP_MIN_REVIEWS,
+    LEXICAL_MIN_PATTERN_CHARS,
+    TEXT_EMBEDDING_MODEL,
+    TOP_MENUS,
+    SUMMARY_MODEL_GEMINI_3,
+    PROMPT_PREFIX_TEMPLATE,
+    PROMPT_SUFFIX_TEMPLATE
 )
 from text_review_labeling.embedding import (
     generate_text_embeddings_from_json,
     get_query_embeddings,
     build_review_queries
 )
-from text_review_labeling.menu_summary import generate_menu_summaries
-from utils.helpers import get_curr_time
-from utils.path_utils import MENU_METADATA_PATH_TEMPLATE
+from text_review_labeling.assignment import ReviewMenuAssignment
+from text_review_labeling.lexical import LexicalMenuMatcher
+from text_review_labeling.menu_summary import generate_menu_summaries, generate_packed_summaries
+from text_review_labeling.context_cache import context_cache_manager
+from utils.helpers import get_curr_time, load_json
+from utils.artifact_store import artifact_sync
+from utils.menu_store import read_index
+from utils.manifest import digest_file, digest_text, digest_value, is_fresh, manifest_digest, write_manifest
+from utils.path_utils import MENU_METADATA_PATH_TEMPLATE, MATCH_STATE_PATH_TEMPLATE, REVIEWS_DF_PATH_TEMPLATE, SCRAPED_REVIEW_PATH_TEMPLATE
 
 warnings.filterwarnings("ignore")
 pd.set_option('display.max_rows', 100)
@@ -28,32 +44,36 @@ def load_menu_listing(place_id: str):
     print(f"[{get_curr_time()}] Loading processed menu from {menu_file}...")
     
     try:
-        with open(menu_file, 'r') as f:
-            data = json.load(f)
-            
-            menu_listing = []
-            for menu_id, entry in data.items():
-                item = entry.get('from_menuboard', {})
-                name = item.get('name')
-                nicknames = item.get('nicknames', [])
-                if name:
-                    menu_listing.append({
-                        "id": str(menu_id), # Use the dictionary key as ID
-                        "menu_name": [name] + nicknames
-                    })
-            return menu_listing
+        data = load_json(menu_file)
+        menu_listing = []
+        for menu_id, entry in data.items():
+            item = entry.get('from_menuboard', {})
+            name = item.get('name')
+            nicknames = item.get('nicknames', [])
+            if name:
+                menu_listing.append({
+                    "id": str(menu_id), # Use the dictionary key as ID
+                    "menu_name": [name] + nicknames
+                })
+        return menu_listing
     except Exception as e:
         print(f"Error loading menu JSON: {e}")
         return []
 
-def compute_max_similarities(df_reviews, df_menu):    
+def compute_max_similarities(df_reviews, df_menu, dense_mask=None):
+    """
+    Max cosine similarity per (review, menu). Rows where `dense_mask` is False are
+    not scored and get 0 (they are expected to be filled in by lexical hits).
+    """
     if df_reviews.empty or df_menu.empty:
         return pd.DataFrame()
         
-    review_embs = np.stack(df_reviews['embedding'].values)
     menu_embs = np.stack(df_menu['embedding'].values)
-    
-    similarities = cosine_similarity(review_embs, menu_embs)
+    similarities = np.zeros((len(df_reviews), len(menu_embs)))
+    rows = np.arange(len(df_reviews)) if dense_mask is None else np.flatnonzero(dense_mask)
+    if len(rows):
+        review_embs = np.stack(df_reviews['embedding'].values[rows])
+        similarities[rows] = cosine_similarity(review_embs, menu_embs)
     sim_df = pd.DataFrame(similarities, columns=df_menu['menu_id'])
     
     # Group by menu_id and take max similarity if multiple queries per menu
@@ -62,42 +82,67 @@ def compute_max_similarities(df_reviews, df_menu):
 
     return sim_df_grouped
 
-def find_optimal_threshold(sim_df, max_matches_per_menu):
+
+def fuse_lexical_hits(sim_df, pairs, score=LEXICAL_MATCH_SCORE):
+    """Raises the similarity of every (row position, menu id) lexical hit to at least `score`."""
+    columns = {str(col): i for i, col in enumerate(sim_df.columns) if col != 'text'}
+    values = sim_df.values
+    for row, menu_id in pairs:
+        col = columns.get(str(menu_id))
+        if col is not None and values[row, col] < score:
+            sim_df.iat[row, col] = score
+    return sim_df
+
+
+def score_reviews(df_reviews, df_menu, menu_listing):
+    """
+    Fuses literal dish-name hits with embedding similarities.
+    For large review sets, reviews that already name a dish skip dense scoring entirely.
+    """
+    matcher = LexicalMenuMatcher(menu_listing)
+    pairs = matcher.match_all(df_reviews['text'].values)
+
+    dense_mask = None
+    if len(df_reviews) >= LEXICAL_DENSE_SKIP_MIN_REVIEWS:
+        dense_mask = np.ones(len(df_reviews), dtype=bool)
+        dense_mask[[row for row, _ in pairs]] = False
+        print(f"[{get_curr_time()}] Lexical prefilter: {len(df_reviews) - dense_mask.sum()} of "
+              f"{len(df_reviews)} reviews skip dense scoring")
+
+    sim_df = compute_max_similarities(df_reviews, df_menu, dense_mask=dense_mask)
+    if sim_df.empty:
+        return sim_df
+    print(f"[{get_curr_time()}] Lexical prefilter: {len(pairs)} review-menu name hits")
+    return fuse_lexical_hits(sim_df, pairs)
+
+def find_optimal_threshold(sim_df, max_matches_per_menu, review_ids):
     thresholds = np.arange(0.60, 0.90, 0.01)
     menu_columns = [col for col in sim_df.columns if col != 'text']
+    scores = sim_df[menu_columns].to_numpy(dtype=float)
     optimal_threshold = 0.70 # Default
     
     for threshold in thresholds:
-        match_counts = {}
-        for menu_id in menu_columns:
-            match_count = (sim_df[menu_id] >= threshold).sum()
-            match_counts[menu_id] = match_count
-        
-        if not match_counts:
+        if not menu_columns:
             continue
-            
-        max_matches = max(match_counts.values())
+        max_matches = (scores >= threshold).sum(axis=0).max()
         if max_matches <= max_matches_per_menu:
             optimal_threshold = threshold
             break
     
     optimal_threshold = round(optimal_threshold, 2)
-    df_labeled = sim_df.copy()
-    for menu_id in menu_columns:
-        df_labeled[menu_id] = (df_labeled[menu_id] >= optimal_threshold).astype(int)
+    assignment = label_menus(sim_df, optimal_threshold, review_ids)
     
-    return optimal_threshold, df_labeled
+    return optimal_threshold, assignment
 
 
-def filter_top_20(df_labeled):
-    # based on the number of true values in each column, filter top 20 columns
-    menu_ids = [col for col in df_labeled.columns if col != 'text']
-    print(df_labeled.columns)
-    menu_id_counts = df_labeled[menu_ids].sum()
-    menu_id_counts = menu_id_counts.sort_values(ascending=False)
-    menu_id_counts = menu_id_counts.head(20) # todo: revert
-    df_labeled = df_labeled[['text'] + list(menu_id_counts.index)]
-    return df_labeled
+def label_menus(sim_df, threshold, review_ids):
+    """Turns similarity scores into a sparse review-menu assignment indexed by review id."""
+    return ReviewMenuAssignment.from_similarities(sim_df, threshold, review_ids)
+
+
+def filter_top_20(assignment):
+    # keep the TOP_MENUS menus with the most matched reviews
+    return assignment.top(TOP_MENUS)
 
 
 def review_text_embeddings(place_id):
@@ -115,11 +160,88 @@ def review_text_embeddings(place_id):
     return df_reviews
 
 
-def match_and_summarize_top_20(place_id, df_reviews):
-    """Match reviews to menu items, filter top 20, and generate menu summaries."""
-    print(f"\n[{get_curr_time()}] --- Starting Match and Filter for {place_id} ---")
-    start_time = time.time()
-    
+def review_embedding_inputs(place_id):
+    """Fingerprints the review embeddings (reviews_df.pkl) are built from."""
+    return {
+        "reviews": digest_file(SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id)),
+        "model": TEXT_EMBEDDING_MODEL,
+    }
+
+
+def save_reviews_df(place_id, df_reviews, inputs=None):
+    """Pickles the review embeddings for the next steps and records what they were built from."""
+    save_path = REVIEWS_DF_PATH_TEMPLATE.format(place_id=place_id)
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    df_reviews.to_pickle(save_path)
+    write_manifest(place_id, "review_embeddings", inputs or review_embedding_inputs(place_id), [save_path])
+    return save_path
+
+
+def menu_summary_inputs(place_id):
+    """
+    Fingerprints the review-based menu summaries in menus.json depend on.
+    Chains on the menu listing and review embedding manifests, so a rebuilt upstream stage
+    makes the summaries stale too.
+    """
+    return {
+        "menu_listing": manifest_digest(place_id, "menu_listing"),
+        "review_embeddings": manifest_digest(place_id, "review_embeddings"),
+        "model": SUMMARY_MODEL_GEMINI_3,
+        "prompt": digest_text(PROMPT_PREFIX_TEMPLATE + PROMPT_SUFFIX_TEMPLATE),
+        "queries": digest_value(GENERAL_REVIEW_QUERY),
+        "lexical": digest_value([LEXICAL_MIN_PATTERN_CHARS, LEXICAL_MATCH_SCORE, LEXICAL_DENSE_SKIP_MIN_REVIEWS]),
+    }
+
+
+def menu_summary_outputs(place_id):
+    return [MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id)]
+
+
+def menu_summaries_fresh(place_id, inputs=None):
+    """
+    True if the place's dish summaries are up to date.
+    menus.json is first written by the menu listing with every summary empty, so a menus.json
+    without a manifest is only adopted as summarized when some dish actually has a summary.
+    """
+    adopt_legacy = any(entry["summarized"] for entry in read_index(place_id))
+    return is_fresh(place_id, "menu_summaries", inputs or menu_summary_inputs(place_id),
+                    menu_summary_outputs(place_id), adopt_legacy=adopt_legacy)
+
+
+def get_match_sets(assignment):
+    """Returns {menu_id: set of matched review ids} for the labeled menus."""
+    return assignment.match_sets()
+
+
+def save_match_state(place_id, state):
+    path = MATCH_STATE_PATH_TEMPLATE.format(place_id=place_id)
+    with open(path, 'wb') as f:
+        pickle.dump(state, f)
+    artifact_sync.publish(path)
+
+
+def load_match_state(place_id):
+    path = MATCH_STATE_PATH_TEMPLATE.format(place_id=place_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def embed_new_reviews(place_id, df_reviews):
+    """Embeds only reviews missing from `df_reviews` and appends them (index continues)."""
+    known_ids = set(df_reviews['review_id'].astype(str))
+    new_reviews = generate_text_embeddings_from_json(place_id=place_id, skip_review_ids=known_ids)
+    if not new_reviews:
+        return df_reviews, df_reviews.iloc[0:0]
+
+    df_new = pd.DataFrame(new_reviews)
+    df_new.index = pd.RangeIndex(len(df_reviews), len(df_reviews) + len(df_new))
+    return pd.concat([df_reviews, df_new]), df_new
+
+
+def match_top_20(place_id, df_reviews):
+    """Match reviews to menu items and keep the top 20 most mentioned menus."""
     # Load menu listing
     menu_listing = load_menu_listing(place_id)
     if not menu_listing:
@@ -137,33 +259,156 @@ def match_and_summarize_top_20(place_id, df_reviews):
     
     # Compute similarities & labels
     print(f"[{get_curr_time()}] Computing similarities...")
-    sim_df = compute_max_similarities(df_reviews, df_menu)
+    sim_df = score_reviews(df_reviews, df_menu, menu_listing)
     
     print(f"[{get_curr_time()}] Optimizing threshold and labeling...")
     max_match_percentage = 0.80
     max_matches_per_menu = int(len(df_reviews) * max_match_percentage)
     
-    optimal_threshold, df_labeled = find_optimal_threshold(sim_df, max_matches_per_menu)
+    review_ids = df_reviews['review_id'].astype(int).values
+    optimal_threshold, assignment = find_optimal_threshold(sim_df, max_matches_per_menu, review_ids)
     
     print(f"[{get_curr_time()}] Recommended threshold: {optimal_threshold}")
     
     # Filter top 20
-    df_labeled = filter_top_20(df_labeled)
+    assignment = filter_top_20(assignment)
+
+    # Keep what incremental runs need to label new reviews without recomputing everything
+    save_match_state(place_id, {
+        "menu_listing": menu_listing,
+        "df_menu": df_menu[['menu_id', 'embedding']],
+        "sim_df": sim_df,
+        "review_ids": review_ids,
+        "threshold": optimal_threshold,
+        "matched": get_match_sets(assignment),
+    })
+    return assignment
+
+
+def incremental_match_and_summarize(place_id, df_reviews, min_evidence_delta=INCREMENTAL_MIN_EVIDENCE_DELTA):
+    """
+    Refreshes a place after new reviews arrived.
+    Only new reviews are embedded and scored against the stored menu query embeddings,
+    match sets are updated in place with the previous threshold, and only menus whose
+    matched evidence changed by more than `min_evidence_delta` are re-summarized.
+
+    Returns (assignment, stats), or (None, None) if no usable previous state exists.
+    """
+    state = load_match_state(place_id)
+    menu_listing = load_menu_listing(place_id)
+    if state is None or 'review_ids' not in state or state['menu_listing'] != menu_listing:
+        print(f"[{get_curr_time()}] No matching incremental state for {place_id}; a full run is required.")
+        return None, None
+
+    df_reviews, df_new = embed_new_reviews(place_id, df_reviews)
+    save_reviews_df(place_id, df_reviews)
+    print(f"[{get_curr_time()}] Embedded {len(df_new)} new reviews ({len(df_reviews)} total)")
+
+    sim_df = state['sim_df']
+    if not df_new.empty:
+        sim_new = score_reviews(df_new, state['df_menu'], menu_listing)
+        sim_new.index = df_new.index
+        sim_df = pd.concat([sim_df, sim_new[sim_df.columns]])
+
+    review_ids = df_reviews['review_id'].astype(int).values
+    assignment = filter_top_20(label_menus(sim_df, state['threshold'], review_ids))
+
+    summarized = {entry["menu_id"] for entry in read_index(place_id) if entry["summarized"]}
+    old_matched = state['matched']
+    new_matched = get_match_sets(assignment)
+    to_summarize = []
+    for menu_id, matched in new_matched.items():
+        previous = old_matched.get(menu_id)
+        if previous is None or menu_id not in summarized:
+            to_summarize.append(menu_id)
+            continue
+        delta = len(matched ^ previous) / max(len(previous), 1)
+        if delta > min_evidence_delta:
+            to_summarize.append(menu_id)
+
+    if to_summarize:
+        try:
+            generate_menu_summaries(place_id, assignment, menu_ids=to_summarize)
+        finally:
+            context_cache_manager.release(place_id)
+
+    # Each menu's baseline stays the evidence its stored summary was built from
+    matched = {**old_matched, **{menu_id: new_matched[menu_id] for menu_id in to_summarize}}
+    state.update({"sim_df": sim_df, "review_ids": review_ids, "matched": matched})
+    save_match_state(place_id, state)
+    write_manifest(place_id, "menu_summaries", menu_summary_inputs(place_id), menu_summary_outputs(place_id))
+
+    stats = {
+        "new_reviews": len(df_new),
+        "menus_resummarized": len(to_summarize),
+        "llm_calls_skipped": len(new_matched) - len(to_summarize),
+    }
+    print(f"[{get_curr_time()}] Incremental refresh: re-summarized {stats['menus_resummarized']} menus, "
+          f"skipped {stats['llm_calls_skipped']} LLM calls")
+    return assignment, stats
+
+
+def summarize_long_tail(place_id, assignment):
+    """Summarizes matched menus outside the top 20 with packed multi-dish requests."""
+    state = load_match_state(place_id)
+    if state is None:
+        return
+    all_assignment = label_menus(state['sim_df'], state['threshold'], state['review_ids'])
+    long_tail = [
+        menu_id for menu_id, n in all_assignment.counts().items()
+        if menu_id not in assignment and n > 0
+    ]
+    if long_tail:
+        generate_packed_summaries(place_id, all_assignment.select(long_tail), long_tail)
+
+
+def match_and_summarize_top_20(place_id, df_reviews, incremental=False, min_evidence_delta=INCREMENTAL_MIN_EVIDENCE_DELTA, pack_long_tail=False):
+    """
+    Match reviews to menu items, filter top 20, and generate menu summaries.
+    With `pack_long_tail`, the remaining matched menus are summarized too, several per request.
+    """
+    print(f"\n[{get_curr_time()}] --- Starting Match and Filter for {place_id} ---")
+    start_time = time.time()
+
+    if incremental:
+        assignment, _ = incremental_match_and_summarize(place_id, df_reviews, min_evidence_delta)
+        if assignment is not None:
+            print(f"[{get_curr_time()}] Match and filter completed in {time.time() - start_time:.2f}s")
+            return assignment
+    
+    assignment = match_top_20(place_id, df_reviews)
+    if assignment is None:
+        return None
     
     # Generate menu summaries
-    generate_menu_summaries(place_id, df_labeled)
+    inputs = menu_summary_inputs(place_id)
+    try:
+        generate_menu_summaries(place_id, assignment)
+        if pack_long_tail:
+            summarize_long_tail(place_id, assignment)
+    finally:
+        # Both passes share the place's cached prompt prefix
+        context_cache_manager.release(place_id)
+    write_manifest(place_id, "menu_summaries", inputs, menu_summary_outputs(place_id))
     
     total_time = time.time() - start_time
     print(f"[{get_curr_time()}] Match and filter completed in {total_time:.2f}s")
     
-    return df_labeled
+    return assignment
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--place_id", type=str, required=True, help="Google Place ID for the restaurant")
+    parser.add_argument("--incremental", action="store_true", help="Only embed new reviews and re-summarize changed menus")
+    parser.add_argument("--pack_long_tail", action="store_true", help="Also summarize menus outside the top 20 in packed requests")
     args = parser.parse_args()
 
+    if args.incremental:
+        df_reviews = pd.read_pickle(REVIEWS_DF_PATH_TEMPLATE.format(place_id=args.place_id))
+        match_and_summarize_top_20(args.place_id, df_reviews, incremental=True)
+        exit(0)
+
     # Step 1: Generate review embeddings
     df_reviews = review_text_embeddings(args.place_id)
     if df_reviews is None:
@@ -171,7 +416,7 @@ if __name__ == "__main__":
         exit(1)
     
     # Step 2: Match with menu and filter top 20 (includes menu summary generation)
-    df_labeled = match_and_summarize_top_20(args.place_id, df_reviews)
-    if df_labeled is None:
+    assignment = match_and_summarize_top_20(args.place_id, df_reviews, pack_long_tail=args.pack_long_tail)
+    if assignment is None:
         print("Failed to match and filter reviews. Exiting.")
         exit(1)
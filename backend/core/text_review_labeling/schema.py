@@ -88,3 +88,19 @@ class MenuReviewSummary(BaseModel):
         default_factory=list,
         description="Notes regarding discrepancies between the restaurant menu and customer reviews(excluding dietary restrictions or ingredient-related differences)."
     )
+
+# -------------------------
+# Packed summaries: several low-evidence menu items in one request
+# -------------------------
+
+class PackedMenuReviewSummary(MenuReviewSummary):
+    menu_id: str = Field(
+        description="Menu ID of the target menu item this summary is about, exactly as given in TARGET_MENU_ITEMS."
+    )
+
+
+class PackedMenuReviewSummaries(BaseModel):
+    summaries: List[PackedMenuReviewSummary] = Field(
+        default_factory=list,
+        description="One summary per target menu item, keyed by menu_id."
+    )
@@ -0,0 +1,171 @@
+import os
+import os.path as osp
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.helpers import load_json
+from utils.image_variants import content_version
+from utils.menu_store import read_menus
+from utils.path_utils import MENU_INDEX_PATH_TEMPLATE, RESTAURANT_OVERVIEW_PATH_TEMPLATE, COLLAGE_SRC_PATH_TEMPLATE
+
+# Memory budget for parsed artifacts; parsed JSON takes roughly this many times its file size
+ARTIFACT_CACHE_MAX_BYTES = int(os.getenv("DISHY_ARTIFACT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+JSON_EXPANSION = 4
+
+
+def _stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class ArtifactCache:
+    """
+    In-process LRU of parsed per-place artifacts.
+    An entry is keyed by (kind, place_id) and valid while its source files keep their
+    mtime/size/inode; once the estimated size of all entries passes `max_bytes`, the
+    least recently used ones are dropped. Each key is loaded by one thread at a time.
+    Cached values are shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int = ARTIFACT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[tuple, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind: str, place_id: str, sources: List[str], loader: Callable[[], Any],
+            cost: Callable[[Any], int] = None, tag: Any = None) -> Any:
+        """
+        Returns the cached value for (kind, place_id), calling `loader()` when any of `sources` changed.
+        `tag` is a further (hashable) input kept outside files, e.g. the restaurant name from the place
+        registry; a different tag reloads the entry just like a changed source.
+        `cost(value)` estimates the entry's memory; by default JSON_EXPANSION x the source file sizes.
+        """
+        key = (kind, place_id)
+        file_stamps = tuple(_stamp(str(path)) for path in sources)
+        stamp = (file_stamps, tag)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == stamp:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+            value = loader()
+            if cost is not None:
+                nbytes = cost(value)
+            else:
+                nbytes = JSON_EXPANSION * sum(s[1] for s in file_stamps if s is not None)
+            with self._lock:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._nbytes -= old[2]
+                self._entries[key] = (stamp, value, nbytes)
+                self._nbytes += nbytes
+                while self._nbytes > self.max_bytes and len(self._entries) > 1:
+                    _, (_, _, evicted) = self._entries.popitem(last=False)
+                    self._nbytes -= evicted
+        return value
+
+    def invalidate(self, place_id: str, kind: str = None):
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == place_id and kind in (None, key[0])]:
+                self._nbytes -= self._entries.pop(key)[2]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._nbytes, "hits": self.hits, "misses": self.misses}
+
+
+artifact_cache = ArtifactCache()
+
+
+class MenuIndex:
+    """The place's dish records with what the read endpoints derive from them built once."""
+    __slots__ = ("menus", "summary_events", "results")
+
+    def __init__(self, menus: Dict[str, Dict], place_id: str):
+        self.menus = menus  # menu id -> record, in popularity order
+        self.summary_events = [
+            {"menu_id": menu_id, "from_reviews": menu['from_reviews'], "dietary_options": menu.get('dietary_options')}
+            for menu_id, menu in menus.items() if menu.get('from_reviews') is not None
+        ]
+        self.results = [
+            {
+                "id": menu_id,
+                "title": menu.get("name", f"Menu {menu_id}"),
+                "description": menu.get("description", ""),
+                "imageUrl": f"/api/images/{place_id}/{menu_id}",
+            }
+            for menu_id, menu in menus.items()
+        ]
+
+    def get(self, menu_id) -> Optional[Dict]:
+        return self.menus.get(str(menu_id))
+
+
+def load_menu_index(place_id: str) -> Optional[MenuIndex]:
+    """
+    The place's menu as a MenuIndex, or None if it has none. Read from the per-dish records,
+    whose index is rewritten with every dish, so summaries show up before menus.json is exported.
+    """
+    path = MENU_INDEX_PATH_TEMPLATE.format(place_id=place_id)
+
+    def _load():
+        menus = read_menus(place_id)
+        return MenuIndex(menus, place_id) if menus else None
+
+    return artifact_cache.get("menus", place_id, [path], _load)
+
+
+def load_menus(place_id: str) -> Optional[Dict[str, Dict]]:
+    index = load_menu_index(place_id)
+    return index.menus if index is not None else None
+
+
+def load_overview(place_id: str) -> Optional[Dict]:
+    path = RESTAURANT_OVERVIEW_PATH_TEMPLATE.format(place_id=place_id)
+    return artifact_cache.get("overview", place_id, [path], lambda: load_json(path) if osp.exists(path) else None)
+
+
+def load_collage_index(place_id: str) -> Dict[str, Dict[str, List[str]]]:
+    """
+    {"collage": {menu_id: ["<rank>.png?v=<version>"]}, "src_review_urls": {menu_id: [url]}} for the
+    place's collage sources. Valid while no dish directory or its src_review_urls.json changes.
+    """
+    collage_dir = osp.dirname(osp.dirname(COLLAGE_SRC_PATH_TEMPLATE)).format(place_id=place_id)
+    menu_ids = sorted(os.listdir(collage_dir)) if osp.isdir(collage_dir) else []
+    sources = [collage_dir] + [osp.join(collage_dir, menu_id, "src_review_urls.json") for menu_id in menu_ids]
+
+    def _load():
+        index = {"collage": {}, "src_review_urls": {}}
+        for menu_id in menu_ids:
+            menu_path = osp.join(collage_dir, menu_id)
+            rank_urls_path = osp.join(menu_path, "src_review_urls.json")
+            if not osp.exists(rank_urls_path):
+                continue
+            rank_urls_dict = load_json(rank_urls_path)
+            index["src_review_urls"][menu_id] = list(rank_urls_dict.values())
+            # `v` changes when the file is rewritten, so served images can be cached as immutable
+            index["collage"][menu_id] = [
+                f"{rank}.png?v={content_version(osp.join(menu_path, f'{rank}.png'))}" for rank in rank_urls_dict
+            ]
+        return index
+
+    return artifact_cache.get("collage", place_id, sources, _load)
@@ -0,0 +1,401 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, wait
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from utils.helpers import get_curr_time
+from utils.path_utils import DATA_DIR, ARTIFACT_STORE_INDEX_PATH, REVIEW_TABLE_PATH_TEMPLATE
+from utils.pools import shared_pool
+
+# Where artifacts are shared between instances: "" keeps them local only, "gs://bucket/prefix"
+# uses Cloud Storage (honours STORAGE_EMULATOR_HOST), any other value is a shared directory
+ARTIFACT_STORE_URI = os.getenv("DISHY_ARTIFACT_STORE", "")
+# Budget for the local copies under DATA_DIR; least recently used places beyond it are dropped
+LOCAL_CACHE_MAX_BYTES = int(os.getenv("DISHY_LOCAL_CACHE_MAX_BYTES", 20 * 1024 ** 3))
+# A place is listed in the store at most this often; its files are then assumed current
+PREFETCH_TTL_S = 30
+EVICT_INTERVAL_S = 300
+# Per-instance state, never shared (any path component)
+UNSHARED_DIRS = {"cache", "jobs", "batch", "bundle"}
+# Derived caches each instance rebuilds from shared artifacts (e.g. the review table from reviews.json)
+LOCAL_ONLY_FILES = {os.path.basename(REVIEW_TABLE_PATH_TEMPLATE)}
+
+
+class LocalDirStore:
+    """A directory shared by all instances (e.g. a network mount); writes are copy-to-temp + rename."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _version(self, path: str) -> str:
+        st = os.stat(path)
+        return f"{st.st_mtime_ns}:{st.st_size}"
+
+    def list(self, prefix: str) -> Dict[str, str]:
+        versions = {}
+        for dirpath, _, filenames in os.walk(os.path.join(self.root, prefix)):
+            for filename in filenames:
+                if not filename.endswith(".tmp"):
+                    path = os.path.join(dirpath, filename)
+                    versions[os.path.relpath(path, self.root)] = self._version(path)
+        return versions
+
+    def download(self, key: str, dest_path: str) -> Optional[str]:
+        src_path = os.path.join(self.root, key)
+        if not os.path.exists(src_path):
+            return None
+        version = self._version(src_path)
+        _copy_atomic(src_path, dest_path)
+        return version
+
+    def upload(self, src_path: str, key: str) -> str:
+        dest_path = os.path.join(self.root, key)
+        _copy_atomic(src_path, dest_path)
+        return self._version(dest_path)
+
+
+class GCSStore:
+    """
+    Cloud Storage bucket (or a local emulator when STORAGE_EMULATOR_HOST is set).
+    An object only becomes visible once its upload completed, so readers never see a partial artifact.
+    """
+
+    def __init__(self, bucket_name: str, prefix: str = ""):
+        from google.cloud import storage
+
+        if os.getenv("STORAGE_EMULATOR_HOST"):
+            from google.auth.credentials import AnonymousCredentials
+            client = storage.Client(project=os.getenv("GOOGLE_CLOUD_PROJECT", "dishy-local"), credentials=AnonymousCredentials())
+        else:
+            client = storage.Client(project=os.getenv("GOOGLE_CLOUD_PROJECT"))
+        self.client = client
+        self.bucket = client.bucket(bucket_name)
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+
+    def list(self, prefix: str) -> Dict[str, str]:
+        return {
+            blob.name[len(self.prefix):]: str(blob.generation)
+            for blob in self.client.list_blobs(self.bucket, prefix=self.prefix + prefix)
+        }
+
+    def download(self, key: str, dest_path: str) -> Optional[str]:
+        blob = self.bucket.get_blob(self.prefix + key)
+        if blob is None:
+            return None
+        tmp_path = f"{dest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        blob.download_to_filename(tmp_path, if_generation_match=blob.generation)
+        os.replace(tmp_path, dest_path)
+        return str(blob.generation)
+
+    def upload(self, src_path: str, key: str) -> str:
+        blob = self.bucket.blob(self.prefix + key)
+        blob.upload_from_filename(src_path)
+        return str(blob.generation)
+
+
+def _copy_atomic(src_path: str, dest_path: str):
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.copyfile(src_path, tmp_path)
+    os.replace(tmp_path, dest_path)
+
+
+def _stamp(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _when_done(futures: List[Optional[Future]], fn):
+    """Calls `fn()` once every future in `futures` is done (right away if there are none)."""
+    futures = [future for future in futures if future is not None]
+    if not futures:
+        fn()
+        return
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def _one_done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            fn()
+
+    for future in futures:
+        future.add_done_callback(_one_done)
+
+
+def open_store(uri: str):
+    if not uri:
+        return None
+    if uri.startswith("gs://"):
+        bucket_name, _, prefix = uri[len("gs://"):].partition("/")
+        return GCSStore(bucket_name, prefix)
+    return LocalDirStore(uri[len("file://"):] if uri.startswith("file://") else uri)
+
+
+class ArtifactSync:
+    """
+    Keeps DATA_DIR in step with a shared artifact store, so instances reuse each other's outputs.
+    DATA_DIR acts as a read-through cache: `prefetch` pulls a place's artifacts that are missing
+    or outdated locally, `ensure_local` fetches a single file on demand, and `publish` uploads a
+    freshly written file in the background. Without a store every call is a no-op.
+    """
+
+    def __init__(self, store=None, data_dir=DATA_DIR, index_path=ARTIFACT_STORE_INDEX_PATH,
+                 max_bytes: int = LOCAL_CACHE_MAX_BYTES):
+        self.store = store
+        self.data_dir = str(data_dir)
+        self.index_path = str(index_path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: Dict[str, str] = {}  # key -> store version of the local copy
+        if store is not None and os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self._index = json.load(f)
+        self._pending: Dict[str, Future] = {}  # key -> its latest upload
+        self._queued: Dict[str, Future] = {}  # key -> its upload that has not started yet
+        self._uploaded: Dict[str, tuple] = {}  # key -> (mtime, size) of the local file last uploaded
+        self._prefetched: Dict[str, float] = {}  # place id -> last prefetch (also the LRU clock for eviction)
+        self._pins: Counter = Counter()  # place id -> running work that reads its files
+        self._last_evict = time.monotonic()
+
+    def key(self, path) -> Optional[str]:
+        """Store key of a DATA_DIR path, or None for paths that are not shared."""
+        rel = os.path.relpath(os.path.abspath(str(path)), self.data_dir)
+        parts = rel.split(os.sep)
+        if (rel.startswith("..") or rel.endswith(".tmp") or UNSHARED_DIRS & set(parts) or len(parts) < 2
+                or parts[-1] in LOCAL_ONLY_FILES):
+            return None
+        return "/".join(parts)
+
+    def _save_index(self):
+        with self._lock:
+            index = dict(self._index)
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def ensure_local(self, path) -> bool:
+        """Makes sure `path` exists locally, fetching it from the store if needed; returns whether it exists."""
+        if os.path.exists(path):
+            return True
+        key = self.key(path) if self.store is not None else None
+        if key is None:
+            return False
+        try:
+            version = self.store.download(key, str(path))
+        except Exception as e:
+            print(f"[{get_curr_time()}] Failed to fetch {key}: {e}")
+            return False
+        if version is None:
+            return False
+        with self._lock:
+            self._index[key] = version
+        self._save_index()
+        return True
+
+    def publish(self, path, after: Iterable[Future] = ()) -> Optional[Future]:
+        """
+        Uploads a file that was just written under DATA_DIR (in the background); returns the upload's future.
+        Uploads of one key run one at a time in publish order, and a publish made while the key's
+        next upload has not started yet joins it (that upload reads the file as it is by then).
+        With `after`, the upload starts once those uploads finished, and is dropped if one failed.
+        """
+        key = self.key(path) if self.store is not None else None
+        if key is None:
+            return None
+        after = [future for future in after if future is not None]
+        with self._lock:
+            queued = self._queued.get(key)
+            if queued is not None and not after:
+                return queued
+            previous = self._pending.get(key)
+            future = Future()
+            self._pending[key] = future
+            self._queued[key] = future
+
+        def _upload():
+            with self._lock:
+                if self._queued.get(key) is future:
+                    del self._queued[key]
+            failed = [f for f in after if f.exception() is not None or f.result() is None]
+            if failed:
+                print(f"[{get_curr_time()}] Not uploading {key}: {len(failed)} uploads it depends on failed")
+                future.set_result(None)
+                return
+            try:
+                stamp = _stamp(str(path))
+                with self._lock:
+                    unchanged = stamp is not None and self._uploaded.get(key) == stamp and key in self._index
+                    version = self._index.get(key) if unchanged else None
+                if not unchanged:
+                    version = self.store.upload(str(path), key)
+            except Exception as e:
+                print(f"[{get_curr_time()}] Failed to upload {key}: {e}")
+                future.set_result(None)
+                return
+            with self._lock:
+                self._index[key] = version
+                self._uploaded[key] = stamp
+            if not unchanged:
+                self._save_index()
+            future.set_result(version)
+
+        future.add_done_callback(lambda f: self._done_uploading(key, f))
+        _when_done([previous] + after, lambda: shared_pool("download").submit(_upload))
+        return future
+
+    def _done_uploading(self, key: str, future: Future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def flush(self, timeout: float = None):
+        """Waits for background uploads (call before a batch process exits)."""
+        with self._lock:
+            pending = list(self._pending.values())
+        wait(pending, timeout=timeout)
+
+    def prefetch(self, place_id: str, force: bool = False) -> int:
+        """Pulls the place's shared artifacts that are missing or outdated locally; returns how many were fetched."""
+        if self.store is None:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            recent = now - self._prefetched.get(place_id, float("-inf")) < PREFETCH_TTL_S
+            self._prefetched[place_id] = now
+        if recent and not force:
+            return 0
+        try:
+            remote = self.store.list(f"{place_id}/")
+        except Exception as e:
+            print(f"[{get_curr_time()}] Failed to list artifacts of {place_id}: {e}")
+            return 0
+        with self._lock:
+            todo = [
+                key for key, version in remote.items()
+                if key not in self._pending and self.key(os.path.join(self.data_dir, key)) is not None
+                and (self._index.get(key) != version or not os.path.exists(os.path.join(self.data_dir, key)))
+            ]
+
+        def _fetch(key):
+            version = self.store.download(key, os.path.join(self.data_dir, key))
+            if version is not None:
+                with self._lock:
+                    self._index[key] = version
+
+        futures = [shared_pool("download").submit(_fetch, key) for key in todo]
+        n_fetched = 0
+        for future in futures:
+            try:
+                future.result()
+                n_fetched += 1
+            except Exception as e:
+                print(f"[{get_curr_time()}] Failed to prefetch an artifact of {place_id}: {e}")
+        if todo:
+            self._save_index()
+            print(f"[{get_curr_time()}] Prefetched {n_fetched}/{len(todo)} artifacts of {place_id}")
+        self._maybe_evict()
+        return n_fetched
+
+    @contextmanager
+    def pinned(self, place_id: str):
+        """Keeps the place's local copy from being evicted while the enclosed work runs."""
+        with self._lock:
+            self._pins[place_id] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pins[place_id] -= 1
+                if self._pins[place_id] <= 0:
+                    del self._pins[place_id]
+
+    def _maybe_evict(self):
+        with self._lock:
+            if time.monotonic() - self._last_evict < EVICT_INTERVAL_S:
+                return
+            self._last_evict = time.monotonic()
+        self.evict()
+
+    def evict(self) -> List[str]:
+        """
+        Drops the local copies of least recently used places until DATA_DIR fits in `max_bytes`.
+        Places in use (pinned by running work or prefetched within PREFETCH_TTL_S), with uploads
+        in flight or with shared files that were never uploaded are kept.
+        """
+        if self.store is None or not os.path.isdir(self.data_dir):
+            return []
+        with self._lock:
+            index = dict(self._index)
+            last_used = dict(self._prefetched)
+            busy = {key.split("/")[0] for key in self._pending} | set(self._pins)
+        sizes, unsynced = {}, set()
+        for place_id in os.listdir(self.data_dir):
+            place_dir = os.path.join(self.data_dir, place_id)
+            if place_id in UNSHARED_DIRS or not os.path.isdir(place_dir):
+                continue
+            sizes[place_id] = 0
+            for dirpath, _, filenames in os.walk(place_dir):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    sizes[place_id] += os.path.getsize(path)
+                    key = self.key(path)
+                    if key is not None and key not in index:
+                        unsynced.add(place_id)
+        total = sum(sizes.values())
+        now = time.monotonic()
+        evicted = []
+        for place_id in sorted(sizes, key=lambda p: last_used.get(p, float("-inf"))):
+            if total <= self.max_bytes:
+                break
+            # Places with files the store does not have (yet) are never dropped
+            if place_id in busy or place_id in unsynced or now - last_used.get(place_id, float("-inf")) < PREFETCH_TTL_S:
+                continue
+            shutil.rmtree(os.path.join(self.data_dir, place_id), ignore_errors=True)
+            with self._lock:
+                for key in [key for key in self._index if key.startswith(f"{place_id}/")]:
+                    del self._index[key]
+                self._prefetched.pop(place_id, None)
+            total -= sizes[place_id]
+            evicted.append(place_id)
+        if evicted:
+            self._save_index()
+            print(f"[{get_curr_time()}] Evicted local copies of {len(evicted)} places")
+        return evicted
+
+
+artifact_sync = ArtifactSync(open_store(ARTIFACT_STORE_URI))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Syncs place artifacts between DATA_DIR and the artifact store")
+    parser.add_argument("--place_ids", type=str, nargs="+", required=True)
+    parser.add_argument("--push", action="store_true", help="Upload the local artifacts instead of fetching")
+    args = parser.parse_args()
+
+    if artifact_sync.store is None:
+        parser.error("Set DISHY_ARTIFACT_STORE (gs://bucket/prefix or a shared directory)")
+    for place_id in args.place_ids:
+        if args.push:
+            place_dir = os.path.join(artifact_sync.data_dir, place_id)
+            for dirpath, _, filenames in os.walk(place_dir):
+                for filename in filenames:
+                    artifact_sync.publish(os.path.join(dirpath, filename))
+        else:
+            artifact_sync.prefetch(place_id, force=True)
+    artifact_sync.flush()
+    print(f"[{get_curr_time()}] Done")
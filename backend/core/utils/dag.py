@@ -0,0 +1,196 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.helpers import get_curr_time
+
+# Task states; "done", "failed" and "skipped" are final
+PENDING, RUNNING, DONE, FAILED, SKIPPED = "pending", "running", "done", "failed", "skipped"
+
+
+class Task:
+    __slots__ = ("name", "fn", "inputs", "outputs", "status", "result", "error", "start", "end")
+
+    def __init__(self, name: str, fn: Callable[[], Any], inputs: Iterable[str], outputs: Iterable[str]):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.start = None
+        self.end = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end - self.start) if self.start is not None and self.end is not None else 0.0
+
+
+class TaskGraph:
+    """
+    Runs tasks as soon as the artifacts they read are available.
+    Each task declares the artifacts it reads (`inputs`) and writes (`outputs`); a task
+    may `emit` an output before it returns (e.g. one dish at a time), which releases the
+    tasks waiting on that artifact right away. Outputs not emitted by the time the task
+    returns are emitted with its return value. Running tasks may `add` further tasks,
+    so per-dish work can be planned once the dishes are known.
+    When a task fails, every task depending on its missing outputs is skipped.
+    """
+
+    def __init__(self, name: str = "pipeline", max_workers: int = 16):
+        self.name = name
+        self.max_workers = max_workers
+        self.tasks: Dict[str, Task] = {}
+        self._cond = threading.Condition()
+        self._producers: Dict[str, str] = {}
+        self._artifacts: Dict[str, Any] = {}
+        self._emitted_at: Dict[str, float] = {}
+        self._lost = set()
+        self._n_running = 0
+        self._t0 = None
+
+    def add(self, name: str, fn: Callable[[], Any], inputs: Iterable[str] = (), outputs: Iterable[str] = ()) -> Task:
+        task = Task(name, fn, inputs, outputs)
+        with self._cond:
+            if name in self.tasks:
+                raise ValueError(f"Duplicate task name: {name}")
+            for artifact in task.outputs:
+                if artifact in self._producers:
+                    raise ValueError(f"Artifact {artifact} is already produced by {self._producers[artifact]}")
+            self.tasks[name] = task
+            for artifact in task.outputs:
+                self._producers[artifact] = name
+            self._cond.notify_all()
+        return task
+
+    def emit(self, artifact: str, value: Any = None):
+        """Publishes an artifact; tasks waiting only on available artifacts become runnable."""
+        with self._cond:
+            if artifact in self._artifacts:
+                return
+            self._artifacts[artifact] = value
+            self._emitted_at[artifact] = time.perf_counter()
+            self._cond.notify_all()
+
+    def get(self, artifact: str, default: Any = None) -> Any:
+        with self._cond:
+            return self._artifacts.get(artifact, default)
+
+    def _ready(self, task: Task) -> bool:
+        return all(artifact in self._artifacts for artifact in task.inputs)
+
+    def _blocked(self, task: Task) -> bool:
+        """True when an input can never become available because its producer failed or was skipped."""
+        return any(artifact in self._lost for artifact in task.inputs)
+
+    def _run_task(self, task: Task):
+        try:
+            result = task.fn()
+            status, error = DONE, None
+        except Exception as e:
+            result, status, error = None, FAILED, e
+            print(f"[{get_curr_time()}] Task {task.name} failed: {e}")
+        with self._cond:
+            task.end = time.perf_counter()
+            task.status, task.result, task.error = status, result, error
+            for artifact in task.outputs:
+                if artifact in self._artifacts:
+                    continue
+                if status == DONE:
+                    self._artifacts[artifact] = result
+                    self._emitted_at[artifact] = task.end
+                else:
+                    self._lost.add(artifact)
+            self._n_running -= 1
+            self._cond.notify_all()
+
+    def run(self) -> Dict[str, Task]:
+        """Blocks until no task can make progress; returns all tasks by name."""
+        self._t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            with self._cond:
+                while True:
+                    progressed = False
+                    for task in list(self.tasks.values()):
+                        if task.status != PENDING:
+                            continue
+                        if self._ready(task):
+                            task.status, task.start = RUNNING, time.perf_counter()
+                            self._n_running += 1
+                            executor.submit(self._run_task, task)
+                            progressed = True
+                        elif self._blocked(task):
+                            task.status = SKIPPED
+                            self._lost.update(task.outputs)
+                            progressed = True
+                    if progressed:
+                        continue
+                    if self._n_running == 0:
+                        break
+                    self._cond.wait()
+                # Anything still pending waits on artifacts no task produces
+                for task in self.tasks.values():
+                    if task.status == PENDING:
+                        task.status = SKIPPED
+        return self.tasks
+
+    def critical_path(self) -> Tuple[float, List[Task]]:
+        """
+        Longest chain of measured work through the graph, as if workers were unlimited.
+        A task can start once its last input is emitted, so a producer only contributes
+        the time until it emitted that input. Returns (length in seconds, tasks on the path).
+        """
+        start_at: Dict[str, float] = {}
+        via: Dict[str, Optional[str]] = {}
+
+        def _start(task: Task) -> float:
+            if task.name not in start_at:
+                best, best_from = 0.0, None
+                for artifact in task.inputs:
+                    producer = self.tasks.get(self._producers.get(artifact))
+                    if producer is None or producer.start is None or artifact not in self._emitted_at:
+                        continue
+                    available = _start(producer) + (self._emitted_at[artifact] - producer.start)
+                    if available > best:
+                        best, best_from = available, producer.name
+                start_at[task.name], via[task.name] = best, best_from
+            return start_at[task.name]
+
+        finished = [task for task in self.tasks.values() if task.start is not None and task.end is not None]
+        if not finished:
+            return 0.0, []
+        last = max(finished, key=lambda task: _start(task) + task.duration)
+        length = _start(last) + last.duration
+
+        path, name = [], last.name
+        while name is not None:
+            path.append(self.tasks[name])
+            name = via[name]
+        return length, path[::-1]
+
+    def report(self) -> Dict[str, Any]:
+        """Prints per-task timings and the critical path; returns them as a dict."""
+        wall = max((task.end for task in self.tasks.values() if task.end is not None), default=self._t0) - self._t0
+        work = sum(task.duration for task in self.tasks.values())
+        cp_length, cp_tasks = self.critical_path()
+
+        print(f"\n=== {self.name}: task timings ===")
+        for task in sorted(self.tasks.values(), key=lambda t: (t.start is None, t.start or 0)):
+            offset = f"+{task.start - self._t0:7.2f}s" if task.start is not None else " " * 9
+            print(f"  {offset} {task.duration:7.2f}s  {task.status:<7} {task.name}")
+        print(f"[{get_curr_time()}] Wall clock {wall:.2f}s | sum of tasks {work:.2f}s | "
+              f"critical path {cp_length:.2f}s: {' -> '.join(task.name for task in cp_tasks)}")
+
+        return {
+            "wall_clock": wall,
+            "sum_of_tasks": work,
+            "critical_path": cp_length,
+            "critical_path_tasks": [task.name for task in cp_tasks],
+            "tasks": {
+                task.name: {"status": task.status, "duration": task.duration,
+                            "start": None if task.start is None else task.start - self._t0}
+                for task in self.tasks.values()
+            },
+        }
@@ -0,0 +1,88 @@
+import queue
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict, Iterator, Optional
+
+from utils.helpers import dumps_json
+
+
+class EventBus:
+    """
+    In-process publish/subscribe channel for pipeline progress events.
+    Each channel keeps a short history so subscribers that connect late
+    still receive everything published since the run started.
+    """
+
+    def __init__(self, history_size: int = 512):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(list)
+        self._history = defaultdict(lambda: deque(maxlen=history_size))
+        self._seq = defaultdict(int)
+
+    def reset(self, channel: str):
+        """Clears the history of a channel before a new run publishes to it."""
+        with self._lock:
+            self._history.pop(channel, None)
+
+    def drop(self, channel: str):
+        """Forgets a channel nobody will publish to again (its history and sequence)."""
+        with self._lock:
+            self._history.pop(channel, None)
+            self._seq.pop(channel, None)
+            if not self._subscribers.get(channel):
+                self._subscribers.pop(channel, None)
+
+    def publish(self, channel: str, event_type: str, data: Any = None):
+        with self._lock:
+            self._seq[channel] += 1
+            event = {"id": self._seq[channel], "type": event_type, "data": data}
+            self._history[channel].append(event)
+            subscribers = list(self._subscribers[channel])
+        for q in subscribers:
+            q.put(event)
+
+    def subscribe(self, channel: str, replay: bool = True) -> "queue.Queue":
+        q = queue.Queue()
+        with self._lock:
+            if replay:
+                for event in self._history[channel]:
+                    q.put(event)
+            self._subscribers[channel].append(q)
+        return q
+
+    def unsubscribe(self, channel: str, q: "queue.Queue"):
+        with self._lock:
+            if q in self._subscribers[channel]:
+                self._subscribers[channel].remove(q)
+            if not self._subscribers[channel]:
+                del self._subscribers[channel]
+
+    def stream(self, channel: str, final_types=("done", "error"), keepalive: float = 15.0) -> Iterator[Optional[Dict]]:
+        """Yields events until one of `final_types` arrives; yields None every `keepalive` seconds of silence."""
+        q = self.subscribe(channel)
+        try:
+            while True:
+                try:
+                    event = q.get(timeout=keepalive)
+                except queue.Empty:
+                    yield None
+                    continue
+                yield event
+                if event["type"] in final_types:
+                    return
+        finally:
+            self.unsubscribe(channel, q)
+
+
+def format_sse(event: Optional[Dict]) -> str:
+    """Serializes an event for a text/event-stream response (None becomes a keepalive comment)."""
+    if event is None:
+        return ": keepalive\n\n"
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {dumps_json(event['data'], pretty=False).decode('utf-8')}\n\n"
+
+
+def summaries_channel(place_id: str) -> str:
+    return f"summaries:{place_id}"
+
+
+event_bus = EventBus()
@@ -1,12 +1,100 @@
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import json
+import os
+import threading
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib codec is used instead
+    orjson = None
+
+# Artifacts and API responses are compact; DISHY_JSON_PRETTY=1 indents them for debugging
+JSON_PRETTY = os.getenv("DISHY_JSON_PRETTY", "0") == "1"
 
 def get_curr_time() -> str:
     """Returns current time in LA as a formatted string."""
     return datetime.now(ZoneInfo("America/Los_Angeles")).strftime("%Y-%m-%d %H:%M:%S")
 
+def _json_default(obj):
+    # numpy scalars / arrays (e.g. review ids taken from a DataFrame)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps_json(data, pretty: bool = None, sort_keys: bool = False, default=None) -> bytes:
+    """Serializes to UTF-8 JSON bytes (orjson when installed); compact unless `pretty` (or DISHY_JSON_PRETTY)."""
+    pretty = JSON_PRETTY if pretty is None else pretty
+    if default is None:
+        default = _json_default
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(data, default=default, option=option)
+    return json.dumps(data, indent=2 if pretty else None, separators=None if pretty else (",", ":"),
+                      sort_keys=sort_keys, ensure_ascii=False, default=default).encode("utf-8")
+
+def loads_json(raw):
+    """Parses JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
 def load_json(filepath: str):
-    with open(filepath, "r") as f:
-        data = json.load(f)
-    return data
\ No newline at end of file
+    """Reads JSON; artifacts missing locally are fetched from the shared artifact store first."""
+    from utils.artifact_store import artifact_sync
+    artifact_sync.ensure_local(filepath)
+    with open(filepath, "rb") as f:
+        data = loads_json(f.read())
+    return data
+
+def save_json(filepath: str, data, pretty: bool = None, publish: bool = True):
+    """
+    Writes JSON atomically (temp file + rename) so readers never see a partial file, then shares it
+    via the artifact store (unless `publish` is False, for callers that order the upload themselves).
+    """
+    filepath = str(filepath)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(dumps_json(data, pretty=pretty))
+    os.replace(tmp_path, filepath)
+    if publish:
+        from utils.artifact_store import artifact_sync
+        artifact_sync.publish(filepath)
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import time
+
+    from utils.path_utils import DATA_DIR
+
+    parser = argparse.ArgumentParser(description="Benchmarks the JSON codec against stdlib json on the largest artifacts")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    def _bench(fn):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        return (time.perf_counter() - start) / args.repeat * 1000
+
+    print(f"Codec: {'orjson ' + orjson.__version__ if orjson is not None else 'stdlib json'}")
+    for name in ("reviews.json", "menus.json"):
+        paths = glob.glob(os.path.join(str(DATA_DIR), "*", name))
+        if not paths:
+            print(f"  no {name} under {DATA_DIR}")
+            continue
+        path = max(paths, key=os.path.getsize)
+        with open(path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
+        print(f"  {path} ({len(raw) / 1024:.0f} KiB)")
+        print(f"    load   stdlib {_bench(lambda: json.loads(raw)):7.2f} ms   codec {_bench(lambda: loads_json(raw)):7.2f} ms")
+        print(f"    dump   stdlib (indent=4) {_bench(lambda: json.dumps(data, indent=4)):7.2f} ms   "
+              f"codec {_bench(lambda: dumps_json(data, pretty=False)):7.2f} ms "
+              f"({len(json.dumps(data, indent=4)) / 1024:.0f} -> {len(dumps_json(data, pretty=False)) / 1024:.0f} KiB)")
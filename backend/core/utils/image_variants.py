@@ -0,0 +1,100 @@
+import os
+import hashlib
+import threading
+from typing import Dict, Optional
+
+from PIL import Image, features
+
+from utils.path_utils import IMAGE_VARIANT_DIR
+
+# Longest side per variant; sources smaller than that are never upscaled
+IMAGE_VARIANT_SIZES = {"thumb": 384, "detail": 1024}
+# Encodings in order of preference (smallest first) and their encoder settings
+VARIANT_FORMATS = {
+    "avif": {"mimetype": "image/avif", "params": {"quality": 55, "speed": 8}},
+    "webp": {"mimetype": "image/webp", "params": {"quality": 80, "method": 4}},
+    "png": {"mimetype": "image/png", "params": {"compress_level": 6}},
+}
+
+_key_locks: Dict[str, threading.Lock] = {}
+_key_locks_lock = threading.Lock()
+
+
+def supported_formats():
+    """Modern encodings this Pillow build can write, in preference order."""
+    return [fmt for fmt in ("avif", "webp") if features.check(fmt)]
+
+
+def negotiate_format(accept_header: str) -> str:
+    """
+    Picks the best encoding the client explicitly accepts; falls back to PNG.
+    Wildcards are ignored: browsers list image/avif and image/webp by name when they support them.
+    """
+    accepted = {}
+    for item in (accept_header or "").split(","):
+        parts = [p.strip() for p in item.split(";")]
+        q = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        accepted[parts[0].lower()] = q
+    for fmt in supported_formats():
+        if accepted.get(VARIANT_FORMATS[fmt]["mimetype"], 0) > 0:
+            return fmt
+    return "png"
+
+
+def content_version(path: str) -> str:
+    """Short token that changes whenever the file is rewritten (used as the `v` URL parameter)."""
+    st = os.stat(path)
+    return hashlib.sha1(f"{st.st_mtime_ns}:{st.st_size}".encode()).hexdigest()[:12]
+
+
+def variant_path(src_path: str, size: str, fmt: str) -> str:
+    st = os.stat(src_path)
+    key = hashlib.sha1(
+        f"{os.path.abspath(src_path)}|{st.st_mtime_ns}|{st.st_size}|{size}|{fmt}".encode()
+    ).hexdigest()
+    return os.path.join(str(IMAGE_VARIANT_DIR), key[:2], f"{key}.{fmt}")
+
+
+def get_variant(src_path: str, size: str, fmt: str) -> Optional[str]:
+    """
+    Path of `src_path` resized to `size` and encoded as `fmt`, rendered on first use.
+    Variants are keyed by the source's mtime and size, so rewritten sources get new ones.
+    Returns the source itself when no conversion is needed.
+    """
+    max_side = IMAGE_VARIANT_SIZES[size]
+    out_path = variant_path(src_path, size, fmt)
+    if os.path.exists(out_path):
+        return out_path
+
+    with _key_locks_lock:
+        key_lock = _key_locks.setdefault(out_path, threading.Lock())
+    tmp_path = f"{out_path}.{threading.get_ident()}.tmp"
+    try:
+        with key_lock:
+            if os.path.exists(out_path):
+                return out_path
+            with Image.open(src_path) as img:
+                if fmt == "png" and img.format == "PNG" and max(img.size) <= max_side:
+                    return src_path
+                img.draft("RGB", (max_side, max_side))
+                img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+                img.thumbnail((max_side, max_side), Image.LANCZOS, reducing_gap=2.0)
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+                img.save(tmp_path, format=fmt.upper(), **VARIANT_FORMATS[fmt]["params"])
+            os.replace(tmp_path, out_path)
+        return out_path
+    finally:
+        with _key_locks_lock:
+            _key_locks.pop(out_path, None)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def variant_mimetype(fmt: str) -> str:
+    return VARIANT_FORMATS[fmt]["mimetype"]
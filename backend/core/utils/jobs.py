@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from utils.events import EventBus, event_bus
+from utils.helpers import get_curr_time, load_json, save_json
+from utils.path_utils import JOB_DIR
+
+# Job states; "succeeded", "failed" and "interrupted" are final
+QUEUED, RUNNING, SUCCEEDED, FAILED, INTERRUPTED = "queued", "running", "succeeded", "failed", "interrupted"
+FINAL_STATES = (SUCCEEDED, FAILED, INTERRUPTED)
+
+JOB_WORKERS = int(os.getenv("DISHY_JOB_WORKERS", 4))
+# Jobs left queued/running by a previous process are re-run on start (stages skip fresh work)
+JOB_RESUME_ON_START = os.getenv("DISHY_JOB_RESUME", "1") != "0"
+# Finished job files older than this are deleted on start; the latest JOB_RESULT_LIMIT finished jobs (state,
+# result and event channel) stay in memory, older ones are served from their file
+JOB_RETENTION_S = 7 * 24 * 3600
+JOB_RESULT_LIMIT = 64
+
+# Runner signature: (place_id, params, report) -> result; report(message, fraction=None) posts progress
+StageRunner = Callable[[str, Dict, Callable[..., None]], Any]
+
+
+def job_channel(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+class JobManager:
+    """
+    Runs pipeline stages as background jobs.
+    Submitting a stage for a place while an identical job (same stage, place and params)
+    is queued or running returns that job instead of starting another. Job state is
+    written to JOB_DIR on every change, and progress is published on the job's event
+    channel (`status`, `progress`, then `done` or `error`). Results are kept in memory
+    for the latest JOB_RESULT_LIMIT finished jobs only; after a restart, finished jobs
+    report their state and unfinished ones are re-run or marked interrupted.
+    """
+
+    def __init__(self, bus: EventBus = event_bus, job_dir: str = JOB_DIR, max_workers: int = JOB_WORKERS):
+        self._bus = bus
+        self._job_dir = str(job_dir)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dishy-job")
+        self._lock = threading.Lock()
+        self._runners: Dict[str, StageRunner] = {}
+        self._jobs: Dict[str, Dict] = {}
+        self._results: "OrderedDict[str, Any]" = OrderedDict()
+        self._active: Dict[tuple, str] = {}  # dedupe key -> job id
+        self._done: Dict[str, threading.Event] = {}
+        self._finished: "OrderedDict[str, None]" = OrderedDict()  # finished job ids, oldest first
+
+    def register(self, stage: str, runner: StageRunner):
+        self._runners[stage] = runner
+
+    @staticmethod
+    def _dedupe_key(stage: str, place_id: str, params: Dict) -> tuple:
+        return (stage, place_id, json.dumps(params or {}, sort_keys=True))
+
+    def _persist(self, job: Dict):
+        save_json(os.path.join(self._job_dir, f"{job['id']}.json"), job)
+
+    def _update(self, job_id: str, event_type: str = "status", **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields, updated_at=time.time())
+            snapshot = dict(job)
+        self._persist(snapshot)
+        self._bus.publish(job_channel(job_id), event_type, snapshot)
+        return snapshot
+
+    def _finish(self, job_id: str):
+        """Marks a job finished (caller holds the lock) and forgets the oldest finished jobs past the limit."""
+        self._done[job_id].set()
+        self._finished[job_id] = None
+        while len(self._finished) > JOB_RESULT_LIMIT:
+            old_id, _ = self._finished.popitem(last=False)
+            self._jobs.pop(old_id, None)
+            self._done.pop(old_id, None)
+            self._results.pop(old_id, None)
+            self._bus.drop(job_channel(old_id))
+
+    def submit(self, stage: str, place_id: str, params: Optional[Dict] = None, job_id: str = None) -> Dict:
+        """Starts (or joins) the job for `stage` on `place_id`; returns its current state."""
+        if stage not in self._runners:
+            raise KeyError(f"Unknown stage: {stage}")
+        params = params or {}
+        key = self._dedupe_key(stage, place_id, params)
+        with self._lock:
+            active_id = self._active.get(key)
+            if active_id is not None:
+                return dict(self._jobs[active_id])
+            job_id = job_id or uuid.uuid4().hex
+            now = time.time()
+            job = {
+                "id": job_id, "stage": stage, "place_id": place_id, "params": params,
+                "status": QUEUED, "progress": None, "message": None, "error": None,
+                "status_code": None, "created_at": now, "updated_at": now,
+                "started_at": None, "finished_at": None,
+            }
+            self._jobs[job_id] = job
+            self._active[key] = job_id
+            self._done[job_id] = threading.Event()
+            self._bus.reset(job_channel(job_id))
+        self._persist(dict(job))
+        self._executor.submit(self._run, job_id, key)
+        return dict(job)
+
+    def _run(self, job_id: str, key: tuple):
+        def report(message: str, fraction: float = None):
+            self._update(job_id, "progress", message=message, progress=fraction)
+
+        # Whatever fails (even persisting the job's state), the dedupe key must be freed
+        try:
+            job = self._update(job_id, status=RUNNING, started_at=time.time())
+            try:
+                result = self._runners[job["stage"]](job["place_id"], job["params"], report)
+                status_code = result[1] if isinstance(result, tuple) else 200
+                with self._lock:
+                    self._results[job_id] = result
+                return self._update(job_id, "done", status=SUCCEEDED if status_code < 400 else FAILED,
+                                    status_code=status_code, progress=1.0, finished_at=time.time())
+            except Exception as e:
+                print(f"[{get_curr_time()}] Job {job['stage']} for {job['place_id']} failed: {e}")
+                return self._update(job_id, "error", status=FAILED, status_code=500, error=str(e), finished_at=time.time())
+        finally:
+            with self._lock:
+                job = self._jobs[job_id]
+                if job["status"] not in FINAL_STATES:
+                    job.update(status=FAILED, status_code=500, error=job["error"] or "Job state could not be saved",
+                               finished_at=time.time(), updated_at=time.time())
+                self._active.pop(key, None)
+                self._finish(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return dict(job)
+        # Finished long enough ago to have left memory
+        path = os.path.join(self._job_dir, f"{os.path.basename(job_id)}.json")
+        try:
+            return load_json(path) if os.path.exists(path) else None
+        except (OSError, ValueError):
+            return None
+
+    def result(self, job_id: str) -> Any:
+        with self._lock:
+            return self._results.get(job_id)
+
+    def wait(self, job_id: str, timeout: float = None) -> Optional[Dict]:
+        """Blocks until the job finishes (or `timeout` passes) and returns its state."""
+        with self._lock:
+            done = self._done.get(job_id)
+        if done is not None:
+            done.wait(timeout)
+        return self.get(job_id)
+
+    def restore(self):
+        """Loads persisted jobs; unfinished ones are re-run (JOB_RESUME_ON_START) or marked interrupted."""
+        if not os.path.isdir(self._job_dir):
+            return
+        for filename in sorted(os.listdir(self._job_dir)):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(self._job_dir, filename)
+            try:
+                job = load_json(path)
+            except (OSError, ValueError):
+                continue
+            if job["status"] in FINAL_STATES:
+                if time.time() - job["updated_at"] > JOB_RETENTION_S:
+                    os.remove(path)
+                    continue
+                with self._lock:
+                    self._jobs[job["id"]] = job
+                    self._done[job["id"]] = threading.Event()
+                    self._finish(job["id"])
+            elif JOB_RESUME_ON_START and job["stage"] in self._runners:
+                print(f"[{get_curr_time()}] Resuming job {job['stage']} for {job['place_id']} ({job['id']})")
+                self.submit(job["stage"], job["place_id"], job["params"], job_id=job["id"])
+            else:
+                job.update(status=INTERRUPTED, finished_at=time.time(), error="Server restarted before the job finished")
+                with self._lock:
+                    self._jobs[job["id"]] = job
+                    self._done[job["id"]] = threading.Event()
+                    self._finish(job["id"])
+                self._persist(job)
+
+
+job_manager = JobManager()
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.helpers import get_curr_time, load_json, save_json
+from utils.path_utils import MANIFEST_PATH_TEMPLATE
+from utils.artifact_store import artifact_sync
+
+# Recorded when a manifest is first written; bump to invalidate every manifest at once
+MANIFEST_VERSION = 1
+
+_file_digests: Dict[str, tuple] = {}
+_file_digests_lock = threading.Lock()
+
+
+def digest_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def digest_value(value: Any) -> str:
+    """Digest of any JSON-serializable value (dict keys sorted)."""
+    return digest_text(json.dumps(value, sort_keys=True, default=str))
+
+
+def digest_file(path: str) -> Optional[str]:
+    """
+    Content digest of a file, or None if it does not exist.
+    Digests are memoized per (mtime, size), so unchanged files are hashed once per process.
+    """
+    path = str(path)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _file_digests_lock:
+        cached = _file_digests.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()[:16]
+    with _file_digests_lock:
+        _file_digests[path] = (stamp, digest)
+    return digest
+
+
+def manifest_path(place_id: str, artifact: str) -> str:
+    return MANIFEST_PATH_TEMPLATE.format(place_id=place_id, artifact=artifact)
+
+
+def load_manifest(place_id: str, artifact: str) -> Optional[Dict]:
+    path = manifest_path(place_id, artifact)
+    if not os.path.exists(path):
+        return None
+    try:
+        return load_json(path)
+    except (OSError, ValueError):
+        return None
+
+
+def manifest_digest(place_id: str, artifact: str) -> Optional[str]:
+    """Digest of the inputs an artifact was last built from; downstream fingerprints chain on it."""
+    manifest = load_manifest(place_id, artifact)
+    return manifest["digest"] if manifest else None
+
+
+def write_manifest(place_id: str, artifact: str, inputs: Dict[str, Any], outputs: Iterable[str]) -> Dict:
+    """Records the fingerprints an artifact was built from and the files it wrote."""
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "artifact": artifact,
+        "digest": digest_value(inputs),
+        "inputs": inputs,
+        "outputs": [str(path) for path in outputs],
+        "created_at": time.time(),
+    }
+    # The manifest is only shared once its outputs are, so other instances never pair it with older outputs
+    uploads = [artifact_sync.publish(path) for path in manifest["outputs"]]
+    path = manifest_path(place_id, artifact)
+    save_json(path, manifest, publish=False)
+    artifact_sync.publish(path, after=uploads)
+    return manifest
+
+
+def stale_reasons(place_id: str, artifact: str, inputs: Dict[str, Any], outputs: Iterable[str], adopt_legacy: bool = True) -> List[str]:
+    """
+    Why an artifact must be rebuilt; an empty list means it is up to date.
+    Reasons are the names of changed inputs, or "missing" when an output file is gone.
+    Artifacts built before manifests existed are adopted as built from the current inputs
+    (with `adopt_legacy`) rather than recomputed wholesale.
+    """
+    outputs = [str(path) for path in outputs]
+    missing = [path for path in outputs if not os.path.exists(path)]
+    if missing:
+        return ["missing"]
+
+    manifest = load_manifest(place_id, artifact)
+    if manifest is None or manifest.get("version") != MANIFEST_VERSION:
+        if manifest is None and adopt_legacy:
+            print(f"[{get_curr_time()}] Adopting existing {artifact} for {place_id} (no manifest)")
+            write_manifest(place_id, artifact, inputs, outputs)
+            return []
+        return ["manifest"]
+
+    return sorted(
+        key for key in set(inputs) | set(manifest["inputs"])
+        if inputs.get(key) != manifest["inputs"].get(key)
+    )
+
+
+def is_fresh(place_id: str, artifact: str, inputs: Dict[str, Any], outputs: Iterable[str], adopt_legacy: bool = True) -> bool:
+    reasons = stale_reasons(place_id, artifact, inputs, outputs, adopt_legacy)
+    if reasons:
+        print(f"[{get_curr_time()}] {artifact} for {place_id} is stale: {', '.join(reasons)}")
+    return not reasons
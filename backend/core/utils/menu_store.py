@@ -0,0 +1,121 @@
+import argparse
+import os
+import threading
+from typing import Dict, List, Optional
+
+from utils.helpers import get_curr_time, load_json, save_json
+from utils.path_utils import MENU_METADATA_PATH_TEMPLATE, MENU_INDEX_PATH_TEMPLATE, MENU_DISH_PATH_TEMPLATE
+
+# Index writes are read-modify-write, so they are serialized per place; dish files are independent
+_place_locks: Dict[str, threading.Lock] = {}
+_place_locks_lock = threading.Lock()
+
+
+def _place_lock(place_id: str) -> threading.Lock:
+    with _place_locks_lock:
+        return _place_locks.setdefault(place_id, threading.Lock())
+
+
+def n_mentions(menu: Dict) -> int:
+    return 0 if menu.get('from_reviews') is None else len(menu['from_reviews']['relevant_review_ids'])
+
+
+def _index_entry(menu_id: str, menu: Dict, position: int) -> Dict:
+    return {
+        "menu_id": menu_id,
+        "name": (menu.get('from_menuboard') or {}).get('name'),
+        "mentions": n_mentions(menu),
+        "summarized": menu.get('from_reviews') is not None,
+        "position": position,  # order of extraction; breaks ties between equally mentioned dishes
+    }
+
+
+def _sorted(entries: List[Dict]) -> List[Dict]:
+    return sorted(entries, key=lambda entry: (-entry["mentions"], entry["position"]))
+
+
+def _migrate(place_id: str) -> bool:
+    """Shards a legacy menus.json when the place has no index yet; returns whether an index exists."""
+    if os.path.exists(MENU_INDEX_PATH_TEMPLATE.format(place_id=place_id)):
+        return True
+    legacy_path = MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id)
+    if not os.path.exists(legacy_path):
+        return False
+    print(f"[{get_curr_time()}] Sharding {legacy_path}")
+    write_menus(place_id, load_json(legacy_path), export_legacy=False)
+    return True
+
+
+def read_index(place_id: str) -> List[Dict]:
+    """[{menu_id, name, mentions, summarized, position}] ordered by review mentions (most first)."""
+    if not _migrate(place_id):
+        return []
+    return load_json(MENU_INDEX_PATH_TEMPLATE.format(place_id=place_id))["dishes"]
+
+
+def read_dish(place_id: str, menu_id) -> Optional[Dict]:
+    """One dish's record, or None if the place has no such dish."""
+    path = MENU_DISH_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id)
+    if not os.path.exists(path):
+        _migrate(place_id)
+    return load_json(path) if os.path.exists(path) else None
+
+
+def read_menus(place_id: str) -> Dict[str, Dict]:
+    """Every dish, in index order (the layout of the legacy menus.json)."""
+    return {entry["menu_id"]: read_dish(place_id, entry["menu_id"]) for entry in read_index(place_id)}
+
+
+def write_dish(place_id: str, menu_id, menu: Dict):
+    """Writes one dish and refreshes its index entry; dishes of the same place can be written concurrently."""
+    menu_id = str(menu_id)
+    save_json(MENU_DISH_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id), menu)
+    index_path = MENU_INDEX_PATH_TEMPLATE.format(place_id=place_id)
+    with _place_lock(place_id):
+        entries = {entry["menu_id"]: entry for entry in (load_json(index_path)["dishes"] if os.path.exists(index_path) else [])}
+        position = entries[menu_id]["position"] if menu_id in entries else len(entries)
+        entries[menu_id] = _index_entry(menu_id, menu, position)
+        save_json(index_path, {"dishes": _sorted(list(entries.values()))})
+
+
+def write_menus(place_id: str, menus: Dict, export_legacy: bool = True) -> str:
+    """
+    Replaces the place's whole menu: one file per dish, the index, and (with `export_legacy`)
+    the menus.json view sorted by mentions. Returns the menus.json path.
+    """
+    menus = {str(menu_id): menu for menu_id, menu in menus.items()}
+    dish_dir = os.path.dirname(MENU_DISH_PATH_TEMPLATE).format(place_id=place_id)
+    with _place_lock(place_id):
+        for menu_id, menu in menus.items():
+            save_json(MENU_DISH_PATH_TEMPLATE.format(place_id=place_id, menu_id=menu_id), menu)
+        if os.path.isdir(dish_dir):
+            for filename in os.listdir(dish_dir):
+                if filename.endswith(".json") and filename[:-len(".json")] not in menus:
+                    os.remove(os.path.join(dish_dir, filename))
+        entries = _sorted([_index_entry(menu_id, menu, position) for position, (menu_id, menu) in enumerate(menus.items())])
+        save_json(MENU_INDEX_PATH_TEMPLATE.format(place_id=place_id), {"dishes": entries})
+
+    legacy_path = MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id)
+    if export_legacy:
+        save_json(legacy_path, {entry["menu_id"]: menus[entry["menu_id"]] for entry in entries})
+    return legacy_path
+
+
+def export_legacy_menus(place_id: str) -> str:
+    """Rewrites menus.json from the shards (for tools that still read the single document)."""
+    legacy_path = MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id)
+    save_json(legacy_path, read_menus(place_id))
+    return legacy_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shards menus.json into per-dish records, or exports it back")
+    parser.add_argument("--place_id", type=str, required=True)
+    parser.add_argument("--export", action="store_true", help="Rewrite menus.json from the shards")
+    args = parser.parse_args()
+
+    if args.export:
+        print(f"[{get_curr_time()}] Exported {export_legacy_menus(args.place_id)}")
+    else:
+        for entry in read_index(args.place_id):
+            print(f"  {entry['menu_id']:>4} {entry['mentions']:>4}  {entry['name']}")
@@ -18,10 +18,24 @@ DATA_DIR = PROJECT_ROOT / "data"
 ENV_FILE = PROJECT_ROOT / ".env"
 
 SCRAPED_REVIEW_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/reviews.json"
+REVIEW_TABLE_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/review_table.npz"
 IMAGE_EMBEDDING_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/image_embeddings.parquet"
+MENUBOARD_CANDIDATES_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/menuboard_candidates.json"
 MENU_METADATA_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/menus.json"
+MENU_INDEX_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/menu/index.json"
+MENU_DISH_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/menu/dishes/{menu_id}.json"
 REVIEWS_DF_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/reviews_df.pkl"
+MATCH_STATE_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/match_state.pkl"
 COLLAGE_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/collage/{menu_id}.png"
 COLLAGE_SRC_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/collage_src/{menu_id}/{rank}.png"
 NANOBANANA_IMAGE_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/nanobanana/{menu_id}.png"
-RESTAURANT_OVERVIEW_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/restaurant_overview.json"
\ No newline at end of file
+RESTAURANT_OVERVIEW_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/restaurant_overview.json"
+MANIFEST_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/manifests/{artifact}.json"
+RESULT_BUNDLE_PATH_TEMPLATE = str(DATA_DIR)+"/{place_id}/bundle/results.json"
+
+RESPONSE_CACHE_DIR = DATA_DIR / "cache" / "gemini_responses"
+IMAGE_VARIANT_DIR = DATA_DIR / "cache" / "image_variants"
+ARTIFACT_STORE_INDEX_PATH = DATA_DIR / "cache" / "artifact_store_index.json"
+BATCH_RUN_DIR = DATA_DIR / "batch"
+PLACE_REGISTRY_PATH = DATA_DIR / "places.sqlite3"
+JOB_DIR = DATA_DIR / "jobs"
@@ -0,0 +1,157 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from utils.helpers import get_curr_time, load_json
+from utils.path_utils import DATA_DIR, PLACE_REGISTRY_PATH
+
+# Columns of `places` that upsert() may set
+PLACE_FIELDS = ("name", "review_count", "image_count")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS places (
+    place_id TEXT PRIMARY KEY,
+    name TEXT,
+    review_count INTEGER,
+    image_count INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS places_name ON places (name);
+CREATE TABLE IF NOT EXISTS place_stages (
+    place_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (place_id, stage)
+);
+"""
+
+
+class PlaceRegistry:
+    """
+    SQLite registry of known places: name, review/image counts, per-stage status and timestamps.
+    Every write is a single-row upsert in its own transaction, so concurrent request threads
+    never overwrite each other's updates. Each thread uses its own connection (WAL mode, so
+    readers do not block the writer).
+    """
+
+    def __init__(self, path: str = PLACE_REGISTRY_PATH):
+        self.path = str(path)
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._init_lock:
+                if not self._initialized:
+                    with conn:
+                        conn.executescript(SCHEMA)
+                    legacy_path = DATA_DIR / "mapping.json"
+                    if conn.execute("SELECT COUNT(*) FROM places").fetchone()[0] == 0 and legacy_path.exists():
+                        # First start after the switch from mapping.json
+                        n = self._import(conn, load_json(legacy_path))
+                        print(f"[{get_curr_time()}] Imported {n} places from {legacy_path}")
+                    self._initialized = True
+        return conn
+
+    @staticmethod
+    def _import(conn: sqlite3.Connection, mapping: Dict[str, str]) -> int:
+        now = time.time()
+        with conn:
+            # Keeps the mapping's order in created_at, and names already in the registry win
+            conn.executemany(
+                "INSERT INTO places (place_id, name, created_at, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (place_id) DO UPDATE SET name = COALESCE(places.name, excluded.name)",
+                [(place_id, name, now + i * 1e-6, now) for i, (place_id, name) in enumerate(mapping.items())],
+            )
+        return len(mapping)
+
+    def upsert(self, place_id: str, **fields):
+        """Creates or updates one place; fields that are not given (or None) keep their stored value."""
+        fields = {key: value for key, value in fields.items() if value is not None}
+        unknown = set(fields) - set(PLACE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown place fields: {sorted(unknown)}")
+        now = time.time()
+        columns = ["place_id", *fields, "created_at", "updated_at"]
+        updates = ", ".join([f"{key} = excluded.{key}" for key in fields] + ["updated_at = excluded.updated_at"])
+        with self._conn() as conn:
+            conn.execute(
+                f"INSERT INTO places ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT (place_id) DO UPDATE SET {updates}",
+                [place_id, *fields.values(), now, now],
+            )
+
+    def set_stage(self, place_id: str, stage: str, status: str):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO places (place_id, created_at, updated_at) VALUES (?, ?, ?) ON CONFLICT (place_id) DO NOTHING",
+                (place_id, now, now),
+            )
+            conn.execute(
+                "INSERT INTO place_stages (place_id, stage, status, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (place_id, stage) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+                (place_id, stage, status, now),
+            )
+
+    def get(self, place_id: str) -> Optional[Dict]:
+        """The place's row with its stages as {stage: {"status", "updated_at"}}, or None if unknown."""
+        conn = self._conn()
+        row = conn.execute("SELECT * FROM places WHERE place_id = ?", (place_id,)).fetchone()
+        if row is None:
+            return None
+        place = dict(row)
+        place["stages"] = {
+            stage["stage"]: {"status": stage["status"], "updated_at": stage["updated_at"]}
+            for stage in conn.execute("SELECT * FROM place_stages WHERE place_id = ?", (place_id,))
+        }
+        return place
+
+    def name(self, place_id: str) -> Optional[str]:
+        row = self._conn().execute("SELECT name FROM places WHERE place_id = ?", (place_id,)).fetchone()
+        return row["name"] if row is not None else None
+
+    def find_by_name(self, name: str) -> Optional[str]:
+        row = self._conn().execute("SELECT place_id FROM places WHERE name = ? ORDER BY updated_at DESC", (name,)).fetchone()
+        return row["place_id"] if row is not None else None
+
+    def names(self) -> Dict[str, str]:
+        """{place_id: name} of every named place, oldest first (the order mapping.json had)."""
+        rows = self._conn().execute("SELECT place_id, name FROM places WHERE name IS NOT NULL ORDER BY created_at, rowid")
+        return {row["place_id"]: row["name"] for row in rows}
+
+    def import_mapping(self, mapping_path=DATA_DIR / "mapping.json") -> int:
+        """One-shot import of a {place_id: name} mapping.json; returns the number of places imported."""
+        return self._import(self._conn(), load_json(mapping_path))
+
+
+place_registry = PlaceRegistry()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Place registry maintenance")
+    parser.add_argument("--import_mapping", type=str, nargs="?", const=str(DATA_DIR / "mapping.json"), default=None,
+                        help="Import a {place_id: name} mapping.json (defaults to data/mapping.json)")
+    parser.add_argument("--place_id", type=str, default=None, help="Print one place")
+    args = parser.parse_args()
+
+    if args.import_mapping:
+        n = place_registry.import_mapping(args.import_mapping)
+        print(f"[{get_curr_time()}] Imported {n} places from {args.import_mapping} into {place_registry.path}")
+    if args.place_id:
+        print(place_registry.get(args.place_id))
+    if not args.import_mapping and not args.place_id:
+        print(f"[{get_curr_time()}] {len(place_registry.names())} named places in {place_registry.path}")
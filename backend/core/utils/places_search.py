@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.helpers import get_curr_time
+
+# Point at a stand-in server (see __main__) to test without quota
+PLACES_TEXT_SEARCH_URL = os.getenv("DISHY_PLACES_URL", "https://maps.googleapis.com/maps/api/place/textsearch/json")
+PLACES_SEARCH_TTL_S = int(os.getenv("DISHY_PLACES_SEARCH_TTL_S", 600))
+PLACES_SEARCH_MAX_ENTRIES = 2048
+PLACES_SEARCH_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+PLACES_POOL_SIZE = 16
+
+
+class PlacesSearchError(Exception):
+    """The Places API answered with a status other than OK / ZERO_RESULTS."""
+
+    def __init__(self, status: str, message: Optional[str] = None):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive cache key ("  Sweet  Maple " == "sweet maple")."""
+    return " ".join(query.lower().split())
+
+
+class PlacesSearchClient:
+    """
+    Restaurant text search over a pooled keep-alive session.
+    Results are cached per normalized query for `ttl` seconds (errors are not cached),
+    and concurrent identical queries share one upstream request.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, url: str = PLACES_TEXT_SEARCH_URL,
+                 ttl: float = PLACES_SEARCH_TTL_S, max_entries: int = PLACES_SEARCH_MAX_ENTRIES):
+        self.api_key = api_key
+        self.url = url
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=PLACES_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, results)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def _fetch(self, query: str) -> List[Dict]:
+        api_key = self.api_key or os.environ.get('GOOGLE_MAPS_API_KEY')
+        params = {'query': query, 'key': api_key, 'region': 'us', 'type': 'restaurant'}
+        response = self.session.get(self.url, params=params, timeout=PLACES_SEARCH_TIMEOUT)
+        data = response.json()
+        if data.get('status') not in ('OK', 'ZERO_RESULTS'):
+            raise PlacesSearchError(data.get('status'), data.get('error_message'))
+        return [
+            {
+                'name': place.get('name'),
+                'address': place.get('formatted_address'),
+                'place_id': place.get('place_id'),
+                'rating': place.get('rating'),
+                'user_ratings_total': place.get('user_ratings_total')
+            }
+            for place in data.get('results', [])
+        ]
+
+    def search(self, query: str) -> List[Dict]:
+        """Restaurants matching `query`; raises PlacesSearchError or a requests exception on failure."""
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            results = self._fetch(key)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.ttl, results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            self._inflight.pop(key, None)
+        future.set_result(results)
+        return results
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._cache), "hits": self.hits, "misses": self.misses,
+                "coalesced": self.coalesced, "errors": self.errors,
+                # Coalesced lookups did not reach upstream either
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else None,
+            }
+
+
+places_client = PlacesSearchClient()
+
+
+class StandInPlacesHandler(BaseHTTPRequestHandler):
+    """Answers Text Search requests with canned results after `latency` seconds; counts upstream calls."""
+    latency = 0.3
+    calls = 0
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query).get('query', [''])[0]
+        type(self).calls += 1
+        time.sleep(self.latency)
+        results = [
+            {"name": f"{query.title()} #{i}", "formatted_address": f"{i} Main St", "place_id": f"standin-{query}-{i}",
+             "rating": 4.5, "user_ratings_total": 100 * i}
+            for i in range(1, 4)
+        ]
+        body = json.dumps({"status": "OK", "results": results}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the search client against a local stand-in Places server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3, help="Stand-in response time in seconds")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    StandInPlacesHandler.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StandInPlacesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    client = PlacesSearchClient(api_key="stand-in", url=f"http://127.0.0.1:{args.port}/")
+    # A few popular queries typed with varying case and spacing, as the search box sends them
+    queries = ["sweet maple", "Sweet Maple", "tartine ", "TARTINE", "zuni cafe", "  zuni  cafe", "nopa"]
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(client.search, (queries[i % len(queries)] for i in range(args.requests))))
+    elapsed = time.time() - start
+
+    print(f"[{get_curr_time()}] {args.requests} searches in {elapsed:.2f}s, "
+          f"{StandInPlacesHandler.calls} upstream calls (uncached: ~{args.requests * args.latency / args.concurrency:.1f}s)")
+    print(f"[{get_curr_time()}] {client.stats()}")
+    server.shutdown()
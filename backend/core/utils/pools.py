@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+# Process-wide worker pools, shared by every stage and every place processed in this process.
+# Pool tasks must not submit to (and wait on) their own pool.
+SHARED_POOL_SIZES = {
+    "download": int(os.getenv("DISHY_DOWNLOAD_WORKERS", 32)),
+    "embedding": int(os.getenv("DISHY_EMBEDDING_WORKERS", 16)),
+    "gemini": int(os.getenv("DISHY_GEMINI_WORKERS", 16)),
+}
+
+# Global request budgets per API in requests per minute (None = unlimited).
+# Sized to the project's quota, so concurrent places share it instead of each hitting 429s.
+RATE_LIMITS_PER_MINUTE = {
+    "download": None,
+    "embedding": int(os.getenv("DISHY_EMBEDDING_RPM", 600)),
+    "gemini": int(os.getenv("DISHY_GEMINI_RPM", 300)),
+    "nanobanana": int(os.getenv("DISHY_NANOBANANA_RPM", 20)),
+}
+
+_pools: Dict[str, ThreadPoolExecutor] = {}
+_limiters: Dict[str, "RateLimiter"] = {}
+_lock = threading.Lock()
+
+
+class RateLimiter:
+    """
+    Token bucket: `rate` requests per second with bursts of up to `burst`.
+    `acquire` blocks until a token is available; waiting is accounted for in `stats`.
+    """
+
+    def __init__(self, rate: Optional[float], burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.n_acquired = 0
+        self.total_wait = 0.0
+
+    def acquire(self, n: int = 1):
+        if self.rate is None:
+            with self._lock:
+                self.n_acquired += n
+            return
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= n:
+                    self._tokens -= n
+                    self.n_acquired += n
+                    self.total_wait += now - start
+                    return
+                wait = (n - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"rate_per_min": None if self.rate is None else self.rate * 60,
+                    "requests": self.n_acquired, "waited_s": round(self.total_wait, 2)}
+
+
+def shared_pool(name: str) -> ThreadPoolExecutor:
+    """The process-wide pool for `name` (one of SHARED_POOL_SIZES), created on first use."""
+    with _lock:
+        if name not in _pools:
+            _pools[name] = ThreadPoolExecutor(max_workers=SHARED_POOL_SIZES[name], thread_name_prefix=f"dishy-{name}")
+        return _pools[name]
+
+
+def rate_limiter(name: str) -> RateLimiter:
+    """The process-wide limiter for API `name` (one of RATE_LIMITS_PER_MINUTE)."""
+    with _lock:
+        if name not in _limiters:
+            per_minute = RATE_LIMITS_PER_MINUTE[name]
+            rate = None if per_minute is None else per_minute / 60
+            # Allow a few seconds' worth of requests at once, so bursts after idle periods go out together
+            burst = 1 if per_minute is None else max(1, per_minute // 20)
+            _limiters[name] = RateLimiter(rate, burst)
+        return _limiters[name]
+
+
+def limiter_stats() -> Dict[str, Dict]:
+    with _lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in limiters.items()}
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from utils.path_utils import RESPONSE_CACHE_DIR
+from utils.helpers import get_curr_time
+
+# All structured Gemini calls run at temperature=0, so a response is fully
+# determined by (model, response_schema, prompt, image parts).
+CACHE_ENABLED = os.getenv("GEMINI_RESPONSE_CACHE", "1") != "0"
+CACHE_TTL_SECONDS = int(os.getenv("GEMINI_RESPONSE_CACHE_TTL", 30 * 24 * 3600))
+CACHE_MAX_BYTES = int(os.getenv("GEMINI_RESPONSE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_schema(schema: Dict[str, Any]) -> str:
+    """Stable hash of a JSON schema (key order independent)."""
+    return hash_bytes(json.dumps(schema, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+
+
+def make_cache_key(
+    model: str,
+    schema: Dict[str, Any],
+    prompt: str,
+    image_parts: Iterable[bytes] = ()
+) -> str:
+    """Content-addressed key for a structured Gemini request."""
+    h = hashlib.sha256()
+    for piece in [model, hash_schema(schema), hash_bytes(prompt.encode("utf-8"))]:
+        h.update(piece.encode("utf-8"))
+        h.update(b"\x00")
+    for data in image_parts:
+        h.update(hash_bytes(data).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """
+    Local on-disk cache of raw Gemini response texts.
+    Entries expire after `ttl_seconds`; the least recently used entries are
+    evicted once the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=RESPONSE_CACHE_DIR, ttl_seconds: int = CACHE_TTL_SECONDS, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = str(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None  # computed lazily on first write
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used for eviction
+        except OSError:
+            pass
+        return entry.get("response")
+
+    def set(self, key: str, response_text: str, model: str = None):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = json.dumps({"created_at": time.time(), "model": model, "response": response_text})
+
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(payload)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _remove(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Drops expired entries first, then least recently used ones, down to 90% of the cap."""
+        now = time.time()
+        entries = sorted(self._entries(), key=lambda x: x[2])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        n_evicted = 0
+        for path, size, mtime in entries:
+            if total <= target and now - mtime <= self.ttl_seconds:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            n_evicted += 1
+        self._total_bytes = total
+        if n_evicted:
+            print(f"[{get_curr_time()}] Response cache: evicted {n_evicted} entries ({total} bytes kept)")
+
+
+response_cache = ResponseCache() if CACHE_ENABLED else None
+
+
+def cache_get(key: str) -> Optional[str]:
+    return response_cache.get(key) if response_cache is not None else None
+
+
+def cache_set(key: str, response_text: str, model: str = None):
+    if response_cache is not None:
+        response_cache.set(key, response_text, model=model)
@@ -0,0 +1,146 @@
+import gzip
+import hashlib
+import os
+import os.path as osp
+from typing import List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional; bundles are then served gzip-only
+    brotli = None
+
+from utils.artifact_cache import artifact_cache, load_collage_index, load_menus, load_overview
+from utils.helpers import dumps_json, load_json, save_json
+from utils.image_variants import content_version
+from utils.path_utils import (
+    SCRAPED_REVIEW_PATH_TEMPLATE, MENU_INDEX_PATH_TEMPLATE, RESTAURANT_OVERVIEW_PATH_TEMPLATE,
+    COLLAGE_SRC_PATH_TEMPLATE, NANOBANANA_IMAGE_PATH_TEMPLATE, RESULT_BUNDLE_PATH_TEMPLATE
+)
+from utils.place_registry import place_registry
+from utils.review_table import load_review_table
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+class ResultBundle:
+    """One place's results document, serialized once and kept in every encoding it is served in."""
+    __slots__ = ("etag", "encodings")
+
+    def __init__(self, etag: str, encodings: dict):
+        self.etag = etag
+        self.encodings = encodings  # "identity" / "gzip" / "br" -> bytes
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(body) for body in self.encodings.values())
+
+    def body(self, accepted) -> Tuple[bytes, Optional[str]]:
+        """(body, Content-Encoding) for the smallest encoding in `accepted` (None = identity)."""
+        for encoding in ("br", "gzip"):
+            if encoding in self.encodings and encoding in accepted:
+                return self.encodings[encoding], encoding
+        return self.encodings["identity"], None
+
+
+def _bundle_sources(place_id: str) -> List[str]:
+    collage_dir = osp.dirname(osp.dirname(COLLAGE_SRC_PATH_TEMPLATE)).format(place_id=place_id)
+    nanobanana_dir = osp.dirname(NANOBANANA_IMAGE_PATH_TEMPLATE).format(place_id=place_id)
+    sources = [
+        MENU_INDEX_PATH_TEMPLATE.format(place_id=place_id),
+        RESTAURANT_OVERVIEW_PATH_TEMPLATE.format(place_id=place_id),
+        SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id),
+        collage_dir,
+        nanobanana_dir,
+    ]
+    if osp.isdir(collage_dir):
+        sources += [osp.join(collage_dir, menu_id, "src_review_urls.json") for menu_id in sorted(os.listdir(collage_dir))]
+    if osp.isdir(nanobanana_dir):
+        sources += [osp.join(nanobanana_dir, name) for name in sorted(os.listdir(nanobanana_dir)) if name.endswith(".png")]
+    return sources
+
+
+def _sources_key(sources: List[str], restaurant_name: Optional[str]) -> str:
+    stamps = [f"name:{restaurant_name}"]
+    for path in sources:
+        try:
+            st = os.stat(path)
+            stamps.append(f"{path}:{st.st_mtime_ns}:{st.st_size}")
+        except FileNotFoundError:
+            stamps.append(f"{path}:-")
+    return hashlib.sha1("|".join(stamps).encode()).hexdigest()
+
+
+def build_result_document(place_id: str, restaurant_name: Optional[str]) -> dict:
+    """Everything the results pages show for a finished place, as one JSON document."""
+    collage_index = load_collage_index(place_id)
+    nanobanana_dir = osp.dirname(NANOBANANA_IMAGE_PATH_TEMPLATE).format(place_id=place_id)
+    nanobanana = {}
+    if osp.isdir(nanobanana_dir):
+        for name in sorted(os.listdir(nanobanana_dir)):
+            if name.endswith(".png"):
+                nanobanana[name[:-len(".png")]] = f"{name}?v={content_version(osp.join(nanobanana_dir, name))}"
+    table = load_review_table(place_id)
+    return {
+        "place_id": place_id,
+        "restaurant_name": restaurant_name,
+        "review_count": len(table) if table is not None else 0,
+        "image_count": table.n_images if table is not None else 0,
+        "menus": load_menus(place_id),
+        "restaurant_overview": load_overview(place_id),
+        "collage": collage_index["collage"],
+        "src_review_urls": collage_index["src_review_urls"],
+        "nanobanana": nanobanana,
+    }
+
+
+def _write_bundle(place_id: str, restaurant_name: Optional[str], sources_key: str) -> ResultBundle:
+    raw = dumps_json(build_result_document(place_id, restaurant_name), pretty=False)
+    encodings = {"identity": raw, "gzip": gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        encodings["br"] = brotli.compress(raw, quality=BROTLI_QUALITY)
+    bundle = ResultBundle(hashlib.sha256(raw).hexdigest()[:32], encodings)
+
+    base_path = RESULT_BUNDLE_PATH_TEMPLATE.format(place_id=place_id)
+    os.makedirs(osp.dirname(base_path), exist_ok=True)
+    for encoding, body in encodings.items():
+        path = base_path if encoding == "identity" else f"{base_path}.{encoding}"
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+    # Written last: a bundle on disk is only reused when its meta matches the current sources
+    save_json(f"{base_path}.meta", {"etag": bundle.etag, "sources": sources_key, "encodings": list(encodings)})
+    return bundle
+
+
+def _read_bundle(place_id: str, sources_key: str) -> Optional[ResultBundle]:
+    base_path = RESULT_BUNDLE_PATH_TEMPLATE.format(place_id=place_id)
+    try:
+        meta = load_json(f"{base_path}.meta")
+        if meta["sources"] != sources_key or (brotli is not None and "br" not in meta["encodings"]):
+            return None
+        encodings = {}
+        for encoding in meta["encodings"]:
+            with open(base_path if encoding == "identity" else f"{base_path}.{encoding}", "rb") as f:
+                encodings[encoding] = f.read()
+    except (OSError, ValueError, KeyError):
+        return None
+    return ResultBundle(meta["etag"], encodings)
+
+
+def load_result_bundle(place_id: str) -> ResultBundle:
+    """
+    The place's results bundle, rebuilt (and precompressed) only when one of its source artifacts changed.
+    Bundles persist next to the place's data, so a restarted server serves them without rebuilding.
+    """
+    sources = _bundle_sources(place_id)
+    # The name lives in the place registry rather than a file, so the entry is tagged with it
+    restaurant_name = place_registry.name(place_id)
+
+    def _load():
+        sources_key = _sources_key(sources, restaurant_name)
+        return _read_bundle(place_id, sources_key) or _write_bundle(place_id, restaurant_name, sources_key)
+
+    return artifact_cache.get("result_bundle", place_id, sources, _load, cost=lambda bundle: bundle.nbytes,
+                              tag=restaurant_name)
@@ -0,0 +1,191 @@
+import os
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from utils.artifact_cache import artifact_cache
+from utils.helpers import get_curr_time, load_json
+from utils.path_utils import SCRAPED_REVIEW_PATH_TEMPLATE, REVIEW_TABLE_PATH_TEMPLATE
+
+# Google caps review text at 4096 characters, so this only trims malformed input
+REVIEW_TEXT_MAX_CHARS = 4096
+
+
+def parse_published_date(raw: Optional[str]) -> int:
+    """ISO timestamp -> date ordinal (0 if missing or unparsable)."""
+    if not raw:
+        return 0
+    try:
+        return datetime.fromisoformat(raw.replace('Z', '+00:00')).date().toordinal()
+    except (ValueError, TypeError):
+        return 0
+
+
+def _pack_strings(strings: List[str]):
+    """UTF-8 blob plus [n+1] byte offsets; string i is blob[offsets[i]:offsets[i+1]]."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+class ReviewRecord:
+    """One review, materialized on demand from a ReviewTable."""
+    __slots__ = ("id", "date_ordinal", "text", "review_url", "image_urls")
+
+    def __init__(self, id: int, date_ordinal: int, text: str, review_url: str, image_urls: List[str]):
+        self.id = id
+        self.date_ordinal = date_ordinal
+        self.text = text
+        self.review_url = review_url
+        self.image_urls = image_urls
+
+    @property
+    def published_date(self) -> Optional[str]:
+        return date.fromordinal(self.date_ordinal).isoformat() if self.date_ordinal else None
+
+
+class ReviewTable:
+    """
+    Column-oriented, normalized copy of a place's reviews.json.
+    Strings live in UTF-8 blobs addressed by offset arrays and image URLs are
+    grouped per review by `image_offsets`, so loading is a handful of array reads
+    and no per-review dicts are allocated.
+    """
+
+    COLUMNS = ("ids", "date_ordinals", "text_blob", "text_offsets", "url_blob", "url_offsets",
+               "image_blob", "image_url_offsets", "image_offsets")
+
+    def __init__(self, **columns: np.ndarray):
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+        self._positions = None
+
+    @classmethod
+    def from_reviews(cls, reviews: List[Dict], max_text_chars: int = REVIEW_TEXT_MAX_CHARS) -> "ReviewTable":
+        texts, urls, image_urls, n_images = [], [], [], [0]
+        for review in reviews:
+            texts.append((review.get("text") or "")[:max_text_chars])
+            urls.append(review.get("reviewUrl") or "")
+            images = review.get("reviewImageUrls") or []
+            image_urls.extend(images)
+            n_images.append(len(images))
+
+        text_blob, text_offsets = _pack_strings(texts)
+        url_blob, url_offsets = _pack_strings(urls)
+        image_blob, image_url_offsets = _pack_strings(image_urls)
+        return cls(
+            ids=np.array([int(review["id"]) for review in reviews], dtype=np.int64),
+            date_ordinals=np.array([
+                parse_published_date(review.get("publishedAtDate") or review.get("publishedDate"))
+                for review in reviews
+            ], dtype=np.int32),
+            text_blob=text_blob, text_offsets=text_offsets,
+            url_blob=url_blob, url_offsets=url_offsets,
+            image_blob=image_blob, image_url_offsets=image_url_offsets,
+            image_offsets=np.cumsum(n_images, dtype=np.int64),
+        )
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp_path, **{name: getattr(self, name) for name in self.COLUMNS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ReviewTable":
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in cls.COLUMNS})
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def _get(blob: np.ndarray, offsets: np.ndarray, i: int) -> str:
+        return blob[offsets[i]:offsets[i + 1]].tobytes().decode("utf-8")
+
+    def text(self, pos: int) -> str:
+        return self._get(self.text_blob, self.text_offsets, pos)
+
+    def review_url(self, pos: int) -> str:
+        return self._get(self.url_blob, self.url_offsets, pos)
+
+    def image_urls(self, pos: int) -> List[str]:
+        return [self._get(self.image_blob, self.image_url_offsets, j)
+                for j in range(self.image_offsets[pos], self.image_offsets[pos + 1])]
+
+    def published_date(self, pos: int) -> Optional[str]:
+        ordinal = int(self.date_ordinals[pos])
+        return date.fromordinal(ordinal).isoformat() if ordinal else None
+
+    @property
+    def n_images(self) -> int:
+        return int(self.image_offsets[-1])
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns and the id index."""
+        index_bytes = 0 if self._positions is None else 100 * len(self._positions)
+        return sum(getattr(self, column).nbytes for column in self.COLUMNS) + index_bytes
+
+    def build_index(self) -> "ReviewTable":
+        """Builds the review id -> row index up front (otherwise on the first `position` call)."""
+        if self._positions is None:
+            self._positions = {review_id: pos for pos, review_id in enumerate(self.ids.tolist())}
+        return self
+
+    def position(self, review_id) -> Optional[int]:
+        """Row position of `review_id`, or None if unknown."""
+        return self.build_index()._positions.get(int(review_id))
+
+    def record(self, pos: int) -> ReviewRecord:
+        return ReviewRecord(int(self.ids[pos]), int(self.date_ordinals[pos]), self.text(pos),
+                            self.review_url(pos), self.image_urls(pos))
+
+    def __iter__(self) -> Iterator[ReviewRecord]:
+        for pos in range(len(self)):
+            yield self.record(pos)
+
+    def review_url_dict(self) -> Dict[int, str]:
+        """{review id: review URL}."""
+        return {review_id: self.review_url(pos) for pos, review_id in enumerate(self.ids.tolist())}
+
+
+def build_review_table(place_id: str, reviews: Optional[List[Dict]] = None) -> ReviewTable:
+    """Normalizes reviews.json (or the given `reviews`) into the place's review table on disk."""
+    if reviews is None:
+        reviews = load_json(SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id))
+    table = ReviewTable.from_reviews(reviews)
+    table.save(REVIEW_TABLE_PATH_TEMPLATE.format(place_id=place_id))
+    print(f"[{get_curr_time()}] Built review table for {place_id} ({len(table)} reviews, {table.n_images} images)")
+    return table
+
+
+def load_review_table(place_id: str) -> Optional[ReviewTable]:
+    """
+    Returns the place's review table, or None if no reviews were scraped.
+    The table is rebuilt when reviews.json is newer, and kept in the process-wide artifact cache.
+    """
+    json_path = SCRAPED_REVIEW_PATH_TEMPLATE.format(place_id=place_id)
+
+    def _load():
+        if not os.path.exists(json_path):
+            return None
+        table_path = REVIEW_TABLE_PATH_TEMPLATE.format(place_id=place_id)
+        if os.path.exists(table_path) and os.path.getmtime(table_path) >= os.path.getmtime(json_path):
+            return ReviewTable.load(table_path).build_index()
+        return build_review_table(place_id).build_index()
+
+    return artifact_cache.get("review_table", place_id, [json_path], _load,
+                              cost=lambda table: table.nbytes if table is not None else 0)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--place_id", type=str, required=True, help="Google Place ID for the restaurant")
+    args = parser.parse_args()
+
+    build_review_table(args.place_id)
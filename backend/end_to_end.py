@@ -1,34 +1,141 @@
+import argparse
+import json
+import pandas as pd
+
 from core.review_scraping.pipeline import scrape_reviews
-from core.menu_listing.pipeline import main as menu_listing_main
-from core.text_review_labeling.pipeline import review_text_embeddings, match_and_summarize_top_20
-from core.restuarant_overview.restauarnt_summary import summarize_restaurant_overview
+from core.menu_listing.pipeline import main as menu_listing_main, menu_listing_inputs, menu_listing_outputs
+from core.text_review_labeling.pipeline import (
+    review_text_embeddings, match_top_20, review_embedding_inputs, save_reviews_df,
+    menu_summary_inputs, menu_summary_outputs, menu_summaries_fresh
+)
+from core.text_review_labeling.menu_summary import generate_menu_summaries
+from core.restuarant_overview.restauarnt_summary import summarize_restaurant_overview, overview_inputs
+from core.image_generating.pipeline import build_menu_collage, generate_from_collage, nanobanana_is_fresh
+from core.image_generating.collage import get_review_url_dict
+from core.image_generating.constants import NANOBANANA_PREGENERATE_TOP_N
+# utils (and shared singletons) are imported through the same module paths the core packages use,
+# so this script shares their state (artifact store, menu store locks, digest memo) instead of copying it
+from utils.dag import TaskGraph
+from utils.artifact_store import artifact_sync
+from utils.menu_store import read_dish
 from utils.helpers import load_json
-from utils.path_utils import MENU_METADATA_PATH_TEMPLATE
-from core.image_generating.pipeline import save_collage_parallel, generate_from_collage
-from concurrent.futures import ThreadPoolExecutor
-
-def run_end_to_end(place_id: str):
-    # scrape_reviews(place_id)
-    with ThreadPoolExecutor() as executor:
-        future_menu = executor.submit(menu_listing_main, place_id)
-        future_reviews = executor.submit(review_text_embeddings, place_id)
-        
-        # Wait for both to complete
-        future_menu.result()
-        df_reviews = future_reviews.result()
-        
-    match_and_summarize_top_20(place_id, df_reviews)
-    summarize_restaurant_overview(place_id)
-
-    save_collage_parallel(place_id)
-    menus = load_json(MENU_METADATA_PATH_TEMPLATE.format(place_id=place_id))
-    menus_sorted = sorted([(menu_id, menu) for menu_id, menu in menus.items() if menu['from_reviews'] is not None], key=lambda x: len(x[1]['from_reviews']['relevant_review_ids']), reverse=True)[:3]
-    for menu_id, menu in menus_sorted:
-        generate_from_collage(place_id, menu_id)
-    return 'success'
+from utils.manifest import is_fresh, write_manifest
+from utils.path_utils import IMAGE_EMBEDDING_PATH_TEMPLATE, REVIEWS_DF_PATH_TEMPLATE, RESTAURANT_OVERVIEW_PATH_TEMPLATE
+from text_review_labeling.context_cache import context_cache_manager
+
+def plan_dish_tasks(graph: TaskGraph, place_id: str, assignment):
+    """
+    Adds the per-dish part of the graph once matching has fixed the dish list:
+    each dish's collage waits only for its own summary, the overview for every
+    summary (its prompt lists each dish's mentions and summary), and NanoBanana
+    for the most popular dishes' collages.
+    """
+    counts = assignment.counts()
+    menu_ids = sorted(assignment.menu_ids, key=lambda m: counts[m], reverse=True)
+
+    def _summarize():
+        inputs = menu_summary_inputs(place_id)
+        if menu_summaries_fresh(place_id, inputs):
+            for menu_id in menu_ids:
+                graph.emit(f"summary:{menu_id}", read_dish(place_id, menu_id))
+            return
+        try:
+            generate_menu_summaries(place_id, assignment, on_summary=lambda menu_id, menu: graph.emit(f"summary:{menu_id}", menu))
+        finally:
+            context_cache_manager.release(place_id)
+        write_manifest(place_id, "menu_summaries", inputs, menu_summary_outputs(place_id))
+
+    def _overview():
+        overview_path = RESTAURANT_OVERVIEW_PATH_TEMPLATE.format(place_id=place_id)
+        if is_fresh(place_id, "restaurant_overview", overview_inputs(place_id), [overview_path]):
+            return load_json(overview_path)
+        return summarize_restaurant_overview(place_id)
+
+    graph.add("summaries", _summarize, inputs=["assignment"], outputs=[f"summary:{m}" for m in menu_ids])
+
+    graph.add("overview", _overview,
+              inputs=[f"summary:{m}" for m in menu_ids], outputs=["overview"])
+
+    for menu_id in menu_ids:
+        def _collage(menu_id=menu_id):
+            return build_menu_collage(place_id, menu_id, graph.get(f"summary:{menu_id}"),
+                                      graph.get("image_df"), graph.get("review_urls"))
+
+        graph.add(f"collage:{menu_id}", _collage,
+                  inputs=[f"summary:{menu_id}", "image_df", "review_urls"], outputs=[f"collage:{menu_id}"])
+
+    for menu_id in menu_ids[:NANOBANANA_PREGENERATE_TOP_N]:
+        def _nanobanana(menu_id=menu_id):
+            if not graph.get(f"collage:{menu_id}"):
+                return False, f"No collage for [{menu_id}]"
+            if nanobanana_is_fresh(place_id, menu_id):
+                return True, f"[{menu_id}] is up to date"
+            return generate_from_collage(place_id, menu_id)
+
+        graph.add(f"nanobanana:{menu_id}", _nanobanana, inputs=[f"collage:{menu_id}"], outputs=[f"nanobanana:{menu_id}"])
+
+
+def build_graph(place_id: str, scrape: bool = False, max_workers: int = 16) -> TaskGraph:
+    graph = TaskGraph(name=f"end_to_end[{place_id}]", max_workers=max_workers)
+    # Start from whatever other instances already computed for this place
+    artifact_sync.prefetch(place_id, force=True)
+    reviews_ready = ["reviews"] if scrape else []
+
+    if scrape:
+        graph.add("scrape_reviews", lambda: scrape_reviews(place_id), outputs=["reviews"])
+
+    def _menu_listing():
+        if not is_fresh(place_id, "menu_listing", menu_listing_inputs(place_id), menu_listing_outputs(place_id)):
+            menu_listing_main(place_id)
+
+    def _review_embeddings():
+        inputs = review_embedding_inputs(place_id)
+        df_path = REVIEWS_DF_PATH_TEMPLATE.format(place_id=place_id)
+        if is_fresh(place_id, "review_embeddings", inputs, [df_path]):
+            return pd.read_pickle(df_path)
+        df_reviews = review_text_embeddings(place_id)
+        if df_reviews is not None:
+            save_reviews_df(place_id, df_reviews, inputs)
+        return df_reviews
+
+    graph.add("menu_listing", _menu_listing, outputs=["menu_listing", "image_embeddings"])
+    graph.add("review_embeddings", _review_embeddings, inputs=reviews_ready, outputs=["review_embeddings"])
+    graph.add("review_urls", lambda: get_review_url_dict(place_id), inputs=reviews_ready, outputs=["review_urls"])
+    graph.add("image_df", lambda: pd.read_parquet(IMAGE_EMBEDDING_PATH_TEMPLATE.format(place_id=place_id)),
+              inputs=["image_embeddings"], outputs=["image_df"])
+
+    def _match():
+        df_reviews = graph.get("review_embeddings")
+        if df_reviews is None:
+            raise RuntimeError("No review embeddings")
+        assignment = match_top_20(place_id, df_reviews)
+        if assignment is None:
+            raise RuntimeError("No menu items to match")
+        plan_dish_tasks(graph, place_id, assignment)
+        return assignment
+
+    graph.add("match", _match, inputs=["menu_listing", "review_embeddings"], outputs=["assignment"])
+    return graph
+
+
+def run_end_to_end(place_id: str, scrape: bool = False, max_workers: int = 16):
+    with artifact_sync.pinned(place_id):
+        graph = build_graph(place_id, scrape=scrape, max_workers=max_workers)
+        graph.run()
+    timing = graph.report()
+    failed = [name for name, task in graph.tasks.items() if task.status != "done"]
+    return ('success' if not failed else 'partial'), timing
+
 
 if __name__ == "__main__":
-    place_id = "ChIJT2NxLBPKj4ARRivowJnL3Wg" # paik's noodle
-    place_id = "ChIJ45nohjW1j4ARlHArHtlS5I0" # Sweet maple
-    # placE_id = "ChIJO79pfG7Kj4ARTnmoiEbJKEk" # Kunjip
-    run_end_to_end(place_id)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--place_id", type=str, default="ChIJ45nohjW1j4ARlHArHtlS5I0") # Sweet maple
+    parser.add_argument("--scrape", action="store_true", help="Scrape reviews before processing")
+    parser.add_argument("--timing_json", type=str, default=None, help="Optional path to save the task timings")
+    args = parser.parse_args()
+
+    status, timing = run_end_to_end(args.place_id, scrape=args.scrape)
+    print(f"Status: {status}")
+    if args.timing_json:
+        with open(args.timing_json, 'w') as f:
+            json.dump(timing, f, indent=2)
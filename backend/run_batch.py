@@ -0,0 +1,101 @@
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from end_to_end import run_end_to_end
+# Pool and limiter stats must come from the same module objects the core packages import
+from utils.helpers import get_curr_time, load_json, save_json
+from utils.path_utils import BATCH_RUN_DIR
+from utils.pools import SHARED_POOL_SIZES, RATE_LIMITS_PER_MINUTE, limiter_stats
+from utils.artifact_store import artifact_sync
+
+# Statuses; only "success" is skipped when a batch is resumed
+RUNNING, SUCCESS, PARTIAL, FAILED = "running", "success", "partial", "failed"
+
+
+class BatchProgress:
+    """Per-place status, saved after every change so an interrupted batch resumes where it stopped."""
+
+    def __init__(self, path: str, resume: bool = True):
+        self.path = path
+        self._lock = threading.Lock()
+        self.places = load_json(path)["places"] if resume and os.path.exists(path) else {}
+
+    def todo(self, place_ids):
+        return [place_id for place_id in place_ids if self.places.get(place_id, {}).get("status") != SUCCESS]
+
+    def update(self, place_id: str, **fields):
+        with self._lock:
+            self.places.setdefault(place_id, {}).update(fields)
+            save_json(self.path, {"places": self.places})
+
+
+def load_place_ids(place_ids, place_ids_file):
+    """Place ids from the command line and/or a file (one per line, `#` starts a comment), deduplicated in order."""
+    ids = list(place_ids or [])
+    if place_ids_file:
+        with open(place_ids_file) as f:
+            ids += [line.split("#")[0].strip() for line in f]
+    return list(dict.fromkeys(place_id for place_id in ids if place_id))
+
+
+def run_place(place_id: str, progress: BatchProgress, scrape: bool, max_workers: int):
+    progress.update(place_id, status=RUNNING, started_at=time.time(), error=None)
+    try:
+        status, timing = run_end_to_end(place_id, scrape=scrape, max_workers=max_workers)
+        failed_tasks = [name for name, task in timing["tasks"].items() if task["status"] != "done"]
+        progress.update(place_id, status=status, finished_at=time.time(), wall_clock=timing["wall_clock"],
+                        critical_path=timing["critical_path"], sum_of_tasks=timing["sum_of_tasks"],
+                        critical_path_tasks=timing["critical_path_tasks"], failed_tasks=failed_tasks)
+    except Exception as e:
+        print(f"[{get_curr_time()}] {place_id} failed: {e}")
+        progress.update(place_id, status=FAILED, finished_at=time.time(), error=str(e))
+    return place_id
+
+
+def print_summary(progress: BatchProgress, place_ids, elapsed: float):
+    print(f"\n=== Batch summary ({len(place_ids)} places, {elapsed:.1f}s) ===")
+    print(f"  {'place_id':<30} {'status':<8} {'wall':>8} {'crit.path':>10} {'work':>8}")
+    for place_id in place_ids:
+        entry = progress.places.get(place_id, {})
+        fmt = lambda key: f"{entry[key]:.1f}s" if entry.get(key) is not None else "-"
+        print(f"  {place_id:<30} {entry.get('status', 'skipped'):<8} {fmt('wall_clock'):>8} "
+              f"{fmt('critical_path'):>10} {fmt('sum_of_tasks'):>8}")
+    for name, stats in sorted(limiter_stats().items()):
+        print(f"  [{name}] {stats['requests']} requests at {stats['rate_per_min'] or 'unlimited'}/min, "
+              f"waited {stats['waited_s']:.1f}s on the rate limit")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the end-to-end pipeline for many places on shared worker pools and rate limits")
+    parser.add_argument("--place_ids", type=str, nargs="*", help="Google Place IDs")
+    parser.add_argument("--place_ids_file", type=str, default=None, help="File with one Place ID per line")
+    parser.add_argument("--run_name", type=str, default="catalogue", help="Progress is kept in data/batch/end_to_end/<run_name>.json")
+    parser.add_argument("--concurrency", type=int, default=4, help="Places processed at the same time")
+    parser.add_argument("--workers_per_place", type=int, default=8, help="Stage threads per place (API calls use the shared pools)")
+    parser.add_argument("--scrape", action="store_true", help="Scrape reviews before processing")
+    parser.add_argument("--no_resume", action="store_true", help="Ignore progress from a previous run with this name")
+    args = parser.parse_args()
+
+    place_ids = load_place_ids(args.place_ids, args.place_ids_file)
+    if not place_ids:
+        parser.error("No place ids given")
+
+    progress = BatchProgress(os.path.join(BATCH_RUN_DIR, "end_to_end", f"{args.run_name}.json"), resume=not args.no_resume)
+    todo = progress.todo(place_ids)
+    print(f"[{get_curr_time()}] {len(place_ids) - len(todo)} of {len(place_ids)} places already done; "
+          f"running {len(todo)} with concurrency {args.concurrency}")
+    print(f"[{get_curr_time()}] Shared pools {SHARED_POOL_SIZES}, rate limits (per minute) {RATE_LIMITS_PER_MINUTE}")
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(run_place, place_id, progress, args.scrape, args.workers_per_place) for place_id in todo]
+        for future in as_completed(futures):
+            place_id = future.result()
+            print(f"[{get_curr_time()}] {place_id}: {progress.places[place_id]['status']}")
+
+    # Uploads to the shared artifact store run in the background; let them finish before exiting
+    artifact_sync.flush()
+    print_summary(progress, place_ids, time.time() - start)
@@ -8,7 +8,7 @@ import { Hourglass, AlertCircle } from "lucide-react";
 import loadingAnimationGif from "../assets/Loading Animation v2.gif";
 import sparklesSvg from "../assets/sparkles.svg";
 import dishyPickLogo from "../assets/dishy pick logo.svg";
-import { runReviewScraping, runMenuListing, runMatchAndSummarize } from "./pipeline";
+import { getResultsBundle, runReviewScraping, runMenuListing, runMatchAndSummarize } from "./pipeline";
 import { Progress } from "@/components/ui/progress";
 import { Button } from "@/components/ui/button";
 import styles from "./Process.module.css";
@@ -144,6 +144,7 @@ function ProcessPageContent() {
     scrapingData,
     setScrapingData,
     setRestaurantOverview,
+    applyBundleImages,
   } = useRestaurantStore();
 
   useEffect(() => {
@@ -185,10 +186,51 @@ function ProcessPageContent() {
     if (pipelineStartedForPlaceId === placeIdFromUrl) return;
     pipelineStartedForPlaceId = placeIdFromUrl;
 
+    const applyOverview = (overview: any) => {
+      if (overview && (overview.summary_html != null || overview.glossary != null)) {
+        setRestaurantOverview({
+          summary_html: overview.summary_html ?? "",
+          glossary: overview.glossary ?? {},
+        });
+      }
+    };
+
+    const showResults = (meta: { restaurantName: string; reviewCount: number; imageCount: number }) => {
+      setProgress(100);
+      setPhase("results-preview");
+
+      // Store already has restaurantName, reviewCount, imageCount, menuData — results page uses them.
+      // Persist to sessionStorage so results page can rehydrate on refresh (no URL params).
+      try {
+        sessionStorage.setItem(`restaurant_meta_${placeIdFromUrl}`, JSON.stringify(meta));
+      } catch (e) {
+        // ignore quota / private mode
+      }
+      router.replace(`/results?place_id=${encodeURIComponent(placeIdFromUrl)}`);
+    };
+
     const processPipeline = async () => {
       try {
-        // Step 1: Review Scraping
         const nameFromUrl = initialName ? decodeURIComponent(initialName) : "";
+
+        // Known restaurant: menus, overview and image URLs come in one precompressed bundle
+        const bundle = await getResultsBundle(placeIdFromUrl);
+        if (bundle?.menus) {
+          const meta = {
+            restaurantName: bundle.restaurant_name || nameFromUrl || "Restaurant",
+            reviewCount: initialReviews ? parseInt(initialReviews, 10) : (bundle.review_count ?? 0),
+            imageCount: bundle.image_count ?? 0,
+          };
+          setRestaurantInfo(meta.restaurantName, meta.reviewCount, meta.imageCount);
+          setMenuData(bundle.menus);
+          // Collages and finished nanobanana images are in the bundle too, so the results page skips those stages
+          applyBundleImages(bundle.collage ?? {}, bundle.src_review_urls ?? {}, bundle.nanobanana ?? {});
+          applyOverview(bundle.restaurant_overview);
+          showResults(meta);
+          return;
+        }
+
+        // Step 1: Review Scraping
         const scrapingRes = await runReviewScraping(placeIdFromUrl, nameFromUrl || undefined);
 
         // Prefer backend restaurant_name; fall back to name from URL (search) when backend doesn't return it
@@ -221,30 +263,13 @@ function ProcessPageContent() {
         }
 
         // Save Restaurant Overview from API (summary_html & glossary)
-        const overview = summaryRes.restaurant_overview;
-        if (overview && (overview.summary_html != null || overview.glossary != null)) {
-          setRestaurantOverview({
-            summary_html: overview.summary_html ?? "",
-            glossary: overview.glossary ?? {},
-          });
-        }
-
-        setProgress(100);
-        setPhase("results-preview");
+        applyOverview(summaryRes.restaurant_overview);
 
-        // Store already has restaurantName, reviewCount, imageCount, menuData — results page uses them.
-        // Persist to sessionStorage so results page can rehydrate on refresh (no URL params).
-        const meta = {
+        showResults({
           restaurantName: restaurantNameToUse,
           reviewCount: reviewCountToUse,
-          imageCount: (scrapingRes as { image_count?: number }).image_count ?? 0,
-        };
-        try {
-          sessionStorage.setItem(`restaurant_meta_${placeIdFromUrl}`, JSON.stringify(meta));
-        } catch (e) {
-          // ignore quota / private mode
-        }
-        router.replace(`/results?place_id=${encodeURIComponent(placeIdFromUrl)}`);
+          imageCount: imageCountFromScraping,
+        });
       } catch (err: any) {
         console.error("Pipeline error:", err);
         // If the error is "Insufficient reviews", redirect back to home with the message
@@ -19,24 +19,63 @@ export async function runCollageImages(placeId: string) {
   return invokeBackendApi(`${getBackendUrl()}/collage_images`, placeId);
 }
 
+// Last bundle per place, revalidated with If-None-Match so unchanged results come back as a bodyless 304
+const resultsBundles = new Map<string, { etag: string; data: any }>();
+
+/** Finished results for a known restaurant in one request, or null when the pipeline has to run. */
+export async function getResultsBundle(placeId: string) {
+  if (!placeId) return null;
+  try {
+    const cached = resultsBundles.get(placeId);
+    const response = await fetch(`${getBackendUrl()}/results/bundle?place_id=${encodeURIComponent(placeId)}`, {
+      cache: "no-store",
+      headers: cached ? { "If-None-Match": cached.etag } : undefined,
+    });
+    if (response.status === 304 && cached) return cached.data;
+    if (!response.ok) return null;
+    const data = await response.json();
+    const etag = response.headers.get("ETag");
+    if (etag) resultsBundles.set(placeId, { etag, data });
+    return data;
+  } catch (error) {
+    console.error("Results bundle fetch error:", error);
+    return null;
+  }
+}
+
+const NANOBANANA_POLL_INTERVAL_MS = 3000;
+// A job still queued/running after this long is treated as failed (e.g. the backend restarted without resuming it)
+const NANOBANANA_MAX_WAIT_MS = 5 * 60 * 1000;
+
 export async function runNanobanaImage(placeId: string, menuId: string) {
   if (!placeId || !menuId) {
     throw new Error("Invalid Place ID or Menu ID");
   }
   try {
-    const response = await fetch(`${getBackendUrl()}/nanobanana_image`, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ place_id: placeId, menu_id: menuId }),
-    });
-
-    // Parse JSON body for all known status codes (200, 404, 500)
+    let response: Response;
     let data: any;
-    try {
-      data = await response.json();
-    } catch {
-      throw new Error("Invalid JSON response from nanobanana_image");
-    }
+    const deadline = Date.now() + NANOBANANA_MAX_WAIT_MS;
+    // 202 — generation is queued/running in the background; the same request polls the shared job
+    do {
+      if (data) {
+        if (Date.now() + NANOBANANA_POLL_INTERVAL_MS > deadline) {
+          throw new Error("Image generation is taking too long. Please try again later.");
+        }
+        await new Promise((resolve) => setTimeout(resolve, NANOBANANA_POLL_INTERVAL_MS));
+      }
+      response = await fetch(`${getBackendUrl()}/nanobanana_image`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ place_id: placeId, menu_id: menuId }),
+      });
+
+      // Parse JSON body for all known status codes (200, 202, 404, 500)
+      try {
+        data = await response.json();
+      } catch {
+        throw new Error("Invalid JSON response from nanobanana_image");
+      }
+    } while (response.status === 202);
 
     // 200 — "created": image generated successfully
     if (response.ok) {
@@ -4,7 +4,7 @@ import React, { Suspense, useState, useCallback, useEffect, useMemo, useRef } fr
 import Image, { type StaticImageData } from "next/image";
 import { useSearchParams, useRouter } from "next/navigation";
 import { ImageOff, Loader2, ExternalLink, UtensilsCrossed } from "lucide-react";
-import { useRestaurantStore } from "../../store/useStore";
+import { useRestaurantStore, withImageSize } from "../../store/useStore";
 import { runNanobanaImage } from "../../process/pipeline";
 import { fetchReviews, type FetchedReview } from "./reviews";
 import { Button } from "@/components/ui/button";
@@ -390,7 +390,7 @@ function DetailPageContent() {
                     const reviewUrl = item.collageImageUrls?.[i];
                     const photoContent = showImage ? (
                       <Image
-                        src={imgSrc}
+                        src={withImageSize(imgSrc, "thumb")}
                         alt={`Customer photo ${i + 1}`}
                         fill
                         sizes="120px"
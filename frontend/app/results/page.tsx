@@ -49,7 +49,7 @@ function toTitleCase(s: string): string {
 import { Input } from "@/components/ui/input";
 import { cn } from "@/lib/utils";
 import { Skeleton } from "@/components/ui/skeleton";
-import { useRestaurantStore } from "../store/useStore";
+import { useRestaurantStore, withImageSize } from "../store/useStore";
 import { useSearchParams } from "next/navigation";
 import { runCollageImages, runNanobanaImage } from "../process/pipeline";
 import { toast } from "sonner";
@@ -166,20 +166,22 @@ function ResultsPageContent() {
     setImageGenerationStartedForPlaceId(placeId);
 
     const runImageGeneration = async () => {
-      // 1. Collage images
-      try {
-        const collageRes = await runCollageImages(placeId);
-        if (collageRes.collage) {
-          updateCollageImages(collageRes.collage, collageRes.src_review_urls);
+      // 1. Collage images (already in the store when they came with the results bundle)
+      if (!collageImagesLoaded) {
+        try {
+          const collageRes = await runCollageImages(placeId);
+          if (collageRes.collage) {
+            updateCollageImages(collageRes.collage, collageRes.src_review_urls);
+          }
+        } catch (bgError) {
+          console.error("Collage image generation error:", bgError);
+        } finally {
+          setCollageImagesLoaded(true);
         }
-      } catch (bgError) {
-        console.error("Collage image generation error:", bgError);
-      } finally {
-        setCollageImagesLoaded(true);
       }
 
       // 2. Nanobanana "Show Me the Dish" for first 3 menus — pick top 3 by relevant_review_ids length (descending)
-      const menuIds = Object.entries(menuItems)
+      const topMenus = Object.entries(menuItems)
         .sort(([, a], [, b]) => {
           const aLen =
             (a as { from_reviews?: { relevant_review_ids?: unknown[] } }).from_reviews?.relevant_review_ids?.length ??
@@ -189,7 +191,10 @@ function ResultsPageContent() {
             0;
           return bLen - aLen;
         })
-        .slice(0, 3)
+        .slice(0, 3);
+      // Dishes whose nanobanana image came with the results bundle need no request
+      const menuIds = topMenus
+        .filter(([, menu]) => !(menu as { dishImage?: string }).dishImage)
         .map(([key]) => key);
       if (menuIds.length > 0) {
         setNanobananaGenerating(true);
@@ -224,6 +229,7 @@ function ResultsPageContent() {
     setNanobananaGeneratingMenuId,
     setNanobananaGenerating,
     setCollageImagesLoaded,
+    collageImagesLoaded,
     menuItems,
   ]);
 
@@ -271,8 +277,11 @@ function ResultsPageContent() {
         // Prefer nanobanana (dishImage), then collage [0], then sample (only if we have something)
         thumbnailImage: hasNoImage
           ? null
-          : item.dishImage ||
-            (item.collageImages && item.collageImages.length > 0 ? item.collageImages[0] : `/sample-collage/${id}.png`),
+          : item.dishImage
+            ? withImageSize(item.dishImage, "thumb")
+            : item.collageImages && item.collageImages.length > 0
+              ? withImageSize(item.collageImages[0], "thumb")
+              : `/sample-collage/${id}.png`,
       };
     }); // Preserve original order from the menus API response
   }, [menuItems]);
@@ -29,6 +29,11 @@ interface MenuFromReviews {
   diff_notes: Array<{ note: string; evidence_review_ids: number[] }>;
 }
 
+/** Requests a smaller server-side variant of a backend image URL (served as AVIF/WebP when supported). */
+export function withImageSize(url: string, size: "thumb" | "detail"): string {
+  return `${url}${url.includes("?") ? "&" : "?"}size=${size}`;
+}
+
 /** Per-claim: tag drives status pill + card; evidences has review quotes and Source Review links. Skip when value is null. */
 export type DietaryOptionValue = {
   tag: "verified" | "warning" | "info" | "not_verified";
@@ -80,6 +85,12 @@ interface RestaurantState {
   setRestaurantOverview: (data: { summary_html: string; glossary: Record<string, string> }) => void;
   updateCollageImages: (collages: Record<string, string[]>, srcReviewUrls?: Record<string, string[]>) => void;
   updateNanobananaImage: (menuId: string, nanobanana: string) => void;
+  /** Applies the image URLs of a results bundle (collages and finished nanobanana images) without "image ready" banners. */
+  applyBundleImages: (
+    collages: Record<string, string[]>,
+    srcReviewUrls: Record<string, string[]>,
+    nanobanana: Record<string, string>
+  ) => void;
   markNanobananaNoImage: (menuId: string) => void;
   setProgress: (p: number) => void;
   setPhase: (phase: RestaurantState["phase"]) => void;
@@ -160,6 +171,33 @@ export const useRestaurantStore = create<RestaurantState>((set) => ({
 
       return { menuData: newMenuData, nanobananaReadyMenuId: menuId };
     }),
+  applyBundleImages: (collages, srcReviewUrls, nanobanana) =>
+    set((state) => {
+      if (!state.menuData || !state.placeId) return state;
+      const newMenuData = { ...state.menuData };
+      const backendUrl = getBackendUrl();
+
+      Object.entries(collages).forEach(([menuId, filenames]) => {
+        if (newMenuData[menuId]) {
+          newMenuData[menuId] = {
+            ...newMenuData[menuId],
+            collageImages: filenames.map((f) => `${backendUrl}/data/${state.placeId}/collage/${menuId}/${f}`),
+            ...(srcReviewUrls[menuId] ? { collageImageUrls: srcReviewUrls[menuId] } : {}),
+          };
+        }
+      });
+      Object.entries(nanobanana).forEach(([menuId, filename]) => {
+        if (newMenuData[menuId]) {
+          newMenuData[menuId] = {
+            ...newMenuData[menuId],
+            dishImage: `${backendUrl}/data/${state.placeId}/nanobanana/${filename}`,
+          };
+        }
+      });
+
+      // Collages only count as loaded when the bundle had them; otherwise the results page builds them
+      return { menuData: newMenuData, collageImagesLoaded: Object.keys(collages).length > 0 };
+    }),
   markNanobananaNoImage: (menuId) =>
     set((state) => {
       if (!state.menuData || !menuId) return state;